@@ -1,3 +1,4 @@
+import datetime
 from dataclasses import dataclass
 
 
@@ -9,3 +10,40 @@ class CashbackArticle:
     instruction_text: str
     image_url: str
     in_stock: bool
+
+
+@dataclass(frozen=True)
+class ChatSummary:
+    """Первое и последнее сообщение клиента в диалоге заявки — для листа "Покупатели"."""
+
+    first_message_at: datetime.datetime
+    last_message_at: datetime.datetime
+    last_message_text: str
+
+
+@dataclass(frozen=True)
+class ArticleSnapshot:
+    id: int
+    cabinet_id: int
+    nm_id: int
+    title: str | None
+    brand_name: str
+    instruction_text: str
+    image_url: str
+    in_stock: bool
+
+
+@dataclass(frozen=True)
+class CabinetSnapshot:
+    """Неизменяемый снимок кабинета и его каталога для горячих путей чтения. Не использовать для изменений."""
+
+    id: int
+    user_id: int
+    organization_name: str
+    business_connection_id: str | None
+    business_account_id: int | None
+    leads_balance: int
+    articles: tuple[ArticleSnapshot, ...]
+
+    def get_articles_by_nm_ids(self, nm_ids: list[int]) -> list[ArticleSnapshot]:
+        return [article for article in self.articles if article.nm_id in nm_ids]
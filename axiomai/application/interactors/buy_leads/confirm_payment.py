@@ -5,6 +5,7 @@ from aiogram import Bot
 from axiomai.application.exceptions.cabinet import CabinetNotFoundError
 from axiomai.application.exceptions.cashback_table import CashbackTableNotFoundError
 from axiomai.application.exceptions.payment import PaymentAlreadyProcessedError, PaymentNotFoundError
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
 from axiomai.infrastructure.database.gateways.payment import PaymentGateway
@@ -12,6 +13,7 @@ from axiomai.infrastructure.database.gateways.user import UserGateway
 from axiomai.infrastructure.database.models.cashback_table import CashbackTableStatus
 from axiomai.infrastructure.database.models.payment import PaymentStatus
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
 from axiomai.infrastructure.telegram.keyboards.reply import get_kb_menu
 
 logger = logging.getLogger(__name__)
@@ -26,6 +28,8 @@ class ConfirmBuyLeadsPayment:
         cashback_table_gateway: CashbackTableGateway,
         user_gateway: UserGateway,
         bot: Bot,
+        cabinet_snapshot_cache: CabinetSnapshotCache,
+        sync_events: SyncEvents,
     ) -> None:
         self._tm = tm
         self._payment_gateway = payment_gateway
@@ -33,6 +37,8 @@ class ConfirmBuyLeadsPayment:
         self._cashback_table_gateway = cashback_table_gateway
         self._user_gateway = user_gateway
         self._bot = bot
+        self._cabinet_snapshot_cache = cabinet_snapshot_cache
+        self._sync_events = sync_events
 
     async def execute(self, admin_telegram_id: int, payment_id: int) -> None:
         payment = await self._payment_gateway.get_payment_by_id(payment_id)
@@ -63,9 +69,11 @@ class ConfirmBuyLeadsPayment:
             cashback_table.status = CashbackTableStatus.PAID
 
         if leads > 0:
-            cabinet.leads_balance = (cabinet.leads_balance or 0) + leads
+            await self._cabinet_gateway.credit_leads(cabinet.id, leads, reference=f"payment:{payment.id}")
 
         await self._tm.commit()
+        await self._cabinet_snapshot_cache.invalidate(cabinet.id)
+        await self._sync_events.publish(SyncEventType.DIRTY_TABLE, cabinet.id)
 
         logger.info("buy leads payment %s confirmed by admin %s", payment_id, admin_telegram_id)
 
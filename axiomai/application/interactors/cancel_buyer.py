@@ -3,14 +3,16 @@ import logging
 from axiomai.application.exceptions.buyer import BuyerAlreadyOrderedError, BuyerNotFoundError
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
 
 logger = logging.getLogger(__name__)
 
 
 class CancelBuyer:
-    def __init__(self, buyer_gateway: BuyerGateway, tm: TransactionManager) -> None:
+    def __init__(self, buyer_gateway: BuyerGateway, tm: TransactionManager, sync_events: SyncEvents) -> None:
         self._buyer_gateway = buyer_gateway
         self._tm = tm
+        self._sync_events = sync_events
 
     async def execute(self, buyer_id: int) -> None:
         buyer = await self._buyer_gateway.get_buyer_by_id(buyer_id)
@@ -24,5 +26,6 @@ class CancelBuyer:
 
         buyer.is_canceled = True
         await self._tm.commit()
+        await self._sync_events.publish(SyncEventType.DIRTY_TABLE, buyer.cabinet_id)
 
         logger.info("buyer %s canceled by telegram_id %s", buyer_id, buyer.telegram_id)
@@ -1,9 +1,11 @@
 import logging
+from datetime import datetime
 
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
 from axiomai.infrastructure.database.models.buyer import Buyer
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +16,12 @@ class CreateBuyer:
         buyer_gateway: BuyerGateway,
         cashback_table_gateway: CashbackTableGateway,
         transaction_manager: TransactionManager,
+        sync_events: SyncEvents,
     ) -> None:
         self._buyer_gateway = buyer_gateway
         self._cashback_table_gateway = cashback_table_gateway
         self._transaction_manager = transaction_manager
+        self._sync_events = sync_events
 
     async def execute(
         self,
@@ -25,8 +29,9 @@ class CreateBuyer:
         username: str | None,
         fullname: str,
         article_id: int,
-        chat_history: list[dict] | None = None,
+        dialog_started_at: datetime | None = None,
     ) -> Buyer:
+        """Создаёт заявку. ``dialog_started_at`` — с какой реплики к ней относится история чата, иначе с создания."""
         article = await self._cashback_table_gateway.get_cashback_article_by_id(article_id)
         if not article:
             raise ValueError(
@@ -53,11 +58,13 @@ class CreateBuyer:
             username=username,
             fullname=fullname,
             nm_id=article.nm_id,
-            chat_history=chat_history or [],
         )
+        if dialog_started_at:
+            buyer.dialog_started_at = dialog_started_at
 
         await self._buyer_gateway.create_buyer(buyer)
         await self._transaction_manager.commit()
+        await self._sync_events.publish(SyncEventType.DIRTY_TABLE, buyer.cabinet_id)
 
         logger.info("buyer created for telegram_id %s, nm_id %s", telegram_id, article.nm_id)
 
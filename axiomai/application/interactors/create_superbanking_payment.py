@@ -1,13 +1,15 @@
 import logging
 
 from axiomai.application.exceptions.payment import NotEnoughBalanceError
-from axiomai.application.exceptions.superbanking import CreatePaymentError, SignPaymentError, SkipSuperbankingError
+from axiomai.application.exceptions.superbanking import CreatePaymentError, SkipSuperbankingError
 from axiomai.constants import AXIOMAI_COMMISSION, SUPERBANKING_COMMISSION
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.gateways.superbanking_payout import SuperbankingPayoutGateway
+from axiomai.infrastructure.database.models.superbanking import SuperbankingPayoutStatus
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
 from axiomai.infrastructure.superbanking import Superbanking
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
 
 logger = logging.getLogger(__name__)
 
@@ -20,12 +22,14 @@ class CreateSuperbankingPayment:
         superbanking_payout_gateway: SuperbankingPayoutGateway,
         transaction_manager: TransactionManager,
         superbanking: Superbanking,
+        sync_events: SyncEvents,
     ) -> None:
         self._buyer_gateway = buyer_gateway
         self._cabinet_gateway = cabinet_gateway
         self._superbanking_payout_gateway = superbanking_payout_gateway
         self._transaction_manager = transaction_manager
         self._superbanking = superbanking
+        self._sync_events = sync_events
 
     async def execute(
         self,
@@ -40,24 +44,15 @@ class CreateSuperbankingPayment:
         if not cabinet:
             raise ValueError(f"Cabinet with id {cabinet_id} not found")
 
-        buyers = await self._buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(telegram_id, cabinet_id)
-
-        nm_ids = []
-        total_amount = 0
-
-        part_amount = (amount or 0) // len(buyers)
-
-        for buyer in buyers:
-            buyer.phone_number = phone_number
-            buyer.bank = bank
+        # Пока выплата в работе, повторное подтверждение (в том числе с другими реквизитами) её не дублирует
+        pending_payout = await self._superbanking_payout_gateway.get_pending_payout(telegram_id, cabinet.id)
+        if pending_payout:
+            return pending_payout.order_number
 
-            if not buyer.amount:
-                buyer.amount = part_amount
-
-            nm_ids.append(buyer.nm_id)
-            total_amount += buyer.amount
-
-        await self._transaction_manager.commit()
+        nm_ids, total_amount = await self._save_requisites(
+            telegram_id=telegram_id, cabinet_id=cabinet_id, phone_number=phone_number, bank=bank, amount=amount
+        )
+        await self._sync_events.publish(SyncEventType.DIRTY_TABLE, cabinet.id)
 
         if not cabinet.is_superbanking_connect:
             logger.info(
@@ -67,6 +62,9 @@ class CreateSuperbankingPayment:
             await self._transaction_manager.commit()
             raise SkipSuperbankingError(cabinet_id=cabinet.id, is_superbanking_connect=cabinet.is_superbanking_connect)
 
+        if not self._superbanking.is_known_bank(bank):
+            raise CreatePaymentError(f"Unknown bank: {bank}")
+
         total_charge = total_amount + SUPERBANKING_COMMISSION + AXIOMAI_COMMISSION
 
         if cabinet.balance < total_charge:
@@ -79,6 +77,11 @@ class CreateSuperbankingPayment:
             bank=bank,
             amount=total_amount,
         )
+        if existing_payout := await self._superbanking_payout_gateway.get_payout_by_order_number(order_number):
+            if existing_payout.status == SuperbankingPayoutStatus.FAILED:
+                raise CreatePaymentError(f"Payout {order_number} has already failed")
+            return existing_payout.order_number
+
         payout = await self._superbanking_payout_gateway.create_payout(
             telegram_id=telegram_id,
             nm_ids=nm_ids,
@@ -86,32 +89,42 @@ class CreateSuperbankingPayment:
             bank=bank,
             amount=total_amount,
             order_number=order_number,
+            cabinet_id=cabinet.id,
+            business_connection_id=cabinet.business_connection_id,
+            charge=total_charge,
         )
 
-        try:
-            cabinet_transaction_id = await self._superbanking.create_payment(
-                phone_number=phone_number,
-                bank_name_rus=bank,
-                amount=total_amount,
-                order_number=payout.order_number,
-            )
-        except CreatePaymentError:
-            logger.exception("Failed to create_payment() Superbanking payout for payout_id=%s", payout.id)
-            raise
+        # Деньги резервируются одним условным UPDATE вместе с созданием выплаты: параллельные выплаты
+        # одного кабинета не уведут баланс в минус. Сам перевод проводит SuperbankingPayoutWorker
+        balance = await self._cabinet_gateway.debit_balance(cabinet.id, total_charge, reference=payout.order_number)
+        if balance is None:
+            raise NotEnoughBalanceError
+        await self._transaction_manager.commit()
+        await self._sync_events.publish(SyncEventType.DIRTY_CABINET, cabinet.id)
+
+        logger.info("Superbanking payout queued: payout_id=%s, order_number=%s", payout.id, payout.order_number)
+        return payout.order_number
+
+    async def _save_requisites(
+        self, *, telegram_id: int, cabinet_id: int, phone_number: str, bank: str, amount: int | None
+    ) -> tuple[list[int], int]:
+        """Сохраняет реквизиты в заявки покупателя, возвращает артикулы и общую сумму выплаты."""
+        buyers = await self._buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(telegram_id, cabinet_id)
+
+        nm_ids = []
+        total_amount = 0
 
-        try:
-            await self._superbanking.sign_payment(cabinet_transaction_id=cabinet_transaction_id, order_number=payout.order_number)
-        except SignPaymentError:
-            logger.exception("Failed to sign_payment() Superbanking payout for payout_id=%s", payout.id)
-            raise
+        part_amount = (amount or 0) // len(buyers)
 
-        # успешно выплатили юзеру деньги через superbanking_api - списываем деньги с баланса селлера и ставим buyer.is_superbanking_paid = True
         for buyer in buyers:
-            buyer.is_superbanking_paid = True
-            buyer.is_paid_manually = True
+            buyer.phone_number = phone_number
+            buyer.bank = bank
+
+            if not buyer.amount:
+                buyer.amount = part_amount
 
-        cabinet.balance -= total_charge
+            nm_ids.append(buyer.nm_id)
+            total_amount += buyer.amount
 
         await self._transaction_manager.commit()
-
-        return payout.order_number
+        return nm_ids, total_amount
@@ -8,6 +8,7 @@ from axiomai.infrastructure.database.gateways.balance_notification import Balanc
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.gateways.user import UserGateway
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.telegram.outbound import broadcast
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +30,8 @@ class ObserveBalanceNotifications:
         self._transaction_manager = transaction_manager
         self._bot = bot
 
-    async def execute(self) -> None:
-        cabinets = await self._cabinet_gateway.get_cabinets_with_low_balance()
+    async def execute(self, cabinet_ids: list[int] | None = None) -> None:
+        cabinets = await self._cabinet_gateway.get_cabinets_with_low_balance(cabinet_ids)
 
         for cabinet in cabinets:
             user = await self._user_gateway.get_user_by_cabinet_id(cabinet.id)
@@ -73,4 +74,5 @@ class ObserveBalanceNotifications:
                 f"⚠️ Внимание! На вашем балансе осталось {balance} ₽ для выплат кэшбека.\n\n"
                 "Пополните баланс, чтобы не останавливать обработку заявок."
             )
-        await self._bot.send_message(chat_id=telegram_id, text=text)
+        with broadcast():
+            await self._bot.send_message(chat_id=telegram_id, text=text)
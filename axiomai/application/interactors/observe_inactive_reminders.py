@@ -1,18 +1,23 @@
+import asyncio
 import logging
 from datetime import UTC, datetime, timedelta
 
 from aiogram import Bot
 from aiogram.exceptions import TelegramForbiddenError
 
+from axiomai.constants import (
+    INACTIVE_REMINDER_RETRY_DELAY,
+    INACTIVE_REMINDERS_CONCURRENCY,
+    INACTIVE_REMINDERS_PAGE_SIZE,
+)
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.models.buyer import Buyer
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.telegram.outbound import broadcast
 
 logger = logging.getLogger(__name__)
 
-INACTIVE_HOURS = 48
-
 
 class ObserveInactiveReminders:
     def __init__(
@@ -26,23 +31,63 @@ class ObserveInactiveReminders:
         self._cabinet_gateway = cabinet_gateway
         self._transaction_manager = transaction_manager
         self._bot = bot
+        self._semaphore = asyncio.Semaphore(INACTIVE_REMINDERS_CONCURRENCY)
 
     async def execute(self) -> None:
-        inactive_since = datetime.now(UTC) - timedelta(hours=INACTIVE_HOURS)
-        buyers = await self._buyer_gateway.get_inactive_buyers(inactive_since)
+        """Отправляет наступившие напоминания и планирует следующие."""
+        now = datetime.now(UTC)
+        business_connection_ids: dict[int, str | None] = {}
+
+        await self._buyer_gateway.unschedule_reminders_without_dialog(now)
+        await self._transaction_manager.commit()
+
+        async for buyers in self._buyer_gateway.iter_buyers_with_due_reminder(now, INACTIVE_REMINDERS_PAGE_SIZE):
+            reminders: list[tuple[Buyer, str]] = []
+            # Заявкам без незавершённого шага не о чем напоминать, пока они снова не изменятся
+            completed_ids: list[int] = []
+            for buyer in buyers:
+                if text := _get_reminder_text(buyer):
+                    reminders.append((buyer, text))
+                else:
+                    completed_ids.append(buyer.id)
+
+            # Сессия БД не поддерживает параллельные запросы, поэтому кабинеты загружаем до отправки
+            for buyer, _ in reminders:
+                if buyer.cabinet_id not in business_connection_ids:
+                    cabinet = await self._cabinet_gateway.get_cabinet_by_id(buyer.cabinet_id)
+                    business_connection_ids[buyer.cabinet_id] = cabinet.business_connection_id if cabinet else None
+
+            # Напоминания уступают лимит Telegram ответам в живых диалогах
+            with broadcast():
+                reminded = await asyncio.gather(
+                    *(
+                        self._send_reminder(buyer, text, business_connection_ids[buyer.cabinet_id])
+                        for buyer, text in reminders
+                    )
+                )
 
-        for buyer in buyers:
-            reminder_text = _get_reminder_text(buyer)
-            if not reminder_text:
-                continue
+            reminded_ids = []
+            failed_ids = []
+            for (buyer, _), is_reminded in zip(reminders, reminded, strict=True):
+                (reminded_ids if is_reminded else failed_ids).append(buyer.id)
 
-            cabinet = await self._cabinet_gateway.get_cabinet_by_id(buyer.cabinet_id)
-            business_connection_id = cabinet.business_connection_id if cabinet else None
+            if reminded_ids:
+                await self._buyer_gateway.touch_buyers(reminded_ids)
+            if failed_ids:
+                retry_at = datetime.now(UTC) + timedelta(seconds=INACTIVE_REMINDER_RETRY_DELAY)
+                await self._buyer_gateway.reschedule_reminders(failed_ids, retry_at)
+            if completed_ids:
+                await self._buyer_gateway.reschedule_reminders(completed_ids, None)
 
+            await self._transaction_manager.commit()
+
+    async def _send_reminder(self, buyer: Buyer, text: str, business_connection_id: str | None) -> bool:
+        """Отправляет напоминание, возвращает False, если его нужно повторить в следующий раз."""
+        async with self._semaphore:
             try:
                 await self._bot.send_message(
                     chat_id=buyer.telegram_id,
-                    text=reminder_text,
+                    text=text,
                     business_connection_id=business_connection_id,
                 )
                 logger.info("sent reminder to buyer_id=%s, telegram_id=%s", buyer.id, buyer.telegram_id)
@@ -50,10 +95,9 @@ class ObserveInactiveReminders:
                 logger.warning("user blocked bot: buyer_id=%s, telegram_id=%s", buyer.id, buyer.telegram_id)
             except Exception:
                 logger.exception("failed to send reminder to buyer_id=%s", buyer.id)
-                continue
+                return False
 
-            buyer.updated_at = datetime.now(UTC)
-            await self._transaction_manager.commit()
+            return True
 
 
 def _get_reminder_text(buyer: Buyer) -> str | None:  # noqa: PLR0911
@@ -0,0 +1,188 @@
+import logging
+from datetime import UTC, datetime, timedelta
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.types import URLInputFile
+
+from axiomai.constants import (
+    SUPERBANKING_PAYOUT_MAX_ATTEMPTS,
+    SUPERBANKING_PAYOUT_RETRY_BASE_DELAY,
+    SUPERBANKING_PAYOUT_RETRY_MAX_DELAY,
+    TIME_SLEEP_BEFORE_CONFIRM_PAYMENT,
+    WB_CHANNEL_NAME,
+)
+from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
+from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
+from axiomai.infrastructure.database.gateways.superbanking_payout import SuperbankingPayoutGateway
+from axiomai.infrastructure.database.models.superbanking import SuperbankingPayout, SuperbankingPayoutStatus
+from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.superbanking import Superbanking
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
+
+logger = logging.getLogger(__name__)
+
+_LAST_ERROR_MAX_LENGTH = 512
+_CHANNEL_LINK_TEXT = f"Подписывайтесь на наш канал {WB_CHANNEL_NAME} , там будет много интересных товаров"
+
+
+class ProcessSuperbankingPayout:
+    """
+    Проводит выплату Superbanking по статусам, сохраняя каждый шаг.
+
+    created → signed: перевод создаётся и подписывается, покупатели отмечаются оплаченными.
+    signed → confirmed: через TIME_SLEEP_BEFORE_CONFIRM_PAYMENT запрашивается чек.
+    confirmed → receipt_sent: чек отправляется покупателю.
+
+    Запросы к Superbanking идемпотентны по order_number, поэтому шаг, прерванный падением процесса,
+    безопасно повторить. Ошибка шага откладывает выплату с экспоненциальной задержкой; после
+    SUPERBANKING_PAYOUT_MAX_ATTEMPTS попыток выплата помечается failed, а неподписанная — возвращает
+    деньги на баланс кабинета.
+    """
+
+    def __init__(  # noqa: PLR0917
+        self,
+        buyer_gateway: BuyerGateway,
+        cabinet_gateway: CabinetGateway,
+        superbanking_payout_gateway: SuperbankingPayoutGateway,
+        transaction_manager: TransactionManager,
+        superbanking: Superbanking,
+        sync_events: SyncEvents,
+        bot: Bot,
+    ) -> None:
+        self._buyer_gateway = buyer_gateway
+        self._cabinet_gateway = cabinet_gateway
+        self._superbanking_payout_gateway = superbanking_payout_gateway
+        self._transaction_manager = transaction_manager
+        self._superbanking = superbanking
+        self._sync_events = sync_events
+        self._bot = bot
+
+    async def execute(self, payout_id: int) -> None:
+        payout = await self._superbanking_payout_gateway.get_payout_by_id(payout_id)
+        if not payout:
+            logger.warning("superbanking payout %s not found", payout_id)
+            return
+
+        try:
+            if payout.status == SuperbankingPayoutStatus.CREATED:
+                await self._sign(payout)
+                # Чек появляется не сразу после подписания
+                return
+            if payout.status == SuperbankingPayoutStatus.SIGNED:
+                await self._confirm(payout)
+            if payout.status == SuperbankingPayoutStatus.CONFIRMED:
+                await self._send_receipt(payout)
+        except Exception as e:
+            logger.exception("superbanking payout %s failed on %s", payout.order_number, payout.status.value)
+            await self._on_error(payout, e)
+
+    async def _sign(self, payout: SuperbankingPayout) -> None:
+        if not payout.cabinet_transaction_id:
+            payout.cabinet_transaction_id = await self._superbanking.create_payment(
+                phone_number=payout.phone_number,
+                bank_name_rus=payout.bank,
+                amount=payout.amount,
+                order_number=payout.order_number,
+            )
+            await self._transaction_manager.commit()
+
+        await self._superbanking.sign_payment(
+            cabinet_transaction_id=payout.cabinet_transaction_id, order_number=payout.order_number
+        )
+
+        # успешно выплатили юзеру деньги через superbanking_api - ставим buyer.is_superbanking_paid = True
+        if payout.cabinet_id:
+            buyers = await self._buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(
+                payout.telegram_id, payout.cabinet_id
+            )
+            for buyer in buyers:
+                if buyer.nm_id in payout.nm_ids:
+                    buyer.is_superbanking_paid = True
+                    buyer.is_paid_manually = True
+
+        self._advance(payout, SuperbankingPayoutStatus.SIGNED, delay=TIME_SLEEP_BEFORE_CONFIRM_PAYMENT)
+        await self._transaction_manager.commit()
+        logger.info("superbanking payout %s signed", payout.order_number)
+
+        if payout.cabinet_id:
+            await self._sync_events.publish(SyncEventType.DIRTY_TABLE, payout.cabinet_id)
+            await self._sync_events.publish(SyncEventType.DIRTY_CABINET, payout.cabinet_id)
+
+    async def _confirm(self, payout: SuperbankingPayout) -> None:
+        payout.receipt_url = await self._superbanking.confirm_operation(order_number=payout.order_number)
+        self._advance(payout, SuperbankingPayoutStatus.CONFIRMED)
+        await self._transaction_manager.commit()
+
+    async def _send_receipt(self, payout: SuperbankingPayout) -> None:
+        try:
+            await self._bot.send_document(
+                chat_id=payout.telegram_id,
+                document=URLInputFile(payout.receipt_url, filename="Чек.pdf"),
+                caption="Чек по выплате",
+                business_connection_id=payout.business_connection_id,
+            )
+            # отправляем ссылку на канал после чека в самом конце сценария
+            await self._send_channel_link(payout)
+        except TelegramForbiddenError:
+            logger.warning("user blocked bot, receipt is not sent: order_number=%s", payout.order_number)
+
+        self._advance(payout, SuperbankingPayoutStatus.RECEIPT_SENT)
+        payout.next_attempt_at = None
+        await self._transaction_manager.commit()
+        logger.info("superbanking payout %s receipt sent", payout.order_number)
+
+    async def _on_error(self, payout: SuperbankingPayout, error: Exception) -> None:
+        status = payout.status
+        payout.attempts += 1
+        payout.last_error = f"{type(error).__name__}: {error}"[:_LAST_ERROR_MAX_LENGTH]
+
+        if payout.attempts < SUPERBANKING_PAYOUT_MAX_ATTEMPTS:
+            payout.next_attempt_at = datetime.now(UTC) + timedelta(seconds=retry_delay(payout.attempts))
+            await self._transaction_manager.commit()
+            # Как и раньше, о задержке чека покупатель узнаёт сразу, а не после всех попыток
+            if status == SuperbankingPayoutStatus.SIGNED and payout.attempts == 1:
+                await self._notify(payout, "Чек будет доступен чуть позже. Мы пришлём его дополнительно.")
+            return
+
+        payout.status = SuperbankingPayoutStatus.FAILED
+        payout.next_attempt_at = None
+        if status == SuperbankingPayoutStatus.CREATED and payout.cabinet_id and payout.charge:
+            # Неподписанная выплата не проведена — возвращаем зарезервированные деньги
+            await self._cabinet_gateway.credit_balance(payout.cabinet_id, payout.charge, reference=payout.order_number)
+        await self._transaction_manager.commit()
+        logger.error("superbanking payout %s failed after %s attempts", payout.order_number, payout.attempts)
+
+        if status == SuperbankingPayoutStatus.CREATED:
+            if payout.cabinet_id:
+                await self._sync_events.publish(SyncEventType.DIRTY_CABINET, payout.cabinet_id)
+            await self._notify(payout, "Не удалось отправить выплату. Мы свяжемся с вами.")
+            await self._notify(payout, _CHANNEL_LINK_TEXT)
+
+    def _advance(self, payout: SuperbankingPayout, status: SuperbankingPayoutStatus, delay: int = 0) -> None:
+        payout.status = status
+        payout.attempts = 0
+        payout.last_error = None
+        payout.next_attempt_at = datetime.now(UTC) + timedelta(seconds=delay)
+
+    async def _send_channel_link(self, payout: SuperbankingPayout) -> None:
+        await self._bot.send_message(
+            chat_id=payout.telegram_id,
+            text=_CHANNEL_LINK_TEXT,
+            business_connection_id=payout.business_connection_id,
+        )
+
+    async def _notify(self, payout: SuperbankingPayout, text: str) -> None:
+        try:
+            await self._bot.send_message(
+                chat_id=payout.telegram_id,
+                text=text,
+                business_connection_id=payout.business_connection_id,
+            )
+        except Exception:
+            logger.exception("failed to notify buyer about payout %s", payout.order_number)
+
+
+def retry_delay(attempts: int) -> int:
+    """Задержка перед следующей попыткой после ``attempts`` неудачных."""
+    return min(SUPERBANKING_PAYOUT_RETRY_BASE_DELAY * 2 ** (attempts - 1), SUPERBANKING_PAYOUT_RETRY_MAX_DELAY)
@@ -10,6 +10,7 @@ from axiomai.infrastructure.database.gateways.payment import PaymentGateway
 from axiomai.infrastructure.database.gateways.user import UserGateway
 from axiomai.infrastructure.database.models.payment import PaymentStatus
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
 from axiomai.infrastructure.telegram.keyboards.reply import get_kb_menu
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,7 @@ class ConfirmRefillBalancePayment:
         cashback_table_gateway: CashbackTableGateway,
         user_gateway: UserGateway,
         bot: Bot,
+        sync_events: SyncEvents,
     ) -> None:
         self._tm = tm
         self._payment_gateway = payment_gateway
@@ -31,6 +33,7 @@ class ConfirmRefillBalancePayment:
         self._cashback_table_gateway = cashback_table_gateway
         self._user_gateway = user_gateway
         self._bot = bot
+        self._sync_events = sync_events
 
     async def execute(self, admin_telegram_id: int, payment_id: int) -> None:
         payment = await self._payment_gateway.get_payment_by_id(payment_id)
@@ -49,10 +52,10 @@ class ConfirmRefillBalancePayment:
             )
 
         payment.status = PaymentStatus.SUCCEEDED
-        cabinet.balance += payment.amount
-        cabinet.initial_balance = cabinet.balance
+        await self._cabinet_gateway.refill_balance(cabinet.id, payment.amount, reference=f"payment:{payment.id}")
 
         await self._tm.commit()
+        await self._sync_events.publish(SyncEventType.DIRTY_CABINET, cabinet.id)
 
         logger.info("refill balance payment %s confirmed by admin %s", payment_id, admin_telegram_id)
 
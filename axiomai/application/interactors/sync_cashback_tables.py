@@ -1,10 +1,17 @@
 import datetime
 import logging
 
+from axiomai.application.dto import CashbackArticle as CashbackArticleDTO
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
-from axiomai.infrastructure.database.models.cashback_table import CashbackArticle
+from axiomai.infrastructure.database.gateways.chat_message import ChatMessageGateway
+from axiomai.infrastructure.database.models.cashback_table import (
+    ACTIVE_CASHBACK_TABLE_STATUSES,
+    CashbackArticle,
+    CashbackTable,
+)
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
 from axiomai.infrastructure.google_sheets import GoogleSheetsGateway
 
@@ -16,73 +23,110 @@ class SyncCashbackTables:
         self,
         cashback_table_gateway: CashbackTableGateway,
         buyer_gateway: BuyerGateway,
+        chat_message_gateway: ChatMessageGateway,
         cabinet_gateway: CabinetGateway,
         google_sheets_gateway: GoogleSheetsGateway,
         transaction_manager: TransactionManager,
+        cabinet_snapshot_cache: CabinetSnapshotCache,
     ) -> None:
         self._cashback_table_gateway = cashback_table_gateway
         self._buyer_gateway = buyer_gateway
+        self._chat_message_gateway = chat_message_gateway
         self._cabinet_gateway = cabinet_gateway
         self._google_sheets_gateway = google_sheets_gateway
         self._transaction_manager = transaction_manager
+        self._cabinet_snapshot_cache = cabinet_snapshot_cache
 
     async def execute(self) -> None:
         tables = await self._cashback_table_gateway.get_active_cashback_tables()
 
         for table in tables:
-            try:
-                articles_dto = await self._google_sheets_gateway.get_cashback_articles(table.table_id)
-            except Exception as e:
-                logger.exception("failed to fetch articles from table %s", table.table_id, exc_info=e)
-                continue
-
-            existing_articles = await self._cashback_table_gateway.get_articles_by_cabinet_id(table.cabinet_id)
-            existing_by_nm_id = {a.nm_id: a for a in existing_articles}
-            new_nm_ids = {dto.nm_id for dto in articles_dto}
-
-            # Update existing and create new
-            for dto in articles_dto:
-                if dto.nm_id in existing_by_nm_id:
-                    article = existing_by_nm_id[dto.nm_id]
-                    article.title = dto.title
-                    article.image_url = dto.image_url
-                    article.brand_name = dto.brand_name
-                    article.instruction_text = dto.instruction_text
-                    article.in_stock = dto.in_stock
-                    article.is_deleted = False
-                else:
-                    new_article = CashbackArticle(
-                        cabinet_id=table.cabinet_id,
-                        nm_id=dto.nm_id,
-                        title=dto.title,
-                        image_url=dto.image_url,
-                        brand_name=dto.brand_name,
-                        instruction_text=dto.instruction_text,
-                        in_stock=dto.in_stock,
-                    )
-                    await self._cashback_table_gateway.create_article(new_article)
-
-            # Mark deleted, removed from sheet
-            for nm_id, article in existing_by_nm_id.items():
-                if nm_id not in new_nm_ids:
-                    article.is_deleted = True
-
-            # Sync buyers to Google Sheets
-            try:
-                buyers = await self._buyer_gateway.get_buyers_by_cabinet_id(table.cabinet_id)
-                await self._google_sheets_gateway.sync_buyers_to_sheet(table.table_id, buyers)
-            except Exception as e:
-                logger.exception("failed to sync buyers to table.id =  %s", table.table_id, exc_info=e)
-
-            # Update settings sheet with leads balance and update time
-            try:
-                cabinet = await self._cabinet_gateway.get_cabinet_by_id(table.cabinet_id)
-                if cabinet:
-                    now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=3)))  # MSK timezone
-                    updated_at = now.strftime("%Y-%m-%d %H:%M:%S")
-                    await self._google_sheets_gateway.update_settings(table.table_id, cabinet.leads_balance, updated_at)
-            except Exception as e:
-                logger.exception("failed to update settings sheet %s", table.table_id, exc_info=e)
-
-            table.last_synced_at = datetime.datetime.now(datetime.UTC)
-            await self._transaction_manager.commit()
+            await self._sync_table(table)
+
+    async def execute_for_table(self, cashback_table_id: int) -> None:
+        """Синхронизация одной таблицы. Используется конвейером observer'а, каждая таблица — в своей сессии."""
+        table = await self._cashback_table_gateway.get_cashback_table_by_id(cashback_table_id)
+        if not table or table.status not in ACTIVE_CASHBACK_TABLE_STATUSES:
+            return
+
+        await self._sync_table(table)
+
+    async def _sync_table(self, table: CashbackTable) -> None:
+        try:
+            table_sheets = await self._google_sheets_gateway.read_cashback_table(table.table_id)
+        except Exception as e:
+            logger.exception("failed to fetch articles from table %s", table.table_id, exc_info=e)
+            return
+
+        articles_changed = await self._sync_articles(table.cabinet_id, table_sheets.articles)
+
+        # Buyers and settings sheet (leads balance and update time) in one write
+        try:
+            buyers = await self._buyer_gateway.get_buyers_by_cabinet_id(table.cabinet_id)
+            chat_summaries = await self._chat_message_gateway.get_chat_summaries_by_cabinet_id(table.cabinet_id)
+            cabinet = await self._cabinet_gateway.get_cabinet_by_id(table.cabinet_id)
+            now = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=3)))  # MSK timezone
+            updated_at = now.strftime("%Y-%m-%d %H:%M:%S")
+            await self._google_sheets_gateway.write_cashback_table(
+                table_sheets, buyers, chat_summaries, cabinet.leads_balance if cabinet else None, updated_at
+            )
+        except Exception as e:
+            logger.exception("failed to write buyers and settings to table.id = %s", table.table_id, exc_info=e)
+
+        table.last_synced_at = datetime.datetime.now(datetime.UTC)
+        await self._transaction_manager.commit()
+
+        if articles_changed:
+            await self._cabinet_snapshot_cache.invalidate(table.cabinet_id)
+
+    async def _sync_articles(self, cabinet_id: int, articles_dto: list[CashbackArticleDTO]) -> bool:
+        """Синхронизирует артикулы кабинета с таблицей. Возвращает True, если каталог изменился."""
+        existing_articles = await self._cashback_table_gateway.get_articles_by_cabinet_id(cabinet_id)
+        existing_by_nm_id = {a.nm_id: a for a in existing_articles}
+        new_nm_ids = {dto.nm_id for dto in articles_dto}
+
+        # Update existing and create new
+        articles_changed = False
+        for dto in articles_dto:
+            if dto.nm_id in existing_by_nm_id:
+                article = existing_by_nm_id[dto.nm_id]
+                articles_changed |= _update_article(article, dto)
+            else:
+                new_article = CashbackArticle(
+                    cabinet_id=cabinet_id,
+                    nm_id=dto.nm_id,
+                    title=dto.title,
+                    image_url=dto.image_url,
+                    brand_name=dto.brand_name,
+                    instruction_text=dto.instruction_text,
+                    in_stock=dto.in_stock,
+                )
+                await self._cashback_table_gateway.create_article(new_article)
+                articles_changed = True
+
+        # Mark deleted, removed from sheet
+        for nm_id, article in existing_by_nm_id.items():
+            if nm_id not in new_nm_ids and not article.is_deleted:
+                article.is_deleted = True
+                articles_changed = True
+
+        return articles_changed
+
+
+def _update_article(article: CashbackArticle, dto: CashbackArticleDTO) -> bool:
+    """Обновляет артикул данными из таблицы. Возвращает True, если что-то изменилось."""
+    new_values = {
+        "title": dto.title,
+        "image_url": dto.image_url,
+        "brand_name": dto.brand_name,
+        "instruction_text": dto.instruction_text,
+        "in_stock": dto.in_stock,
+        "is_deleted": False,
+    }
+    changed = False
+    for field, value in new_values.items():
+        if getattr(article, field) != value:
+            setattr(article, field, value)
+            changed = True
+
+    return changed
@@ -13,13 +13,33 @@ class SuperbankingConfig(BaseModel):
 
 class MessageDebouncerConfig(BaseModel):
     message_debounce_delay: int = Field(alias="MESSAGE_DEBOUNCE_DELAY", default=10)
+    adaptive_debounce: bool = Field(alias="MESSAGE_DEBOUNCE_ADAPTIVE", default=True)
+    min_debounce_delay: float = Field(alias="MESSAGE_DEBOUNCE_MIN_DELAY", default=3)
+    terminal_debounce_delay: float = Field(alias="MESSAGE_DEBOUNCE_TERMINAL_DELAY", default=1.5)
     message_accumulation_ttl: int = Field(alias="MESSAGE_ACCUMULATION_TTL", default=300)
     immediate_processing_length: int = Field(alias="IMMEDIATE_PROCESSING_LENGTH", default=500)
+    use_redis_scheduler: bool = Field(alias="MESSAGE_DEBOUNCER_REDIS_SCHEDULER", default=False)
+    scheduler_poll_interval: float = Field(alias="MESSAGE_DEBOUNCER_POLL_INTERVAL", default=0.5)
+    scheduler_claim_ttl: int = Field(alias="MESSAGE_DEBOUNCER_CLAIM_TTL", default=120)
 
 
 class OpenAIConfig(BaseModel):
     openai_api_key: str = Field(alias="OPENAI_TOKEN")
     proxy: str = Field(alias="PROXY")
+    # Бюджеты одной реплики: при нескольких репликах лимиты аккаунта делятся между ними
+    requests_per_minute: int = Field(alias="OPENAI_REQUESTS_PER_MINUTE", default=500)
+    tokens_per_minute: int = Field(alias="OPENAI_TOKENS_PER_MINUTE", default=500_000)
+    max_concurrency: int = Field(alias="OPENAI_MAX_CONCURRENCY", default=20)
+
+
+class WebhookConfig(BaseModel):
+    # Без WEBHOOK_URL бот получает апдейты long polling'ом
+    webhook_url: str | None = Field(alias="WEBHOOK_URL", default=None)
+    webhook_secret: str | None = Field(alias="WEBHOOK_SECRET", default=None)
+    webhook_path: str = Field(alias="WEBHOOK_PATH", default="/telegram/webhook")
+    webhook_port: int = Field(alias="WEBHOOK_PORT", default=8080)
+    # Должно совпадать у приёмника и воркеров
+    update_partitions: int = Field(alias="TELEGRAM_UPDATE_PARTITIONS", default=64)
 
 
 class Config(BaseModel):
@@ -29,6 +49,7 @@ class Config(BaseModel):
     bot_token: str = Field(alias="BOT_TOKEN")
     service_account_axiomai: str = Field(alias="SERVICE_ACCOUNT_AXIOMAI")
     service_account_axiomai_email: str = Field(alias="SERVICE_ACCOUNT_AXIOMAI_EMAIL")
+    google_discovery_cache_dir: str | None = Field(alias="GOOGLE_DISCOVERY_CACHE_DIR", default=None)
 
     admin_telegram_ids: list[int] = Field(
         default_factory=lambda: [int(x) for x in os.getenv("ADMIN_TELEGRAM_IDS", "694144143,547299317").split(",")],
@@ -36,10 +57,12 @@ class Config(BaseModel):
     admin_username: str = Field(alias="ADMIN_USERNAME", default="@noobmaster_rus")
 
     delay_between_bot_messages: float = Field(alias="DELAY_BETWEEN_BOT_MESSAGES", default=2.25)
+    use_sync_events: bool = Field(alias="OBSERVER_SYNC_EVENTS", default=False)
 
     message_debouncer: MessageDebouncerConfig = Field(default_factory=lambda: MessageDebouncerConfig(**environ))
     superbankink_config: SuperbankingConfig = Field(default_factory=lambda: SuperbankingConfig(**environ))
     openai_config: OpenAIConfig = Field(default_factory=lambda: OpenAIConfig(**environ))
+    webhook: WebhookConfig = Field(default_factory=lambda: WebhookConfig(**environ))
 
 
 def load_config[ConfigType](
@@ -3,6 +3,14 @@ import re
 # Telegram
 WB_CHANNEL_NAME = "@best_wb_hits"
 OWNER_TELEGRAM_ID = 694144143
+BUSINESS_CONNECTION_CACHE_TTL = 24 * 3600  # секунды, Redis
+BUSINESS_CONNECTION_LOCAL_CACHE_TTL = 60  # секунды, память процесса
+CABINET_SNAPSHOT_CACHE_TTL = 300  # секунды, память процесса
+INACTIVE_REMINDER_DELAY = 48 * 3600  # секунды без активности покупателя до напоминания
+INACTIVE_REMINDER_RETRY_DELAY = 3600  # секунды до повтора напоминания, которое не удалось отправить
+INACTIVE_REMINDERS_INTERVAL = 60  # секунды между проверками наступивших напоминаний
+INACTIVE_REMINDERS_PAGE_SIZE = 500  # заявок загружается за один запрос
+INACTIVE_REMINDERS_CONCURRENCY = 10  # напоминаний отправляется одновременно
 
 # Superbanking
 SUPERBANKING_ORDER_PREFIX = "payment-"
@@ -12,9 +20,32 @@ TIME_SLEEP_BEFORE_CONFIRM_PAYMENT = 10
 URL_CONFIRM_PAYMENT = "https://api.superbanking.ru/cabinet/confirmOperation/createOne?v=1.0.0"
 SUPERBANKING_COMMISSION = 25
 AXIOMAI_COMMISSION = 5
+SUPERBANKING_PAYOUTS_INTERVAL = 5  # секунд между проверками очереди выплат
+SUPERBANKING_PAYOUTS_CONCURRENCY = 5  # выплат обрабатывается одновременно
+SUPERBANKING_PAYOUT_LEASE = 180  # секунд, после которых выплата упавшего воркера снова берётся в работу
+SUPERBANKING_PAYOUT_TIMEOUT = 90  # секунд на обработку выплаты, меньше SUPERBANKING_PAYOUT_LEASE
+SUPERBANKING_PAYOUT_MAX_ATTEMPTS = 8
+SUPERBANKING_PAYOUT_RETRY_BASE_DELAY = 15  # секунд, удваивается с каждой попыткой
+SUPERBANKING_PAYOUT_RETRY_MAX_DELAY = 15 * 60
 
 # Google Sheets
 GOOGLE_SHEETS_TEMPLATE_URL = "https://docs.google.com/spreadsheets/d/1KdSieYIl40NmbK8DBCfL2VJNbDFuK_ydJFirnT_XVkY/edit?gid=1585191033#gid=1585191033"
+SYNC_CASHBACK_TABLES_INTERVAL = 10  # секунды между запусками синхронизации
+SYNC_CASHBACK_TABLES_CONCURRENCY = 8  # таблиц синхронизируются одновременно
+SYNC_CASHBACK_TABLE_TIMEOUT = 120  # секунды на синхронизацию одной таблицы
+SHEETS_FULL_REWRITE_INTERVAL = 600  # секунды, после которых лист "Покупатели" перезаписывается целиком
+SHEETS_SETTINGS_REFRESH_INTERVAL = 60  # секунды, не реже которых обновляется время на листе "Настройка"
+GOOGLE_DISCOVERY_CACHE_TTL = 7 * 24 * 3600  # секунды, discovery-документы Google API на диске
+SYNC_RECONCILE_INTERVAL = 300  # секунды между полными проходами observer'а в режиме событий
+SYNC_EVENTS_STREAM_MAXLEN = 10000  # событий в Redis stream, старые вытесняются
+SYNC_EVENTS_BATCH_SIZE = 100  # событий за одно чтение
+SYNC_EVENTS_BLOCK_TIMEOUT = 5000  # мс ожидания новых событий
+SYNC_EVENTS_CLAIM_IDLE = 300_000  # мс, после которых неподтверждённые события обрабатываются повторно
+TELEGRAM_UPDATES_STREAM_MAXLEN = 10000  # апдейтов в Redis stream одной партиции, старые вытесняются
+TELEGRAM_UPDATES_BATCH_SIZE = 20  # апдейтов за одно чтение партиции
+TELEGRAM_UPDATES_BLOCK_TIMEOUT = 1000  # мс ожидания новых апдейтов
+TELEGRAM_UPDATES_LEASE_TTL = 30  # секунды, через которые партиция упавшего воркера достанется другому
+TELEGRAM_UPDATES_REBALANCE_INTERVAL = 5  # секунды между продлением аренды и перераспределением партиций
 
 # Платежи
 PRICE_PER_LEAD = 20  # ₽/лид
@@ -42,3 +73,24 @@ MODEL_NAME = "gpt-5.2"
 GPT_MAX_OUTPUT_TOKENS = 110
 GPT_MAX_OUTPUT_TOKENS_PHOTO_ANALYSIS = 800
 GPT_REASONING = "high"  # "low" | "medium" | "high"
+SCREENSHOT_VERDICT_CACHE_TTL = 24 * 3600  # секунды
+SCREENSHOT_VERDICT_CACHE_MAX_SIZE = 10_000  # записей
+OPENAI_MAX_RETRIES = 3  # повторов при 429, 5xx и сетевых ошибках
+OPENAI_RETRY_BASE_DELAY = 1  # секунды, удваивается с каждым повтором
+OPENAI_RETRY_MAX_DELAY = 20  # секунды
+OPENAI_IMAGE_TOKENS = 1000  # оценка токенов на одну картинку для TPM-бюджета
+OPENAI_TEXT_QUEUE_LIMIT = 200  # ответов клиентам ждут слота одновременно
+OPENAI_TEXT_QUEUE_TIMEOUT = 45  # секунды ожидания слота для ответа клиенту
+OPENAI_PHOTO_QUEUE_LIMIT = 50  # классификаций фото ждут слота одновременно
+OPENAI_PHOTO_QUEUE_TIMEOUT = 90  # секунды ожидания слота для классификации фото
+PHOTO_MIN_SHORT_SIDE = 768  # пикселей по короткой стороне: до стольких модель всё равно уменьшает фото
+PHOTO_CACHE_SIZE = 32  # последних скачанных фото в памяти процесса
+
+# Исходящие сообщения Telegram
+TELEGRAM_GLOBAL_RATE = 30  # сообщений в секунду на бота — лимит Telegram
+TELEGRAM_BROADCAST_RATE = 10  # сообщений в секунду на рассылки, остальной бюджет — живым диалогам
+TELEGRAM_CHAT_RATE = 1  # сообщений в секунду в один чат
+TELEGRAM_CHAT_BURST = 3  # сообщений подряд в один чат без ожидания
+TELEGRAM_CHAT_CACHE_SIZE = 10_000  # чатов, для которых помним бюджет
+TELEGRAM_TYPING_TTL = 4  # секунды: Telegram показывает "печатает" 5 секунд, повторять чаще незачем
+TELEGRAM_SEND_MAX_RETRIES = 3  # повторов отправки после 429 с retry_after
@@ -0,0 +1,59 @@
+import logging
+import time
+
+from redis.asyncio import Redis
+
+from axiomai.constants import BUSINESS_CONNECTION_CACHE_TTL, BUSINESS_CONNECTION_LOCAL_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "business_connection_owner"
+
+
+class BusinessConnectionCache:
+    """
+    Кеш владельцев бизнес-подключений: business_connection_id -> telegram id владельца.
+
+    Заполняется из апдейтов business_connection и при промахе фильтра, сбрасывается при отключении.
+    Поверх Redis держится короткий кеш в памяти процесса, чтобы фильтры роутеров не ходили в сеть на каждое сообщение.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._ttl_seconds = BUSINESS_CONNECTION_CACHE_TTL
+        self._local_ttl_seconds = BUSINESS_CONNECTION_LOCAL_CACHE_TTL
+        self._local: dict[str, tuple[int, float]] = {}
+
+    async def get(self, business_connection_id: str) -> int | None:
+        local = self._local.get(business_connection_id)
+        if local and local[1] > time.monotonic():
+            return local[0]
+
+        data = await self._redis.get(_get_key(business_connection_id))
+        if not data:
+            return None
+
+        try:
+            owner_id = int(data)
+        except ValueError:
+            logger.warning("broken business connection owner in cache, business connection %s", business_connection_id)
+            await self._redis.delete(_get_key(business_connection_id))
+            return None
+
+        self._set_local(business_connection_id, owner_id)
+        return owner_id
+
+    async def set(self, business_connection_id: str, owner_id: int) -> None:
+        self._set_local(business_connection_id, owner_id)
+        await self._redis.setex(_get_key(business_connection_id), self._ttl_seconds, str(owner_id))
+
+    async def delete(self, business_connection_id: str) -> None:
+        self._local.pop(business_connection_id, None)
+        await self._redis.delete(_get_key(business_connection_id))
+
+    def _set_local(self, business_connection_id: str, owner_id: int) -> None:
+        self._local[business_connection_id] = (owner_id, time.monotonic() + self._local_ttl_seconds)
+
+
+def _get_key(business_connection_id: str) -> str:
+    return f"{_KEY_PREFIX}:{business_connection_id}"
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from redis.asyncio import Redis
+
+from axiomai.application.dto import CabinetSnapshot
+from axiomai.constants import CABINET_SNAPSHOT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+_INVALIDATION_CHANNEL = "cabinet_snapshot:invalidate"
+_RESUBSCRIBE_DELAY = 5
+
+
+class CabinetSnapshotCache:
+    """
+    Read-through кеш снимков кабинета с каталогом артикулов, ключ — business_connection_id.
+
+    Снимки живут в памяти процесса. При изменении кабинета или его артикулов вызывается ``invalidate``:
+    локальная запись удаляется сразу, остальные процессы узнают об этом через Redis pub/sub (``listen``).
+    TTL ограничивает устаревание, если сообщение об инвалидации потерялось.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._ttl_seconds = CABINET_SNAPSHOT_CACHE_TTL
+        self._snapshots: dict[str, tuple[CabinetSnapshot, float]] = {}
+        # Увеличивается при каждой инвалидации, чтобы не сохранить снимок, загруженный до изменения
+        self._generation = 0
+
+    async def get_or_load(
+        self,
+        business_connection_id: str,
+        loader: Callable[[str], Awaitable[CabinetSnapshot | None]],
+    ) -> CabinetSnapshot | None:
+        cached = self._snapshots.get(business_connection_id)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        generation = self._generation
+        snapshot = await loader(business_connection_id)
+        if snapshot and generation == self._generation:
+            self._snapshots[business_connection_id] = (snapshot, time.monotonic() + self._ttl_seconds)
+
+        return snapshot
+
+    async def invalidate(self, cabinet_id: int) -> None:
+        self._drop(cabinet_id)
+        await self._redis.publish(_INVALIDATION_CHANNEL, cabinet_id)
+
+    async def listen(self) -> None:
+        """Слушает инвалидации от других процессов. Запускается фоновой задачей."""
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(_INVALIDATION_CHANNEL)
+                # Пока не были подписаны, могли пропустить инвалидации
+                self._clear()
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._drop(int(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("cabinet snapshot invalidation listener failed", exc_info=e)
+                await asyncio.sleep(_RESUBSCRIBE_DELAY)
+            finally:
+                await pubsub.aclose()
+
+    def _drop(self, cabinet_id: int) -> None:
+        self._generation += 1
+        self._snapshots = {
+            business_connection_id: cached
+            for business_connection_id, cached in self._snapshots.items()
+            if cached[0].id != cabinet_id
+        }
+
+    def _clear(self) -> None:
+        self._generation += 1
+        self._snapshots.clear()
@@ -5,6 +5,7 @@ from dishka import AsyncContainer
 from redis.asyncio import Redis
 
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
+from axiomai.infrastructure.database.gateways.chat_message import ChatMessageGateway
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
 
 MAX_CHAT_HISTORY = 10
@@ -13,42 +14,49 @@ PREDIALOG_TTL_SECONDS = 3600  # 1 hour
 
 async def add_to_chat_history(
     di_container: AsyncContainer, telegram_id: int, cabinet_id: int, user_message: str, assistant_response: str
-) -> list[dict]:
+) -> None:
+    """Сохраняет реплику диалога; пока покупатель переписывается с ботом, напоминания по его заявкам откладываются."""
     async with di_container() as r_container:
+        chat_message_gateway = await r_container.get(ChatMessageGateway)
         buyer_gateway = await r_container.get(BuyerGateway)
         transaction_manager = await r_container.get(TransactionManager)
-        buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(telegram_id, cabinet_id)
-
-        chat_history = max(
-            (list(b.chat_history) for b in buyers if b.chat_history),
-            key=len,
-            default=[],
-        )
-        chat_history.append(
-            {
-                "user": user_message,
-                "assistant": assistant_response,
-                "created_at": datetime.now(UTC).isoformat(),
-            }
-        )
-        chat_history = chat_history[-MAX_CHAT_HISTORY:]
-
-        for buyer in buyers:
-            buyer.chat_history = chat_history
 
+        await chat_message_gateway.add_chat_message(cabinet_id, telegram_id, user_message, assistant_response)
+        await buyer_gateway.touch_active_buyers(telegram_id, cabinet_id)
         await transaction_manager.commit()
 
-        return chat_history
 
+async def get_chat_history(di_container: AsyncContainer, telegram_id: int, cabinet_id: int) -> list[dict]:
+    async with di_container() as r_container:
+        chat_message_gateway = await r_container.get(ChatMessageGateway)
+        chat_messages = await chat_message_gateway.get_last_chat_messages(cabinet_id, telegram_id, MAX_CHAT_HISTORY)
 
+        return [
+            {
+                "user": chat_message.user_message,
+                "assistant": chat_message.assistant_message,
+                "created_at": chat_message.created_at.isoformat(),
+            }
+            for chat_message in chat_messages
+        ]
 
-async def get_chat_history(di_container: AsyncContainer, telegram_id: int, cabinet_id: int) -> list[dict]:
+
+async def save_predialog_chat_history(
+    di_container: AsyncContainer, telegram_id: int, cabinet_id: int, history: list[dict[str, str]]
+) -> None:
+    """Переносит pre-dialog историю из Redis в историю чата кабинета, когда покупатель выбрал товар."""
     async with di_container() as r_container:
+        chat_message_gateway = await r_container.get(ChatMessageGateway)
         buyer_gateway = await r_container.get(BuyerGateway)
-        buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(telegram_id, cabinet_id)
-        buyer = buyers[0] if buyers else None
+        transaction_manager = await r_container.get(TransactionManager)
 
-        return list(buyer.chat_history) if buyer and buyer.chat_history else []
+        await chat_message_gateway.add_chat_messages(
+            cabinet_id,
+            telegram_id,
+            [(entry["user"], entry["assistant"], datetime.fromisoformat(entry["created_at"])) for entry in history],
+        )
+        await buyer_gateway.touch_active_buyers(telegram_id, cabinet_id)
+        await transaction_manager.commit()
 
 
 def _predialog_redis_key(business_connection_id: str, chat_id: int) -> str:
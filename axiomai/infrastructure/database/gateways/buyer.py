@@ -1,9 +1,27 @@
+from collections.abc import AsyncIterator
 from datetime import datetime
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, select, tuple_, update
 
 from axiomai.infrastructure.database.gateways.base import Gateway
 from axiomai.infrastructure.database.models.buyer import Buyer
+from axiomai.infrastructure.database.models.chat_message import ChatMessage
+
+_DUE_REMINDER_FILTER = (
+    Buyer.is_canceled.is_(False),
+    Buyer.is_superbanking_paid.is_(False),
+    Buyer.is_paid_manually.is_(False),
+)
+# Покупатель написал боту в диалоге этой заявки
+_HAS_DIALOG = (
+    select(ChatMessage.id)
+    .where(
+        ChatMessage.cabinet_id == Buyer.cabinet_id,
+        ChatMessage.telegram_id == Buyer.telegram_id,
+        ChatMessage.created_at >= Buyer.dialog_started_at,
+    )
+    .exists()
+)
 
 
 class BuyerGateway(Gateway):
@@ -23,17 +41,72 @@ class BuyerGateway(Gateway):
         )
         return list(result)
 
-    async def get_inactive_buyers(self, inactive_since: datetime) -> list[Buyer]:
-        result = await self._session.scalars(
-            select(Buyer).where(
-                Buyer.is_canceled.is_(False),
-                Buyer.is_superbanking_paid.is_(False),
-                Buyer.is_paid_manually.is_(False),
-                Buyer.updated_at < inactive_since,
-                Buyer.chat_history != [],
+    async def iter_buyers_with_due_reminder(self, due_at: datetime, page_size: int) -> AsyncIterator[list[Buyer]]:
+        """
+        Отдаёт незавершённые заявки, напоминание которых наступило к ``due_at``, страницами по ``page_size``.
+
+        Пагинация по ключу (next_reminder_at, id) по частичному индексу ix_buyers_next_reminder_at_id.
+        """
+        after: tuple[datetime, int] | None = None
+        while True:
+            query = (
+                select(Buyer)
+                .where(
+                    *_DUE_REMINDER_FILTER,
+                    Buyer.next_reminder_at <= due_at,
+                    _HAS_DIALOG,
+                )
+                .order_by(Buyer.next_reminder_at, Buyer.id)
+                .limit(page_size)
             )
+            if after:
+                query = query.where(tuple_(Buyer.next_reminder_at, Buyer.id) > tuple_(*after))
+
+            page = list(await self._session.scalars(query))
+            if not page:
+                return
+
+            after = (page[-1].next_reminder_at, page[-1].id)
+            yield page
+
+            if len(page) < page_size:
+                return
+
+    async def unschedule_reminders_without_dialog(self, due_at: datetime) -> None:
+        """Снимает наступившие напоминания покупателей, которые не вступили в диалог."""
+        await self._session.execute(
+            update(Buyer)
+            .where(*_DUE_REMINDER_FILTER, Buyer.next_reminder_at <= due_at, ~_HAS_DIALOG)
+            .values(next_reminder_at=None, updated_at=Buyer.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def touch_buyers(self, buyer_ids: list[int]) -> None:
+        """Обновляет updated_at у заявок одним запросом, напоминание откладывается вместе с ним."""
+        await self._session.execute(
+            update(Buyer)
+            .where(Buyer.id.in_(buyer_ids))
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    async def touch_active_buyers(self, telegram_id: int, cabinet_id: int) -> None:
+        """Откладывает напоминания по активным заявкам покупателя в кабинете, пока он переписывается с ботом."""
+        await self._session.execute(
+            update(Buyer)
+            .where(Buyer.telegram_id == telegram_id, Buyer.cabinet_id == cabinet_id, *_DUE_REMINDER_FILTER)
+            .values(updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+
+    async def reschedule_reminders(self, buyer_ids: list[int], next_reminder_at: datetime | None) -> None:
+        """Переносит напоминания заявок одним запросом, не считая это активностью покупателя."""
+        await self._session.execute(
+            update(Buyer)
+            .where(Buyer.id.in_(buyer_ids))
+            .values(next_reminder_at=next_reminder_at, updated_at=Buyer.updated_at)
+            .execution_options(synchronize_session=False)
         )
-        return list(result)
 
     async def get_active_buyers_by_telegram_id_and_cabinet_id(
         self, telegram_id: int, cabinet_id: int
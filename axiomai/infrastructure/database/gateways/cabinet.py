@@ -1,8 +1,13 @@
-from sqlalchemy import or_, select
+from typing import Any
 
+from sqlalchemy import ColumnElement, func, or_, select, update
+
+from axiomai.application.dto import ArticleSnapshot, CabinetSnapshot
 from axiomai.infrastructure.database.gateways.base import Gateway
-from axiomai.infrastructure.database.models import CashbackTable, User
+from axiomai.infrastructure.database.models import BalanceEntry, CashbackTable, User
+from axiomai.infrastructure.database.models.balance_entry import BalanceEntryReason
 from axiomai.infrastructure.database.models.cabinet import Cabinet
+from axiomai.infrastructure.database.models.cashback_table import CashbackArticle
 
 
 class CabinetGateway(Gateway):
@@ -34,18 +39,166 @@ class CabinetGateway(Gateway):
             select(Cabinet).join(CashbackTable).where(CashbackTable.id == cashback_table_id)
         )
 
-    async def get_cabinets_with_low_balance(self) -> list[Cabinet]:
-        """Получить кабинеты с initial_balance > 0 и balance < 50% от initial_balance."""
-        return list(
-            await self._session.scalars(
-                select(Cabinet).where(
-                    Cabinet.initial_balance > 0,
-                    Cabinet.balance <= Cabinet.initial_balance * 0.5,
-                )
-            )
+    async def get_cabinets_with_low_balance(self, cabinet_ids: list[int] | None = None) -> list[Cabinet]:
+        """Получить кабинеты с initial_balance > 0 и balance < 50% от initial_balance (только из cabinet_ids, если заданы)."""
+        stmt = select(Cabinet).where(
+            Cabinet.initial_balance > 0,
+            Cabinet.balance <= Cabinet.initial_balance * 0.5,
         )
+        if cabinet_ids is not None:
+            stmt = stmt.where(Cabinet.id.in_(cabinet_ids))
+
+        return list(await self._session.scalars(stmt))
 
     async def get_cabinet_by_business_connection_id(self, business_connection_id: str) -> Cabinet | None:
         return await self._session.scalar(
             select(Cabinet).where(Cabinet.business_connection_id == business_connection_id)
         )
+
+    async def debit_lead(self, cabinet_id: int, *, reference: str | None = None) -> int | None:
+        """Списывает лид, не уводя баланс лидов в минус. Возвращает новый баланс или None, если списывать нечего."""
+        balances = await self._change_balances(
+            cabinet_id,
+            BalanceEntryReason.LEAD_DEBIT,
+            reference,
+            leads_delta=-1,
+            values={"leads_balance": func.greatest(Cabinet.leads_balance - 1, 0)},
+            where=Cabinet.leads_balance > 0,
+        )
+        return balances[0] if balances else None
+
+    async def credit_leads(self, cabinet_id: int, leads: int, *, reference: str | None = None) -> int | None:
+        balances = await self._change_balances(
+            cabinet_id,
+            BalanceEntryReason.LEADS_PURCHASE,
+            reference,
+            leads_delta=leads,
+            values={"leads_balance": Cabinet.leads_balance + leads},
+        )
+        return balances[0] if balances else None
+
+    async def refill_balance(self, cabinet_id: int, amount: int, *, reference: str | None = None) -> int | None:
+        """Пополняет баланс и начинает новый цикл уведомлений о низком балансе (initial_balance)."""
+        balances = await self._change_balances(
+            cabinet_id,
+            BalanceEntryReason.BALANCE_REFILL,
+            reference,
+            balance_delta=amount,
+            values={"balance": Cabinet.balance + amount, "initial_balance": Cabinet.balance + amount},
+        )
+        return balances[1] if balances else None
+
+    async def debit_balance(
+        self,
+        cabinet_id: int,
+        amount: int,
+        *,
+        reason: BalanceEntryReason = BalanceEntryReason.PAYOUT_DEBIT,
+        reference: str | None = None,
+    ) -> int | None:
+        """Списывает ``amount``, только если его хватает на балансе. Возвращает новый баланс или None."""
+        balances = await self._change_balances(
+            cabinet_id,
+            reason,
+            reference,
+            balance_delta=-amount,
+            values={"balance": Cabinet.balance - amount},
+            where=Cabinet.balance >= amount,
+        )
+        return balances[1] if balances else None
+
+    async def credit_balance(
+        self,
+        cabinet_id: int,
+        amount: int,
+        *,
+        reason: BalanceEntryReason = BalanceEntryReason.PAYOUT_REFUND,
+        reference: str | None = None,
+    ) -> int | None:
+        """Возвращает деньги на баланс без нового цикла уведомлений, например несостоявшуюся выплату."""
+        balances = await self._change_balances(
+            cabinet_id,
+            reason,
+            reference,
+            balance_delta=amount,
+            values={"balance": Cabinet.balance + amount},
+        )
+        return balances[1] if balances else None
+
+    async def _change_balances(
+        self,
+        cabinet_id: int,
+        reason: BalanceEntryReason,
+        reference: str | None,
+        *,
+        values: dict[str, Any],
+        where: ColumnElement[bool] | None = None,
+        leads_delta: int = 0,
+        balance_delta: int = 0,
+    ) -> tuple[int, int] | None:
+        """
+        Меняет балансы кабинета одним UPDATE ... RETURNING и пишет запись в журнал.
+        Возвращает новые (leads_balance, balance) или None, если условие ``where`` не выполнено.
+
+        Новое значение считается в базе, а не из загруженного ранее объекта, поэтому параллельные
+        изменения не теряются, а строка блокируется только до конца транзакции вызывающего.
+        """
+        stmt = (
+            update(Cabinet)
+            .where(Cabinet.id == cabinet_id)
+            .values(values)
+            .returning(Cabinet.leads_balance, Cabinet.balance)
+            .execution_options(synchronize_session="fetch")
+        )
+        if where is not None:
+            stmt = stmt.where(where)
+
+        row = (await self._session.execute(stmt)).one_or_none()
+        if row is None:
+            return None
+
+        leads_balance, balance = row
+        self._session.add(
+            BalanceEntry(
+                cabinet_id=cabinet_id,
+                reason=reason,
+                reference=reference,
+                leads_delta=leads_delta,
+                balance_delta=balance_delta,
+                leads_balance_after=leads_balance,
+                balance_after=balance,
+            )
+        )
+        await self._session.flush()
+        return leads_balance, balance
+
+    async def get_cabinet_snapshot_by_business_connection_id(
+        self, business_connection_id: str
+    ) -> CabinetSnapshot | None:
+        cabinet = await self.get_cabinet_by_business_connection_id(business_connection_id)
+        if not cabinet:
+            return None
+
+        # Удалённые артикулы тоже попадают в снимок: по ним клиенты дооформляют уже начатые заявки
+        articles = await self._session.scalars(select(CashbackArticle).where(CashbackArticle.cabinet_id == cabinet.id))
+        return CabinetSnapshot(
+            id=cabinet.id,
+            user_id=cabinet.user_id,
+            organization_name=cabinet.organization_name,
+            business_connection_id=cabinet.business_connection_id,
+            business_account_id=cabinet.business_account_id,
+            leads_balance=cabinet.leads_balance,
+            articles=tuple(
+                ArticleSnapshot(
+                    id=article.id,
+                    cabinet_id=article.cabinet_id,
+                    nm_id=article.nm_id,
+                    title=article.title,
+                    brand_name=article.brand_name,
+                    instruction_text=article.instruction_text,
+                    image_url=article.image_url,
+                    in_stock=article.in_stock,
+                )
+                for article in articles
+            ),
+        )
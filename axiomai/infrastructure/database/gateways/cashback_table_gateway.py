@@ -5,7 +5,12 @@ from sqlalchemy import select, or_, and_
 from axiomai.infrastructure.database.gateways.base import Gateway
 from axiomai.infrastructure.database.models import Cabinet, User
 from axiomai.infrastructure.database.models.buyer import Buyer
-from axiomai.infrastructure.database.models.cashback_table import CashbackArticle, CashbackTable, CashbackTableStatus
+from axiomai.infrastructure.database.models.cashback_table import (
+    ACTIVE_CASHBACK_TABLE_STATUSES,
+    CashbackArticle,
+    CashbackTable,
+    CashbackTableStatus,
+)
 
 
 class CashbackTableGateway(Gateway):
@@ -59,11 +64,26 @@ class CashbackTableGateway(Gateway):
     async def get_active_cashback_tables(self) -> list[CashbackTable]:
         cashback_tables = await self._session.scalars(
             select(CashbackTable).where(
-                CashbackTable.status.in_([CashbackTableStatus.VERIFIED, CashbackTableStatus.PAID]),
+                CashbackTable.status.in_(ACTIVE_CASHBACK_TABLE_STATUSES),
             )
         )
         return list(cashback_tables)
 
+    async def get_active_cashback_table_ids(self) -> list[int]:
+        cashback_table_ids = await self._session.scalars(
+            select(CashbackTable.id).where(CashbackTable.status.in_(ACTIVE_CASHBACK_TABLE_STATUSES))
+        )
+        return list(cashback_table_ids)
+
+    async def get_active_cashback_table_ids_by_cabinet_ids(self, cabinet_ids: list[int]) -> list[int]:
+        cashback_table_ids = await self._session.scalars(
+            select(CashbackTable.id).where(
+                CashbackTable.cabinet_id.in_(cabinet_ids),
+                CashbackTable.status.in_(ACTIVE_CASHBACK_TABLE_STATUSES),
+            )
+        )
+        return list(cashback_table_ids)
+
     async def get_articles_by_cabinet_id(self, cabinet_id: int) -> list[CashbackArticle]:
         articles = await self._session.scalars(select(CashbackArticle).where(CashbackArticle.cabinet_id == cabinet_id))
         return list(articles)
@@ -0,0 +1,122 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, true
+
+from axiomai.application.dto import ChatSummary
+from axiomai.infrastructure.database.gateways.base import Gateway
+from axiomai.infrastructure.database.models.buyer import Buyer
+from axiomai.infrastructure.database.models.chat_message import ChatMessage
+
+
+class ChatMessageGateway(Gateway):
+    async def add_chat_message(
+        self, cabinet_id: int, telegram_id: int, user_message: str, assistant_message: str
+    ) -> None:
+        await self._session.execute(
+            insert(ChatMessage).values(
+                cabinet_id=cabinet_id,
+                telegram_id=telegram_id,
+                user_message=user_message,
+                assistant_message=assistant_message,
+            )
+        )
+
+    async def add_chat_messages(
+        self, cabinet_id: int, telegram_id: int, messages: list[tuple[str, str, datetime]]
+    ) -> None:
+        """Добавляет реплики (сообщение клиента, ответ бота, время) одним запросом."""
+        if not messages:
+            return
+
+        await self._session.execute(
+            insert(ChatMessage).values(
+                [
+                    {
+                        "cabinet_id": cabinet_id,
+                        "telegram_id": telegram_id,
+                        "user_message": user_message,
+                        "assistant_message": assistant_message,
+                        "created_at": created_at,
+                    }
+                    for user_message, assistant_message, created_at in messages
+                ]
+            )
+        )
+
+    async def get_last_chat_messages(self, cabinet_id: int, telegram_id: int, limit: int) -> list[ChatMessage]:
+        """
+        Возвращает последние ``limit`` реплик текущего диалога в хронологическом порядке.
+
+        Текущий диалог начинается с самой ранней активной заявки покупателя в кабинете,
+        без активных заявок история пуста — прошлые заказы в промпт не попадают.
+        """
+        dialog_started_at = (
+            select(func.min(Buyer.dialog_started_at))
+            .where(
+                Buyer.cabinet_id == cabinet_id,
+                Buyer.telegram_id == telegram_id,
+                Buyer.is_canceled.is_(False),
+                Buyer.is_superbanking_paid.is_(False),
+                Buyer.is_paid_manually.is_(False),
+            )
+            .scalar_subquery()
+        )
+        result = await self._session.scalars(
+            select(ChatMessage)
+            .where(
+                ChatMessage.cabinet_id == cabinet_id,
+                ChatMessage.telegram_id == telegram_id,
+                ChatMessage.created_at >= dialog_started_at,
+            )
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(limit)
+        )
+        return list(reversed(list(result)))
+
+    async def get_chat_summaries_by_cabinet_id(self, cabinet_id: int) -> dict[int, ChatSummary]:
+        """
+        Возвращает первое и последнее сообщение клиента в диалоге каждой заявки кабинета, ключ — id заявки.
+
+        Диалог заявки — реплики с её ``dialog_started_at``. Для каждой заявки это два чтения
+        по индексу с LIMIT 1, вся история не загружается.
+        """
+        buyers = (
+            select(Buyer.id, Buyer.telegram_id, Buyer.dialog_started_at)
+            .where(Buyer.cabinet_id == cabinet_id)
+            .subquery()
+        )
+        user_messages = select(ChatMessage).where(
+            ChatMessage.cabinet_id == cabinet_id,
+            ChatMessage.telegram_id == buyers.c.telegram_id,
+            ChatMessage.created_at >= buyers.c.dialog_started_at,
+            ChatMessage.user_message != "",
+        )
+        first_message = (
+            user_messages.with_only_columns(ChatMessage.created_at)
+            .order_by(ChatMessage.created_at, ChatMessage.id)
+            .limit(1)
+            .lateral()
+        )
+        last_message = (
+            user_messages.with_only_columns(ChatMessage.created_at, ChatMessage.user_message)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+            .limit(1)
+            .lateral()
+        )
+
+        result = await self._session.execute(
+            select(
+                buyers.c.id,
+                first_message.c.created_at,
+                last_message.c.created_at,
+                last_message.c.user_message,
+            ).select_from(buyers.join(first_message, true()).join(last_message, true()))
+        )
+        return {
+            buyer_id: ChatSummary(
+                first_message_at=first_message_at,
+                last_message_at=last_message_at,
+                last_message_text=last_message_text,
+            )
+            for buyer_id, first_message_at, last_message_at, last_message_text in result
+        }
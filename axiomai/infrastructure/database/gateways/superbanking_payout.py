@@ -1,10 +1,18 @@
 import hashlib
+from datetime import timedelta
 
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 
 from axiomai.constants import SUPERBANKING_ORDER_PREFIX
 from axiomai.infrastructure.database.gateways.base import Gateway
 from axiomai.infrastructure.database.models import SuperbankingPayout
+from axiomai.infrastructure.database.models.superbanking import SuperbankingPayoutStatus
+
+PENDING_PAYOUT_STATUSES = (
+    SuperbankingPayoutStatus.CREATED,
+    SuperbankingPayoutStatus.SIGNED,
+    SuperbankingPayoutStatus.CONFIRMED,
+)
 
 
 class SuperbankingPayoutGateway(Gateway):
@@ -35,10 +43,11 @@ class SuperbankingPayoutGateway(Gateway):
         bank: str,
         amount: int,
         order_number: str,
+        cabinet_id: int | None = None,
+        business_connection_id: str | None = None,
+        charge: int = 0,
     ) -> SuperbankingPayout:
-        existing = await self._session.scalar(
-            select(SuperbankingPayout).where(SuperbankingPayout.order_number == order_number)
-        )
+        existing = await self.get_payout_by_order_number(order_number)
         if existing:
             return existing
 
@@ -49,7 +58,57 @@ class SuperbankingPayoutGateway(Gateway):
             phone_number=phone_number,
             bank=bank,
             amount=amount,
+            cabinet_id=cabinet_id,
+            business_connection_id=business_connection_id,
+            charge=charge,
         )
         self._session.add(payout)
         await self._session.flush()
         return payout
+
+    async def get_payout_by_id(self, payout_id: int) -> SuperbankingPayout | None:
+        return await self._session.scalar(select(SuperbankingPayout).where(SuperbankingPayout.id == payout_id))
+
+    async def get_payout_by_order_number(self, order_number: str) -> SuperbankingPayout | None:
+        return await self._session.scalar(
+            select(SuperbankingPayout).where(SuperbankingPayout.order_number == order_number)
+        )
+
+    async def get_pending_payout(self, telegram_id: int, cabinet_id: int) -> SuperbankingPayout | None:
+        """Незавершённая выплата покупателю из кабинета, если она есть."""
+        return await self._session.scalar(
+            select(SuperbankingPayout)
+            .where(
+                SuperbankingPayout.telegram_id == telegram_id,
+                SuperbankingPayout.cabinet_id == cabinet_id,
+                SuperbankingPayout.status.in_(PENDING_PAYOUT_STATUSES),
+            )
+            .order_by(SuperbankingPayout.id.desc())
+            .limit(1)
+        )
+
+    async def claim_due_payouts(self, limit: int, lease: int) -> list[int]:
+        """
+        Берёт в работу до ``limit`` выплат, чья очередь наступила, и возвращает их id.
+
+        Взятые выплаты откладываются на ``lease`` секунд, поэтому другие воркеры их не возьмут, а выплата
+        упавшего воркера вернётся в очередь сама. Строки, которые сейчас берёт другой воркер, пропускаются.
+        """
+        due_payout_ids = (
+            select(SuperbankingPayout.id)
+            .where(
+                SuperbankingPayout.status.in_(PENDING_PAYOUT_STATUSES),
+                SuperbankingPayout.next_attempt_at <= func.now(),
+            )
+            .order_by(SuperbankingPayout.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self._session.scalars(
+            update(SuperbankingPayout)
+            .where(SuperbankingPayout.id.in_(due_payout_ids))
+            .values(next_attempt_at=func.now() + timedelta(seconds=lease))
+            .returning(SuperbankingPayout.id)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result)
@@ -0,0 +1,62 @@
+"""add buyers and articles indexes
+
+Revision ID: 7d3e9a1c5b42
+Revises: 60a58617f239
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d3e9a1c5b42"
+down_revision: str | Sequence[str] | None = "60a58617f239"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в таблицы, но не может выполняться внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_buyers_active_telegram_id_cabinet_id",
+            "buyers",
+            ["telegram_id", "cabinet_id", "created_at"],
+            postgresql_where=sa.text("NOT is_canceled AND NOT is_superbanking_paid AND NOT is_paid_manually"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_buyers_telegram_id_nm_id",
+            "buyers",
+            ["telegram_id", "nm_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_buyers_cabinet_id_created_at",
+            "buyers",
+            ["cabinet_id", "created_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_articles_cabinet_id_nm_id",
+            "articles",
+            ["cabinet_id", "nm_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_articles_cabinet_id_nm_id", table_name="articles", postgresql_concurrently=True)
+        op.drop_index("ix_buyers_cabinet_id_created_at", table_name="buyers", postgresql_concurrently=True)
+        op.drop_index("ix_buyers_telegram_id_nm_id", table_name="buyers", postgresql_concurrently=True)
+        op.drop_index("ix_buyers_active_telegram_id_cabinet_id", table_name="buyers", postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""add buyers unfinished updated_at index
+
+Revision ID: b4c81f2e6a07
+Revises: 7d3e9a1c5b42
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b4c81f2e6a07"
+down_revision: str | Sequence[str] | None = "7d3e9a1c5b42"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_buyers_unfinished_updated_at_id",
+            "buyers",
+            ["updated_at", "id"],
+            postgresql_where=sa.text("NOT is_canceled AND NOT is_superbanking_paid AND NOT is_paid_manually"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_buyers_unfinished_updated_at_id", table_name="buyers", postgresql_concurrently=True)
@@ -0,0 +1,73 @@
+"""add buyers next_reminder_at
+
+Revision ID: e1f7a3c09d58
+Revises: b4c81f2e6a07
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e1f7a3c09d58"
+down_revision: str | Sequence[str] | None = "b4c81f2e6a07"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "buyers",
+        sa.Column(
+            "next_reminder_at",
+            sa.TIMESTAMP(timezone=True),
+            nullable=True,
+            comment="Когда напомнить покупателю о незавершённом шаге",
+        ),
+    )
+    # Напоминания незавершённых заявок планируются так же, как раньше их находил почасовой проход
+    op.execute(
+        """
+        UPDATE buyers
+        SET next_reminder_at = updated_at + interval '48 hours'
+        WHERE NOT is_canceled AND NOT is_superbanking_paid AND NOT is_paid_manually AND chat_history != '[]'::jsonb
+        """
+    )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_buyers_next_reminder_at_id",
+            "buyers",
+            ["next_reminder_at", "id"],
+            postgresql_where=sa.text(
+                "next_reminder_at IS NOT NULL AND NOT is_canceled AND NOT is_superbanking_paid AND NOT is_paid_manually"
+            ),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_buyers_unfinished_updated_at_id",
+            table_name="buyers",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_buyers_unfinished_updated_at_id",
+            "buyers",
+            ["updated_at", "id"],
+            postgresql_where=sa.text("NOT is_canceled AND NOT is_superbanking_paid AND NOT is_paid_manually"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index("ix_buyers_next_reminder_at_id", table_name="buyers", postgresql_concurrently=True)
+
+    op.drop_column("buyers", "next_reminder_at")
@@ -0,0 +1,105 @@
+"""move chat history to chat_messages
+
+Revision ID: f2a6d8b13c94
+Revises: e1f7a3c09d58
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "f2a6d8b13c94"
+down_revision: str | Sequence[str] | None = "e1f7a3c09d58"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "chat_messages",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("cabinet_id", sa.Integer(), nullable=False, comment="Кабинет продавца"),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False, comment="Телеграм ID покупателя"),
+        sa.Column("user_message", sa.Text(), nullable=False, comment="Сообщение клиента"),
+        sa.Column("assistant_message", sa.Text(), nullable=False, comment="Ответ бота"),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("clock_timestamp()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["cabinet_id"], ["cabinets.id"], name=op.f("fk_chat_messages_cabinet_id_cabinets")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_chat_messages")),
+    )
+    op.create_index(
+        "ix_chat_messages_cabinet_id_telegram_id_created_at",
+        "chat_messages",
+        ["cabinet_id", "telegram_id", "created_at"],
+    )
+
+    # История копировалась во все активные заявки покупателя в кабинете, поэтому реплики дедуплицируются
+    op.execute(
+        """
+        INSERT INTO chat_messages (cabinet_id, telegram_id, user_message, assistant_message, created_at)
+        SELECT DISTINCT
+            buyers.cabinet_id,
+            buyers.telegram_id,
+            COALESCE(entry ->> 'user', ''),
+            COALESCE(entry ->> 'assistant', ''),
+            COALESCE(NULLIF(entry ->> 'created_at', '')::timestamptz, buyers.created_at)
+        FROM buyers
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(buyers.chat_history) = 'array' THEN buyers.chat_history ELSE '[]'::jsonb END
+        ) AS entry
+        """
+    )
+
+    op.drop_column("buyers", "chat_history")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column(
+        "buyers",
+        sa.Column(
+            "chat_history",
+            postgresql.JSONB(astext_type=sa.Text()),
+            server_default=sa.text("'[]'::jsonb"),
+            nullable=False,
+            comment="История сообщений чата",
+        ),
+    )
+    # Как и раньше, каждая активная заявка получает последние 10 реплик диалога
+    op.execute(
+        """
+        UPDATE buyers
+        SET chat_history = history.entries
+        FROM (
+            SELECT
+                cabinet_id,
+                telegram_id,
+                jsonb_agg(
+                    jsonb_build_object(
+                        'user', user_message, 'assistant', assistant_message, 'created_at', created_at
+                    )
+                    ORDER BY created_at, id
+                ) AS entries
+            FROM (
+                SELECT
+                    *,
+                    row_number() OVER (PARTITION BY cabinet_id, telegram_id ORDER BY created_at DESC, id DESC) AS rn
+                FROM chat_messages
+            ) AS last_messages
+            WHERE rn <= 10
+            GROUP BY cabinet_id, telegram_id
+        ) AS history
+        WHERE buyers.cabinet_id = history.cabinet_id AND buyers.telegram_id = history.telegram_id
+        """
+    )
+    op.alter_column("buyers", "chat_history", server_default=None)
+
+    op.drop_index("ix_chat_messages_cabinet_id_telegram_id_created_at", table_name="chat_messages")
+    op.drop_table("chat_messages")
@@ -0,0 +1,60 @@
+"""add balance_entries
+
+Revision ID: a7c5e2d94b18
+Revises: f2a6d8b13c94
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c5e2d94b18"
+down_revision: str | Sequence[str] | None = "f2a6d8b13c94"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+balance_entry_reason = sa.Enum(
+    "LEAD_DEBIT",
+    "LEADS_PURCHASE",
+    "BALANCE_REFILL",
+    "PAYOUT_DEBIT",
+    "PAYOUT_REFUND",
+    name="balance_entry_reason",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "balance_entries",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("cabinet_id", sa.Integer(), nullable=False),
+        sa.Column("reason", balance_entry_reason, nullable=False),
+        sa.Column(
+            "reference",
+            sa.String(length=128),
+            nullable=True,
+            comment="Чем вызвано изменение: платёж, заявка или выплата",
+        ),
+        sa.Column("leads_delta", sa.Integer(), nullable=False, comment="Изменение баланса лидов"),
+        sa.Column("balance_delta", sa.Integer(), nullable=False, comment="Изменение баланса в рублях"),
+        sa.Column("leads_balance_after", sa.Integer(), nullable=False, comment="Баланс лидов после изменения"),
+        sa.Column("balance_after", sa.Integer(), nullable=False, comment="Баланс в рублях после изменения"),
+        sa.Column(
+            "created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("clock_timestamp()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["cabinet_id"], ["cabinets.id"], name=op.f("fk_balance_entries_cabinet_id_cabinets")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_balance_entries")),
+    )
+    op.create_index("ix_balance_entries_cabinet_id_created_at", "balance_entries", ["cabinet_id", "created_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_balance_entries_cabinet_id_created_at", table_name="balance_entries")
+    op.drop_table("balance_entries")
+    balance_entry_reason.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,119 @@
+"""add superbanking payout status
+
+Revision ID: c3e8f1a25d67
+Revises: a7c5e2d94b18
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e8f1a25d67"
+down_revision: str | Sequence[str] | None = "a7c5e2d94b18"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+superbanking_payout_status = sa.Enum(
+    "CREATED",
+    "SIGNED",
+    "CONFIRMED",
+    "RECEIPT_SENT",
+    "FAILED",
+    name="superbanking_payout_status",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    superbanking_payout_status.create(op.get_bind(), checkfirst=True)
+
+    op.add_column(
+        "superbanking",
+        sa.Column("cabinet_id", sa.Integer(), nullable=True, comment="Кабинет, с баланса которого выплата"),
+    )
+    op.add_column(
+        "superbanking",
+        sa.Column(
+            "business_connection_id",
+            sa.String(length=128),
+            nullable=True,
+            comment="Бизнес-подключение, через которое покупателю отправляется чек",
+        ),
+    )
+    op.add_column(
+        "superbanking",
+        sa.Column(
+            "charge",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+            comment="Списано с баланса кабинета вместе с комиссиями",
+        ),
+    )
+    # Выплаты до этой миграции проводились сразу и целиком, воркеру их брать не нужно
+    op.add_column(
+        "superbanking",
+        sa.Column("status", superbanking_payout_status, server_default="RECEIPT_SENT", nullable=False),
+    )
+    op.alter_column("superbanking", "status", server_default=None)
+    op.add_column(
+        "superbanking",
+        sa.Column("cabinet_transaction_id", sa.String(length=64), nullable=True, comment="ID перевода в Superbanking"),
+    )
+    op.add_column(
+        "superbanking", sa.Column("receipt_url", sa.String(length=512), nullable=True, comment="Ссылка на чек")
+    )
+    op.add_column(
+        "superbanking",
+        sa.Column(
+            "attempts", sa.Integer(), server_default="0", nullable=False, comment="Неудачных попыток на текущем статусе"
+        ),
+    )
+    op.add_column(
+        "superbanking",
+        sa.Column(
+            "next_attempt_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=True,
+            comment="Когда взять выплату в работу",
+        ),
+    )
+    op.add_column("superbanking", sa.Column("last_error", sa.String(length=512), nullable=True))
+    op.add_column(
+        "superbanking",
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_foreign_key(
+        op.f("fk_superbanking_cabinet_id_cabinets"), "superbanking", "cabinets", ["cabinet_id"], ["id"]
+    )
+    op.create_index(
+        "ix_superbanking_pending_next_attempt_at",
+        "superbanking",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status IN ('CREATED', 'SIGNED', 'CONFIRMED')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_superbanking_pending_next_attempt_at", table_name="superbanking")
+    op.drop_constraint(op.f("fk_superbanking_cabinet_id_cabinets"), "superbanking", type_="foreignkey")
+    for column in (
+        "updated_at",
+        "last_error",
+        "next_attempt_at",
+        "attempts",
+        "receipt_url",
+        "cabinet_transaction_id",
+        "status",
+        "charge",
+        "business_connection_id",
+        "cabinet_id",
+    ):
+        op.drop_column("superbanking", column)
+    superbanking_payout_status.drop(op.get_bind(), checkfirst=True)
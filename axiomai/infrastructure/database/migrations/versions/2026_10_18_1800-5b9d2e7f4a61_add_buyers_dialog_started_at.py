@@ -0,0 +1,39 @@
+"""add buyers dialog_started_at
+
+Revision ID: 5b9d2e7f4a61
+Revises: c3e8f1a25d67
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5b9d2e7f4a61"
+down_revision: str | Sequence[str] | None = "c3e8f1a25d67"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "buyers",
+        sa.Column(
+            "dialog_started_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+            comment="Начало диалога покупателя по заявке",
+        ),
+    )
+    # Pre-dialog история живёт в Redis не дольше часа до создания заявки
+    op.execute("UPDATE buyers SET dialog_started_at = created_at - interval '1 hour'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("buyers", "dialog_started_at")
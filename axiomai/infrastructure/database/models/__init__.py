@@ -1,19 +1,23 @@
 __all__ = [
+    "BalanceEntry",
     "BalanceNotification",
     "Base",
     "Buyer",
     "Cabinet",
     "CashbackTable",
+    "ChatMessage",
     "Payment",
     "SuperbankingPayout",
     "User",
 ]
 
+from axiomai.infrastructure.database.models.balance_entry import BalanceEntry
 from axiomai.infrastructure.database.models.balance_notification import BalanceNotification
 from axiomai.infrastructure.database.models.base import Base
 from axiomai.infrastructure.database.models.buyer import Buyer
 from axiomai.infrastructure.database.models.cabinet import Cabinet
 from axiomai.infrastructure.database.models.cashback_table import CashbackTable
+from axiomai.infrastructure.database.models.chat_message import ChatMessage
 from axiomai.infrastructure.database.models.payment import Payment
 from axiomai.infrastructure.database.models.superbanking import SuperbankingPayout
 from axiomai.infrastructure.database.models.user import User
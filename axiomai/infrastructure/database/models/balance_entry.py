@@ -0,0 +1,45 @@
+import datetime
+import enum
+
+from sqlalchemy import TIMESTAMP, BigInteger, ForeignKey, Index, String, func
+from sqlalchemy import Enum as SAEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from axiomai.infrastructure.database.models.base import Base
+
+
+class BalanceEntryReason(enum.Enum):
+    LEAD_DEBIT = "lead_debit"
+    LEADS_PURCHASE = "leads_purchase"
+    BALANCE_REFILL = "balance_refill"
+    PAYOUT_DEBIT = "payout_debit"
+    PAYOUT_REFUND = "payout_refund"
+
+
+class BalanceEntry(Base):
+    """
+    Запись журнала изменений баланса кабинета.
+
+    Балансы в cabinets меняются только через CabinetGateway одним UPDATE, и каждое изменение
+    пишется сюда в той же транзакции: по журналу видно, откуда взялся текущий баланс.
+    """
+
+    __tablename__ = "balance_entries"
+    __table_args__ = (Index("ix_balance_entries_cabinet_id_created_at", "cabinet_id", "created_at"),)
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    cabinet_id: Mapped[int] = mapped_column(ForeignKey("cabinets.id"))
+    reason: Mapped[BalanceEntryReason] = mapped_column(SAEnum(BalanceEntryReason, name="balance_entry_reason"))
+    reference: Mapped[str | None] = mapped_column(
+        String(128), comment="Чем вызвано изменение: платёж, заявка или выплата"
+    )
+
+    leads_delta: Mapped[int] = mapped_column(default=0, comment="Изменение баланса лидов")
+    balance_delta: Mapped[int] = mapped_column(default=0, comment="Изменение баланса в рублях")
+    leads_balance_after: Mapped[int] = mapped_column(comment="Баланс лидов после изменения")
+    balance_after: Mapped[int] = mapped_column(comment="Баланс в рублях после изменения")
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.clock_timestamp()
+    )
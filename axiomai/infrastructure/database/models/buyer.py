@@ -1,9 +1,9 @@
 import datetime
 
-from sqlalchemy import TIMESTAMP, BigInteger, ForeignKey, String, func
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import TIMESTAMP, BigInteger, ForeignKey, Index, String, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
+from axiomai.constants import INACTIVE_REMINDER_DELAY
 from axiomai.infrastructure.database.models.base import Base
 
 
@@ -11,11 +11,32 @@ class Buyer(Base):
     """
     Заявка покупателя на кешбек.
 
-    Хранит информацию о покупателе, статус прохождения этапов выдачи кешбека
-    и историю чата с ботом.
+    Хранит информацию о покупателе и статус прохождения этапов выдачи кешбека.
+    История чата с ботом — в ChatMessage.
     """
 
     __tablename__ = "buyers"
+    __table_args__ = (
+        # Активные заявки покупателя в кабинете — запрашиваются почти на каждое сообщение клиента
+        Index(
+            "ix_buyers_active_telegram_id_cabinet_id",
+            "telegram_id",
+            "cabinet_id",
+            "created_at",
+            postgresql_where=text("NOT is_canceled AND NOT is_superbanking_paid AND NOT is_paid_manually"),
+        ),
+        Index("ix_buyers_telegram_id_nm_id", "telegram_id", "nm_id"),
+        Index("ix_buyers_cabinet_id_created_at", "cabinet_id", "created_at"),
+        # Запланированные напоминания незавершённых заявок — observer выбирает только наступившие
+        Index(
+            "ix_buyers_next_reminder_at_id",
+            "next_reminder_at",
+            "id",
+            postgresql_where=text(
+                "next_reminder_at IS NOT NULL AND NOT is_canceled AND NOT is_superbanking_paid AND NOT is_paid_manually"
+            ),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -39,9 +60,18 @@ class Buyer(Base):
     is_superbanking_paid: Mapped[bool] = mapped_column(default=False, comment="Выплата произведена через Superbanking")
     is_paid_manually: Mapped[bool] = mapped_column(default=False, comment="Выплата проставлена вручную в таблице")
 
-    chat_history: Mapped[list[dict]] = mapped_column(JSONB, default=list, comment="История сообщений чата")
-
     created_at: Mapped[datetime.datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    # История чата ведётся по (cabinet_id, telegram_id), заявке относятся только реплики с начала её диалога
+    dialog_started_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), comment="Начало диалога покупателя по заявке"
+    )
     updated_at: Mapped[datetime.datetime] = mapped_column(
         TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    # Любое изменение заявки откладывает напоминание, observer переносит его после отправки
+    next_reminder_at: Mapped[datetime.datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True),
+        default=func.now() + datetime.timedelta(seconds=INACTIVE_REMINDER_DELAY),
+        onupdate=func.now() + datetime.timedelta(seconds=INACTIVE_REMINDER_DELAY),
+        comment="Когда напомнить покупателю о незавершённом шаге",
+    )
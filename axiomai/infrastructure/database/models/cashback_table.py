@@ -1,7 +1,7 @@
 import datetime
 import enum
 
-from sqlalchemy import TIMESTAMP, ForeignKey, String, func
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, String, func
 from sqlalchemy import Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -17,6 +17,10 @@ class CashbackTableStatus(enum.Enum):
     EXPIRED = "expired"  # срок действия истёк
 
 
+# Таблицы, которые синхронизируются и обслуживают клиентов
+ACTIVE_CASHBACK_TABLE_STATUSES = (CashbackTableStatus.VERIFIED, CashbackTableStatus.PAID)
+
+
 class CashbackTable(Base):
     """
     Таблица кэшбека в Google Sheets.
@@ -57,6 +61,7 @@ class CashbackTable(Base):
 
 class CashbackArticle(Base):
     __tablename__ = "articles"
+    __table_args__ = (Index("ix_articles_cabinet_id_nm_id", "cabinet_id", "nm_id"),)
 
     id: Mapped[int] = mapped_column(primary_key=True)
     cabinet_id: Mapped[int] = mapped_column(ForeignKey("cabinets.id"))
@@ -0,0 +1,32 @@
+import datetime
+
+from sqlalchemy import TIMESTAMP, BigInteger, ForeignKey, Index, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from axiomai.infrastructure.database.models.base import Base
+
+
+class ChatMessage(Base):
+    """
+    Реплика диалога покупателя с ботом в кабинете: сообщение клиента и ответ бота.
+
+    Таблица только дополняется, история читается ограниченными запросами по (cabinet_id, telegram_id).
+    """
+
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_cabinet_id_telegram_id_created_at", "cabinet_id", "telegram_id", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    cabinet_id: Mapped[int] = mapped_column(ForeignKey("cabinets.id"), comment="Кабинет продавца")
+    telegram_id: Mapped[int] = mapped_column(BigInteger, comment="Телеграм ID покупателя")
+
+    user_message: Mapped[str] = mapped_column(Text, comment="Сообщение клиента")
+    assistant_message: Mapped[str] = mapped_column(Text, comment="Ответ бота")
+
+    # clock_timestamp, а не now(): реплики одной транзакции должны идти в порядке добавления
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.clock_timestamp()
+    )
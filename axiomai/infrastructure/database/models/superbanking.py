@@ -1,13 +1,37 @@
 import datetime
+import enum
 
-from sqlalchemy import ARRAY, TIMESTAMP, BigInteger, String, func
+from sqlalchemy import ARRAY, TIMESTAMP, BigInteger, ForeignKey, Index, String, func, text
+from sqlalchemy import Enum as SAEnum
 from sqlalchemy.orm import Mapped, mapped_column
 
 from axiomai.infrastructure.database.models.base import Base
 
 
+class SuperbankingPayoutStatus(enum.Enum):
+    CREATED = "created"  # деньги зарезервированы, перевод ещё не подписан
+    SIGNED = "signed"  # перевод подписан, ждём чек
+    CONFIRMED = "confirmed"  # чек получен, ещё не отправлен покупателю
+    RECEIPT_SENT = "receipt_sent"
+    FAILED = "failed"
+
+
 class SuperbankingPayout(Base):
+    """
+    Выплата кешбека через Superbanking.
+
+    Выплату ведёт SuperbankingPayoutWorker по статусам created → signed → confirmed → receipt_sent;
+    next_attempt_at — когда её пора (снова) взять в работу.
+    """
+
     __tablename__ = "superbanking"
+    __table_args__ = (
+        Index(
+            "ix_superbanking_pending_next_attempt_at",
+            "next_attempt_at",
+            postgresql_where=text("status IN ('CREATED', 'SIGNED', 'CONFIRMED')"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     telegram_id: Mapped[int] = mapped_column(BigInteger, comment="Telegram ID пользователя")
@@ -20,7 +44,33 @@ class SuperbankingPayout(Base):
     phone_number: Mapped[str] = mapped_column(String(32), comment="Номер телефона для выплаты")
     bank: Mapped[str] = mapped_column(String(128), comment="Название банка")
     amount: Mapped[int] = mapped_column(comment="Сумма кешбека в рублях")
+
+    cabinet_id: Mapped[int | None] = mapped_column(
+        ForeignKey("cabinets.id"), comment="Кабинет, с баланса которого выплата"
+    )
+    business_connection_id: Mapped[str | None] = mapped_column(
+        String(128), comment="Бизнес-подключение, через которое покупателю отправляется чек"
+    )
+    charge: Mapped[int] = mapped_column(default=0, comment="Списано с баланса кабинета вместе с комиссиями")
+
+    status: Mapped[SuperbankingPayoutStatus] = mapped_column(
+        SAEnum(SuperbankingPayoutStatus, name="superbanking_payout_status"),
+        default=SuperbankingPayoutStatus.CREATED,
+    )
+    cabinet_transaction_id: Mapped[str | None] = mapped_column(String(64), comment="ID перевода в Superbanking")
+    receipt_url: Mapped[str | None] = mapped_column(String(512), comment="Ссылка на чек")
+    attempts: Mapped[int] = mapped_column(default=0, comment="Неудачных попыток на текущем статусе")
+    next_attempt_at: Mapped[datetime.datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), server_default=func.now(), comment="Когда взять выплату в работу"
+    )
+    last_error: Mapped[str | None] = mapped_column(String(512))
+
     created_at: Mapped[datetime.datetime] = mapped_column(
         TIMESTAMP(timezone=True),
         server_default=func.now(),
     )
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
@@ -17,6 +17,7 @@ from axiomai.application.interactors.create_user import CreateSeller
 from axiomai.application.interactors.observe_balance_notifications import ObserveBalanceNotifications
 from axiomai.application.interactors.observe_cashback_tables import ObserveCashbackTables
 from axiomai.application.interactors.observe_inactive_reminders import ObserveInactiveReminders
+from axiomai.application.interactors.process_superbanking_payout import ProcessSuperbankingPayout
 from axiomai.application.interactors.refill_balance.cancel_payment import CancelRefillBalancePayment
 from axiomai.application.interactors.refill_balance.confirm_payment import ConfirmRefillBalancePayment
 from axiomai.application.interactors.refill_balance.mark_payment_waiting_confirm import (
@@ -25,10 +26,13 @@ from axiomai.application.interactors.refill_balance.mark_payment_waiting_confirm
 from axiomai.application.interactors.refill_balance.refill_balance import RefillBalance
 from axiomai.application.interactors.sync_cashback_tables import SyncCashbackTables
 from axiomai.config import Config, MessageDebouncerConfig, OpenAIConfig, SuperbankingConfig
+from axiomai.infrastructure.business_connection_cache import BusinessConnectionCache
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.database.gateways.balance_notification import BalanceNotificationGateway
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
+from axiomai.infrastructure.database.gateways.chat_message import ChatMessageGateway
 from axiomai.infrastructure.database.gateways.payment import PaymentGateway
 from axiomai.infrastructure.database.gateways.superbanking_payout import SuperbankingPayoutGateway
 from axiomai.infrastructure.database.gateways.user import UserGateway
@@ -36,7 +40,12 @@ from axiomai.infrastructure.database.transaction_manager import TransactionManag
 from axiomai.infrastructure.google_sheets import GoogleSheetsGateway
 from axiomai.infrastructure.message_debouncer import MessageDebouncer
 from axiomai.infrastructure.openai import OpenAIGateway
+from axiomai.infrastructure.openai_limiter import OpenAILimiter
+from axiomai.infrastructure.photo_fetcher import PhotoFetcher
+from axiomai.infrastructure.screenshot_verdict_cache import ScreenshotVerdictCache
 from axiomai.infrastructure.superbanking import Superbanking
+from axiomai.infrastructure.sync_events import SyncEvents
+from axiomai.infrastructure.telegram.outbound import TelegramOutbound
 
 
 class DatabaseProvider(Provider):
@@ -82,28 +91,43 @@ class GatewaysProvider(Provider):
     def get_tm(self, session: AsyncSession) -> TransactionManager:
         return session  # type: ignore[return-value]
 
-    google_sheets_gateway = provide(GoogleSheetsGateway, scope=Scope.APP)
+    @provide(scope=Scope.APP)
+    async def google_sheets_gateway(self, config: Config) -> AsyncIterable[GoogleSheetsGateway]:
+        google_sheets_gateway = GoogleSheetsGateway(config)
+        yield google_sheets_gateway
+        await google_sheets_gateway.close()
+
+    cabinet_snapshot_cache = provide(CabinetSnapshotCache, scope=Scope.APP)
+    sync_events = provide(SyncEvents, scope=Scope.APP)
+    telegram_outbound = provide(TelegramOutbound, scope=Scope.APP)
 
     gateways = provide_all(
         BalanceNotificationGateway,
         BuyerGateway,
         CabinetGateway,
         CashbackTableGateway,
+        ChatMessageGateway,
         PaymentGateway,
         SuperbankingPayoutGateway,
         UserGateway,
     )
 
 
-class TgbotInteractorsProvider(Provider):
-    openai_gateway = provide(OpenAIGateway, scope=Scope.APP)
-    message_debouncer = provide(MessageDebouncer, scope=Scope.APP)
-
+class SuperbankingProvider(Provider):
     @provide(scope=Scope.APP)
     async def superbanking(self, superbanking_config: SuperbankingConfig) -> AsyncIterable[Superbanking]:
         async with ClientSession() as client_session:
             yield Superbanking(superbanking_config, client_session)
 
+
+class TgbotInteractorsProvider(Provider):
+    openai_gateway = provide(OpenAIGateway, scope=Scope.APP)
+    openai_limiter = provide(OpenAILimiter, scope=Scope.APP)
+    photo_fetcher = provide(PhotoFetcher, scope=Scope.APP)
+    screenshot_verdict_cache = provide(ScreenshotVerdictCache, scope=Scope.APP)
+    business_connection_cache = provide(BusinessConnectionCache, scope=Scope.APP)
+    message_debouncer = provide(MessageDebouncer, scope=Scope.APP)
+
     interactors = provide_all(
         CreateSeller,
         CreateCabinet,
@@ -128,6 +152,7 @@ class ObserverInteractorsProvider(Provider):
         ObserveBalanceNotifications,
         ObserveCashbackTables,
         ObserveInactiveReminders,
+        ProcessSuperbankingPayout,
         SyncCashbackTables,
         scope=Scope.REQUEST,
     )
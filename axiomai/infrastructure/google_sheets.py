@@ -1,22 +1,76 @@
+import asyncio
+import hashlib
 import json
 import logging
+import time
 from contextlib import suppress
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Any
 
-from aiogoogle import Aiogoogle, HTTPError
+from aiogoogle import Aiogoogle, GoogleAPI, HTTPError
 from aiogoogle.auth.creds import ServiceAccountCreds
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+from aiohttp import TCPConnector
 
-from axiomai.application.dto import CashbackArticle
+from axiomai.application.dto import CashbackArticle, ChatSummary
 from axiomai.application.exceptions.cashback_table import WritePermissionError
 from axiomai.config import Config
+from axiomai.constants import (
+    GOOGLE_DISCOVERY_CACHE_TTL,
+    SHEETS_FULL_REWRITE_INTERVAL,
+    SHEETS_SETTINGS_REFRESH_INTERVAL,
+)
 from axiomai.infrastructure.database.models import Buyer
 
 logger = logging.getLogger(__name__)
 MSK_TZ = timezone(timedelta(hours=3))
 
 
+_BUYERS_SHEET_TITLE = "Покупатели"
+_SETTINGS_SHEET_TITLE = "Настройка"
+_ARTICLES_RANGE = "D2:I"
+_BUYERS_RANGE = f"{_BUYERS_SHEET_TITLE}!B2:P"
+_SETTINGS_RANGE = f"{_SETTINGS_SHEET_TITLE}!A2:B2"
+
+
+@dataclass
+class _BuyersSheet:
+    sheet_id: int
+    row_count: int
+    conditional_formats_count: int
+
+
+@dataclass
+class CashbackTableSheets:
+    """Прочитанная таблица кешбека: артикулы и всё, что нужно для записи покупателей и настроек."""
+
+    table_id: str
+    articles: list[CashbackArticle] = field(default_factory=list)
+    paid_manually: dict[tuple[int, int], bool] = field(default_factory=dict)
+    buyers_sheet: _BuyersSheet | None = None
+    settings_sheet_id: int | None = None
+
+
+@dataclass
+class _WrittenSheet:
+    """Отпечаток последней записи листа "Покупатели": ключи (telegram_id, nm_id) и хеши строк в порядке листа."""
+
+    keys: list[tuple[int, int]]
+    hashes: list[bytes]
+    written_at: float
+
+
 class GoogleSheetsGateway:
+    """
+    Работа с таблицами кешбека через Google Sheets и Drive API.
+
+    Гейтвей живёт всё время работы процесса: discovery-документы API загружаются один раз
+    (и сохраняются на диск, если задан GOOGLE_DISCOVERY_CACHE_DIR), HTTP-соединения берутся из общего пула,
+    а токен сервисного аккаунта aiogoogle переиспользует до истечения срока.
+    """
+
     def __init__(self, config: Config) -> None:
         with open(config.service_account_axiomai) as f:
             service_account_key = json.load(f)
@@ -30,11 +84,71 @@ class GoogleSheetsGateway:
                 "https://www.googleapis.com/auth/drive",
             ],
         )
-        self._aiogoogle = Aiogoogle(service_account_creds=self._credentials)
+        self._connector: TCPConnector | None = None
+        self._aiogoogle = Aiogoogle(service_account_creds=self._credentials, session_factory=self._session_factory)
+        self._apis: dict[tuple[str, str], GoogleAPI] = {}
+        self._discovery_lock = asyncio.Lock()
+        self._discovery_cache_dir = (
+            Path(config.google_discovery_cache_dir) if config.google_discovery_cache_dir else None
+        )
+        self._written_sheets: dict[str, _WrittenSheet] = {}
+        self._written_settings: dict[str, tuple[int, float]] = {}
+
+    async def close(self) -> None:
+        if self._connector:
+            await self._connector.close()
+
+    def _session_factory(self) -> AiohttpSession:
+        """Сессия aiogoogle на общем пуле соединений: её закрытие не закрывает пул."""
+        if self._connector is None or self._connector.closed:
+            self._connector = TCPConnector()
+        return AiohttpSession(connector=self._connector, connector_owner=False)
+
+    async def _discover(self, aiogoogle: Aiogoogle, api_name: str, api_version: str) -> GoogleAPI:
+        key = (api_name, api_version)
+        if api := self._apis.get(key):
+            return api
+
+        async with self._discovery_lock:
+            if api := self._apis.get(key):
+                return api
+
+            discovery_document = self._load_discovery_document(api_name, api_version)
+            if discovery_document is None:
+                api = await aiogoogle.discover(api_name, api_version)
+                self._save_discovery_document(api_name, api_version, api.discovery_document)
+            else:
+                api = GoogleAPI(discovery_document)
+
+            self._apis[key] = api
+            return api
+
+    def _load_discovery_document(self, api_name: str, api_version: str) -> dict[str, Any] | None:
+        if not self._discovery_cache_dir:
+            return None
+
+        path = self._discovery_cache_dir / f"{api_name}_{api_version}.json"
+        try:
+            if time.time() - path.stat().st_mtime > GOOGLE_DISCOVERY_CACHE_TTL:
+                return None
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def _save_discovery_document(self, api_name: str, api_version: str, discovery_document: dict[str, Any]) -> None:
+        if not self._discovery_cache_dir:
+            return
+
+        path = self._discovery_cache_dir / f"{api_name}_{api_version}.json"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(discovery_document), encoding="utf-8")
+        except OSError as e:
+            logger.warning("failed to save %s %s discovery document: %s", api_name, api_version, e)
 
     async def ensure_service_account_added(self, table_id: str) -> None:
         async with self._aiogoogle as aiogoogle:
-            drive_v3 = await aiogoogle.discover("drive", "v3")
+            drive_v3 = await self._discover(aiogoogle, "drive", "v3")
 
             try:
                 permissions = await aiogoogle.as_service_account(
@@ -60,119 +174,220 @@ class GoogleSheetsGateway:
                         )
                     return
 
-    async def get_cashback_articles(self, table_id: str) -> list[CashbackArticle]:
+    async def read_cashback_table(self, table_id: str) -> CashbackTableSheets:
+        """
+        Читает таблицу кешбека одним запросом spreadsheets.get: артикулы (D2:I первого листа),
+        отметки ручной выплаты с листа "Покупатели" и свойства листов, нужные для записи.
+        """
         async with self._aiogoogle as aiogoogle:
-            sheets_v4 = await aiogoogle.discover("sheets", "v4")
+            sheets_v4 = await self._discover(aiogoogle, "sheets", "v4")
+
+            spreadsheet = await aiogoogle.as_service_account(
+                sheets_v4.spreadsheets.get(
+                    spreadsheetId=table_id,
+                    ranges=[_ARTICLES_RANGE, _BUYERS_RANGE, _SETTINGS_RANGE],
+                    includeGridData=True,
+                    fields=(
+                        "sheets(properties(sheetId,title,index,gridProperties),conditionalFormats,"
+                        "data(startColumn,rowData(values(formattedValue))))"
+                    ),
+                )
+            )
 
-            response = await aiogoogle.as_service_account(
-                sheets_v4.spreadsheets.values.get(spreadsheetId=table_id, range="D2:I")
+        table_sheets = CashbackTableSheets(table_id=table_id)
+        for sheet in spreadsheet.get("sheets", []):
+            properties = sheet.get("properties", {})
+            data = sheet.get("data", [])
+            if properties.get("title") == _BUYERS_SHEET_TITLE:
+                table_sheets.buyers_sheet = _BuyersSheet(
+                    sheet_id=properties["sheetId"],
+                    row_count=properties.get("gridProperties", {}).get("rowCount", 0),
+                    conditional_formats_count=len(sheet.get("conditionalFormats", [])),
+                )
+                table_sheets.paid_manually = _parse_paid_manually(_grid_values(data, start_column=1))
+            elif properties.get("title") == _SETTINGS_SHEET_TITLE:
+                table_sheets.settings_sheet_id = properties["sheetId"]
+
+            # Диапазон без названия листа читается с первого листа
+            if properties.get("index", 0) == 0:
+                table_sheets.articles = _parse_articles(_grid_values(data, start_column=3))
+
+        return table_sheets
+
+    async def write_cashback_table(
+        self,
+        table_sheets: CashbackTableSheets,
+        buyers: list[Buyer],
+        chat_summaries: dict[int, ChatSummary],
+        leads_balance: int | None,
+        updated_at: str,
+    ) -> None:
+        """
+        Записывает покупателей на лист "Покупатели" и остаток лидов на лист "Настройка" одним batchUpdate.
+
+        Запоминает хеши записанных строк и на следующих синхронизациях отправляет только изменённые строки
+        и новых покупателей сверху листа, а если ничего не изменилось — не пишет в таблицу вовсе.
+        Лист перезаписывается целиком при первой синхронизации, при удалении или перестановке покупателей
+        и раз в SHEETS_FULL_REWRITE_INTERVAL, чтобы исправить ручные правки.
+        Лист "Настройка" обновляется вместе с покупателями, при изменении остатка лидов
+        и не реже SHEETS_SETTINGS_REFRESH_INTERVAL.
+        """
+        table_id = table_sheets.table_id
+        _apply_paid_manually(buyers, table_sheets.paid_manually)
+
+        requests: list[dict[str, Any]] = []
+        written = None
+        if table_sheets.buyers_sheet:
+            requests, written = self._build_buyers_requests(
+                table_id, table_sheets.buyers_sheet, buyers, chat_summaries
             )
 
-            values = response.get("values", [])
-            articles = []
-            for row in values:
-                if row and len(row) >= 2 and row[1]:  # noqa: PLR2004
-                    try:
-                        in_stock = row[0].upper() == "TRUE" if row[0] else False
-                        nm_id = int(row[1])
-                        image_url = row[2] if len(row) >= 3 else ""  # noqa:  PLR2004
-                        title = row[3] if len(row) >= 4 else ""  # noqa: PLR2004
-                        brand_name = row[4] if len(row) >= 5 else ""  # noqa: PLR2004
-                        instruction_text = row[5] if len(row) >= 6 else ""  # noqa: PLR2004
-                    except ValueError:
-                        continue
-
-                    articles.append(
-                        CashbackArticle(
-                            nm_id=nm_id,
-                            title=title,
-                            brand_name=brand_name,
-                            instruction_text=instruction_text,
-                            image_url=image_url,
-                            in_stock=in_stock,
-                        )
-                    )
+        write_settings = (
+            table_sheets.settings_sheet_id is not None
+            and leads_balance is not None
+            and (bool(requests) or self._is_settings_outdated(table_id, leads_balance))
+        )
+        if write_settings:
+            requests.append(_settings_request(table_sheets.settings_sheet_id, leads_balance, updated_at))
 
-            return articles
+        if not requests:
+            logger.debug("table.id = %s not changed, skip write", table_id)
+            return
 
-    async def sync_buyers_to_sheet(self, table_id: str, buyers: list[Buyer]) -> None:
-        """Синхронизирует покупателей в лист "Покупатели" Google Sheets."""
-        buyer_index: dict[tuple[int, int], Buyer] = {(b.telegram_id, b.nm_id): b for b in buyers}
+        try:
+            async with self._aiogoogle as aiogoogle:
+                sheets_v4 = await self._discover(aiogoogle, "sheets", "v4")
+                await aiogoogle.as_service_account(
+                    sheets_v4.spreadsheets.batchUpdate(spreadsheetId=table_id, json={"requests": requests})
+                )
+        except HTTPError as err:
+            # Лист могли изменить вручную — в следующий раз перезапишем его целиком
+            self._written_sheets.pop(table_id, None)
+            self._written_settings.pop(table_id, None)
+            logger.exception("Failed to write table.id = %s", table_id, exc_info=err)
+            return
+
+        if written:
+            self._written_sheets[table_id] = written
+        if write_settings:
+            self._written_settings[table_id] = (leads_balance, time.monotonic())
+
+    def _build_buyers_requests(
+        self, table_id: str, sheet: _BuyersSheet, buyers: list[Buyer], chat_summaries: dict[int, ChatSummary]
+    ) -> tuple[list[dict[str, Any]], _WrittenSheet]:
+        """Возвращает запросы для листа "Покупатели" и отпечаток, который нужно запомнить после записи."""
+        rows = [_buyer_to_row(buyer, chat_summaries.get(buyer.id)) for buyer in buyers]
+        keys = [(buyer.telegram_id, buyer.nm_id) for buyer in buyers]
+        hashes = [_row_hash(row) for row in rows]
+
+        written = self._written_sheets.get(table_id)
+        inserted_count = _get_inserted_count(written, keys)
+        if written is None or inserted_count is None:
+            return _full_rewrite_requests(sheet, rows), _WrittenSheet(keys, hashes, time.monotonic())
+
+        changed_indexes = [
+            index
+            for index in range(len(rows))
+            if index < inserted_count or hashes[index] != written.hashes[index - inserted_count]
+        ]
+        requests = _changed_rows_requests(sheet.sheet_id, rows, changed_indexes, inserted_count)
+        return requests, _WrittenSheet(keys, hashes, written.written_at)
+
+    def _is_settings_outdated(self, table_id: str, leads_balance: int) -> bool:
+        written_settings = self._written_settings.get(table_id)
+        if written_settings is None:
+            return True
+
+        written_leads_balance, written_at = written_settings
+        return (
+            written_leads_balance != leads_balance or time.monotonic() - written_at > SHEETS_SETTINGS_REFRESH_INTERVAL
+        )
 
-        async with self._aiogoogle as aiogoogle:
-            sheets_v4 = await aiogoogle.discover("sheets", "v4")
 
-            try:
-                await _read_is_paid_manually_from_sheet(aiogoogle, sheets_v4, table_id, buyer_index)
-                rows = [_buyer_to_row(buyer) for buyer in buyers]
-                await _write_buyers_to_sheet(aiogoogle, sheets_v4, table_id, rows)
-            except HTTPError as err:
-                logger.exception("Failed to sync buyers to table.id = %s", table_id, exc_info=err)
+def _grid_values(data: list[dict[str, Any]], start_column: int) -> list[list[str]]:
+    """Значения ячеек диапазона из gridData, который начинается с колонки start_column."""
+    for grid in data:
+        if grid.get("startColumn", 0) == start_column:
+            return [
+                [cell.get("formattedValue", "") for cell in row.get("values", [])] for row in grid.get("rowData", [])
+            ]
+    return []
 
-    async def update_settings(self, table_id: str, leads_balance: int, updated_at: str) -> None:
-        """Обновляет лист 'Настройка': A2 - остаток лидов, B2 - время обновления."""
-        async with self._aiogoogle as aiogoogle:
-            sheets_v4 = await aiogoogle.discover("sheets", "v4")
 
+def _parse_articles(values: list[list[str]]) -> list[CashbackArticle]:
+    articles = []
+    for row in values:
+        if row and len(row) >= 2 and row[1]:  # noqa: PLR2004
             try:
-                await aiogoogle.as_service_account(
-                    sheets_v4.spreadsheets.values.update(
-                        spreadsheetId=table_id,
-                        range="Настройка!A2:B2",
-                        valueInputOption="RAW",
-                        json={"values": [[leads_balance, updated_at]]},
-                    )
+                in_stock = row[0].upper() == "TRUE" if row[0] else False
+                nm_id = int(row[1])
+                image_url = row[2] if len(row) >= 3 else ""  # noqa:  PLR2004
+                title = row[3] if len(row) >= 4 else ""  # noqa: PLR2004
+                brand_name = row[4] if len(row) >= 5 else ""  # noqa: PLR2004
+                instruction_text = row[5] if len(row) >= 6 else ""  # noqa: PLR2004
+            except ValueError:
+                continue
+
+            articles.append(
+                CashbackArticle(
+                    nm_id=nm_id,
+                    title=title,
+                    brand_name=brand_name,
+                    instruction_text=instruction_text,
+                    image_url=image_url,
+                    in_stock=in_stock,
                 )
-            except HTTPError as err:
-                logger.exception("Failed to update settings to table.id %s", table_id, exc_info=err)
+            )
 
+    return articles
 
-async def _read_is_paid_manually_from_sheet(
-    aiogoogle: Aiogoogle, sheets_v4: Any, table_id: str, buyer_index: dict[tuple[int, int], Buyer]
-) -> None:
-    """Читает значения is_paid_manually из колонки P и обновляет объекты Buyer."""
-    existing_response = await aiogoogle.as_service_account(
-        sheets_v4.spreadsheets.values.get(spreadsheetId=table_id, range="Покупатели!B2:P")
-    )
-    existing_values = existing_response.get("values", [])
 
-    for row in existing_values:
+def _parse_paid_manually(values: list[list[str]]) -> dict[tuple[int, int], bool]:
+    """Читает значения is_paid_manually из колонки P листа "Покупатели" (значения начиная с колонки B)."""
+    paid_manually = {}
+    for row in values:
         if len(row) < 6:  # noqa: PLR2004
             continue
         with suppress(ValueError, IndexError):
             telegram_id = int(row[0])  # B - telegram_id
             nm_id = int(row[5])  # G - nm_id (индекс 5 относительно B)
-            is_paid_manually = row[14] == "TRUE"
-            key = (telegram_id, nm_id)
-            if key in buyer_index and (not buyer_index[key].is_superbanking_paid):
-                buyer_index[key].is_paid_manually = is_paid_manually
-
-
-async def _write_buyers_to_sheet(aiogoogle: Aiogoogle, sheets_v4: Any, table_id: str, rows: list[list]) -> None:
-    """Записывает данные покупателей в Google Sheets."""
-    spreadsheet = await aiogoogle.as_service_account(
-        sheets_v4.spreadsheets.get(
-            spreadsheetId=table_id,
-            fields="sheets(properties(sheetId,title,gridProperties),conditionalFormats)",
-        )
-    )
-    sheet_id = None
-    conditional_formats_count = 0
-    row_count = 0
-    for sheet in spreadsheet.get("sheets", []):
-        if sheet.get("properties", {}).get("title") == "Покупатели":
-            sheet_id = sheet["properties"]["sheetId"]
-            conditional_formats_count = len(sheet.get("conditionalFormats", []))
-            row_count = sheet.get("properties", {}).get("gridProperties", {}).get("rowCount", 0)
-            break
-
-    if sheet_id is None:
-        return
+            paid_manually[telegram_id, nm_id] = row[14] == "TRUE"
+
+    return paid_manually
+
+
+def _apply_paid_manually(buyers: list[Buyer], paid_manually: dict[tuple[int, int], bool]) -> None:
+    """Переносит ручные отметки о выплате из таблицы в объекты Buyer."""
+    for buyer in buyers:
+        key = (buyer.telegram_id, buyer.nm_id)
+        if key in paid_manually and not buyer.is_superbanking_paid:
+            buyer.is_paid_manually = paid_manually[key]
+
+
+def _get_inserted_count(written: _WrittenSheet | None, keys: list[tuple[int, int]]) -> int | None:
+    """
+    Возвращает число новых покупателей сверху листа (покупатели отсортированы от новых к старым)
+    или None, если лист нужно перезаписать целиком.
+    """
+    if written is None or not written.keys:
+        return None
+    if time.monotonic() - written.written_at > SHEETS_FULL_REWRITE_INTERVAL:
+        return None
+
+    inserted_count = len(keys) - len(written.keys)
+    if inserted_count < 0 or keys[inserted_count:] != written.keys:
+        return None
 
+    return inserted_count
+
+
+def _full_rewrite_requests(sheet: _BuyersSheet, rows: list[list]) -> list[dict[str, Any]]:
+    """Запросы, которые перезаписывают лист "Покупатели" целиком."""
+    sheet_id = sheet.sheet_id
     requests = []
 
     # Удаляем существующие conditional formatting rules (в обратном порядке)
-    for i in range(conditional_formats_count - 1, -1, -1):
+    for i in range(sheet.conditional_formats_count - 1, -1, -1):
         requests.append({"deleteConditionalFormatRule": {"sheetId": sheet_id, "index": i}})
 
     # Очищаем старые данные
@@ -192,21 +407,16 @@ async def _write_buyers_to_sheet(aiogoogle: Aiogoogle, sheets_v4: Any, table_id:
 
     if rows:
         # Формируем данные для записи
-        row_data = []
-        for row in rows:
-            cells = [{"userEnteredValue": {"stringValue": str(cell)}} for cell in row[:-1]]
-            # Последняя колонка - checkbox (boolean)
-            cells.append({"userEnteredValue": {"boolValue": row[-1]}})
-            row_data.append({"values": cells})
+        row_data = [_row_to_row_data(row) for row in rows]
 
         needed_rows = len(rows) + 1  # +1 for header row
-        if needed_rows > row_count:
+        if needed_rows > sheet.row_count:
             requests.append(
                 {
                     "appendDimension": {
                         "sheetId": sheet_id,
                         "dimension": "ROWS",
-                        "length": max(needed_rows - row_count, 1000),
+                        "length": max(needed_rows - sheet.row_count, 1000),
                     }
                 }
             )
@@ -237,7 +447,8 @@ async def _write_buyers_to_sheet(aiogoogle: Aiogoogle, sheets_v4: Any, table_id:
             }
         )
 
-        # Conditional formatting: зеленый фон при checked checkbox
+        # Conditional formatting: зеленый фон при checked checkbox.
+        # Диапазон без конца, чтобы правило покрывало строки, добавленные инкрементальной записью
         requests.append(
             {
                 "addConditionalFormatRule": {
@@ -246,7 +457,6 @@ async def _write_buyers_to_sheet(aiogoogle: Aiogoogle, sheets_v4: Any, table_id:
                             {
                                 "sheetId": sheet_id,
                                 "startRowIndex": 1,
-                                "endRowIndex": len(rows) + 1,
                                 "startColumnIndex": 0,
                                 "endColumnIndex": 16,
                             }
@@ -266,25 +476,107 @@ async def _write_buyers_to_sheet(aiogoogle: Aiogoogle, sheets_v4: Any, table_id:
             }
         )
 
-    await aiogoogle.as_service_account(
-        sheets_v4.spreadsheets.batchUpdate(spreadsheetId=table_id, json={"requests": requests})
-    )
+    return requests
+
+
+def _changed_rows_requests(
+    sheet_id: int, rows: list[list], changed_indexes: list[int], inserted_count: int
+) -> list[dict[str, Any]]:
+    """Запросы, которые вставляют новых покупателей в начало листа и перезаписывают только изменённые строки."""
+    requests: list[dict[str, Any]] = []
+    if not changed_indexes:
+        return requests
+
+    if inserted_count:
+        requests.extend(
+            (
+                {
+                    "insertDimension": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "dimension": "ROWS",
+                            "startIndex": 1,
+                            "endIndex": inserted_count + 1,
+                        },
+                        "inheritFromBefore": False,
+                    }
+                },
+                {
+                    "setDataValidation": {
+                        "range": {
+                            "sheetId": sheet_id,
+                            "startRowIndex": 1,
+                            "endRowIndex": inserted_count + 1,
+                            "startColumnIndex": 15,
+                            "endColumnIndex": 16,
+                        },
+                        "rule": {"condition": {"type": "BOOLEAN"}, "strict": True},
+                    }
+                },
+            )
+        )
+
+    # Соседние изменённые строки записываем одним updateCells
+    run_start = changed_indexes[0]
+    for position, index in enumerate(changed_indexes):
+        is_run_end = position + 1 == len(changed_indexes) or changed_indexes[position + 1] != index + 1
+        if not is_run_end:
+            continue
+
+        requests.append(
+            {
+                "updateCells": {
+                    "rows": [_row_to_row_data(row) for row in rows[run_start : index + 1]],
+                    "start": {"sheetId": sheet_id, "rowIndex": run_start + 1, "columnIndex": 0},
+                    "fields": "userEnteredValue",
+                }
+            }
+        )
+        if position + 1 < len(changed_indexes):
+            run_start = changed_indexes[position + 1]
+
+    return requests
+
+
+def _settings_request(sheet_id: int, leads_balance: int, updated_at: str) -> dict[str, Any]:
+    """Лист "Настройка": A2 - остаток лидов, B2 - время обновления."""
+    return {
+        "updateCells": {
+            "rows": [
+                {
+                    "values": [
+                        {"userEnteredValue": {"numberValue": leads_balance}},
+                        {"userEnteredValue": {"stringValue": updated_at}},
+                    ]
+                }
+            ],
+            "start": {"sheetId": sheet_id, "rowIndex": 1, "columnIndex": 0},
+            "fields": "userEnteredValue",
+        }
+    }
+
+
+def _row_to_row_data(row: list) -> dict[str, Any]:
+    cells = [{"userEnteredValue": {"stringValue": str(cell)}} for cell in row[:-1]]
+    # Последняя колонка - checkbox (boolean)
+    cells.append({"userEnteredValue": {"boolValue": row[-1]}})
+    return {"values": cells}
+
+
+def _row_hash(row: list) -> bytes:
+    return hashlib.blake2b(json.dumps(row, ensure_ascii=False).encode("utf-8"), digest_size=16).digest()
 
 
-def _buyer_to_row(buyer: Buyer) -> list[str]:
+def _buyer_to_row(buyer: Buyer, chat_summary: ChatSummary | None) -> list[str]:
     """Конвертирует Buyer в строку для Google Sheets."""
     first_user_msg_time = ""
     last_user_msg_time = ""
     last_user_msg_text = ""
 
-    if buyer.chat_history:
-        user_messages = [msg for msg in buyer.chat_history if "user" in msg and msg.get("user")]
-        if user_messages:
-            first_msg = user_messages[0]
-            last_msg = user_messages[-1]
-            first_user_msg_time = _format_time_msk(first_msg.get("created_at", ""))
-            last_user_msg_time = _format_time_msk(last_msg.get("created_at", ""))
-            last_user_msg_text = last_msg.get("user", "")
+    if chat_summary:
+        first_user_msg_time = _format_time_msk(chat_summary.first_message_at)
+        last_user_msg_time = _format_time_msk(chat_summary.last_message_at)
+        last_user_msg_text = chat_summary.last_message_text
 
     username_link = f"@{buyer.username}" if buyer.username else buyer.fullname
 
@@ -308,12 +600,5 @@ def _buyer_to_row(buyer: Buyer) -> list[str]:
     ]
 
 
-def _format_time_msk(iso_time: str) -> str:
-    if not iso_time:
-        return ""
-    try:
-        dt = datetime.fromisoformat(iso_time)
-        dt_msk = dt.astimezone(MSK_TZ)
-        return dt_msk.strftime("%Y-%m-%d %H:%M:%S")
-    except (ValueError, TypeError):
-        return iso_time
+def _format_time_msk(dt: datetime) -> str:
+    return dt.astimezone(MSK_TZ).strftime("%Y-%m-%d %H:%M:%S")
@@ -1,23 +1,122 @@
 import asyncio
 import json
 import logging
+import time
+import uuid
+from collections import OrderedDict
 from collections.abc import Awaitable, Callable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
-from enum import Enum
+from enum import Enum, StrEnum
+from typing import Any
 
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
 from axiomai.config import MessageDebouncerConfig
+from axiomai.constants import OK_WORDS
+from axiomai.infrastructure.metrics import WaitTimeStats
 
 logger = logging.getLogger(__name__)
 
+BUFFER_KEY_PREFIX = "debouncer:buffer:"
+STATE_KEY_PREFIX = "debouncer:state:"
+PROCESSING_BUFFER_KEY_PREFIX = "debouncer:processing_buffer:"
+PROCESSING_STATE_KEY_PREFIX = "debouncer:processing_state:"
+DUE_ZSET_KEY = "debouncer:due"
+PROCESSING_ZSET_KEY = "debouncer:processing"
+SCHEDULER_BATCH_SIZE = 100
+# Во столько раз чаще TTL аренды она продлевается, пока claim обрабатывается
+CLAIM_RENEW_FACTOR = 3
+
+# Окно накопления — во столько раз больше обычной паузы клиента между сообщениями
+CADENCE_DELAY_FACTOR = 2.5
+# Вес новой паузы в скользящем среднем (EWMA)
+CADENCE_SMOOTHING = 0.3
+CADENCE_CACHE_SIZE = 10_000
+
+APPEND_REJECTED = -1
+APPEND_IMMEDIATE = 0
+
+# Добавляет сообщение в буфер чата за один round trip: сообщения лежат в списке (RPUSH без перечитывания
+# всего буфера), стратегия, имя обработчика, дедлайн и id пачки — в hash состояния. Возвращает пару
+# {результат, id пачки}: результат — APPEND_REJECTED, если буфер PHOTO_ONLY, а в сообщении нет фото,
+# APPEND_IMMEDIATE для длинного сообщения, которое обрабатывается сразу мимо буфера, иначе — количество
+# сообщений в буфере.
+APPEND_MESSAGE_SCRIPT = """
+local strategy = redis.call('HGET', KEYS[2], 'strategy')
+if strategy == 'photo_only' and ARGV[3] == '0' then
+    return {-1, ''}
+end
+if ARGV[10] == '1' then
+    return {0, ''}
+end
+if not strategy then
+    redis.call('HSET', KEYS[2], 'strategy', ARGV[2])
+end
+redis.call('HSETNX', KEYS[2], 'burst', ARGV[11])
+if ARGV[6] ~= '' then
+    redis.call('HSET', KEYS[2], 'handler', ARGV[6])
+end
+if ARGV[7] ~= '' then
+    redis.call('HSET', KEYS[2], 'meta', ARGV[7])
+end
+redis.call('HSET', KEYS[2], 'scheduled_at', ARGV[4])
+local total = redis.call('RPUSH', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+if ARGV[9] == '1' then
+    redis.call('ZADD', KEYS[3], ARGV[4], ARGV[8])
+end
+return {total, redis.call('HGET', KEYS[2], 'burst')}
+"""
+
+# Атомарно забирает наступившие таймеры: буфер и состояние переименовываются в processing-ключи с уникальным
+# claim, поэтому одну пачку сообщений обработает ровно одна реплика, а новые сообщения чата копятся в новый буфер.
+# Claim'ы с истёкшей арендой (реплика упала во время обработки) выдаются повторно.
+CLAIM_DUE_SCRIPT = """
+local claimed = {}
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, member in ipairs(due) do
+    redis.call('ZREM', KEYS[1], member)
+    local buffer = ARGV[4] .. member
+    if redis.call('EXISTS', buffer) == 1 then
+        local claim = member .. '#' .. ARGV[8]
+        local state = ARGV[6] .. member
+        redis.call('RENAME', buffer, ARGV[5] .. claim)
+        redis.call('EXPIRE', ARGV[5] .. claim, ARGV[9])
+        if redis.call('EXISTS', state) == 1 then
+            redis.call('RENAME', state, ARGV[7] .. claim)
+            redis.call('EXPIRE', ARGV[7] .. claim, ARGV[9])
+        end
+        redis.call('ZADD', KEYS[2], ARGV[2], claim)
+        table.insert(claimed, claim)
+    end
+end
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, ARGV[3])
+for _, claim in ipairs(stale) do
+    redis.call('ZADD', KEYS[2], ARGV[2], claim)
+    table.insert(claimed, claim)
+end
+return claimed
+"""
+
 
 class TaskStrategy(Enum):
     ACCUMULATE = "accumulate"
     PHOTO_ONLY = "photo_only"
 
 
+class DebounceHandler(StrEnum):
+    """Имена обработчиков, которыми планировщик обрабатывает сообщения без локального callback'а"""
+
+    PREDIALOG = "predialog"
+    DIALOG = "dialog"
+    ORDER_SCREENSHOT = "order_screenshot"
+    FEEDBACK_SCREENSHOT = "feedback_screenshot"
+    CUT_LABELS_SCREENSHOT = "cut_labels_screenshot"
+
+
 @dataclass
 class MessageData:
     """Данные одного сообщения для накопления"""
@@ -26,7 +125,8 @@ class MessageData:
     timestamp: float
     message_id: int
     has_photo: bool
-    photo_url: str | None = None
+    photo_file_id: str | None = None
+    photo_unique_id: str | None = None
     chat_id: int | None = None  # Добавлено для возможности отправки ответа
 
 
@@ -38,6 +138,69 @@ class AccumulatedMessages:
     timer_id: str
     scheduled_at: float
     strategy: TaskStrategy = TaskStrategy.ACCUMULATE
+    handler: str | None = None
+    meta: dict[str, Any] = field(default_factory=dict)
+    burst_id: str | None = None
+
+
+class AdaptiveDebouncePolicy:
+    """
+    Подбирает окно накопления для каждого нового сообщения чата.
+
+    По timestamp сообщений одной серии считается обычная пауза клиента между сообщениями (EWMA), окно —
+    CADENCE_DELAY_FACTOR таких пауз, но не меньше ``min_delay`` и не больше базовой задержки. Пока темп
+    клиента неизвестен, используется базовая задержка. Сообщения, которыми обычно заканчивается запрос
+    (вопрос, фото в PHOTO_ONLY, "ок"), обрабатываются через короткий ``terminal_delay``.
+    """
+
+    def __init__(self, base_delay: float, min_delay: float, terminal_delay: float) -> None:
+        self.base_delay = base_delay
+        self.min_delay = min(min_delay, base_delay)
+        self.terminal_delay = min(terminal_delay, base_delay)
+        self._ok_words = {ok_word.strip().casefold() for ok_word in OK_WORDS}
+        # timer_key -> (timestamp последнего сообщения, средняя пауза между сообщениями серии)
+        self._cadences: OrderedDict[str, tuple[float, float | None]] = OrderedDict()
+
+    def delay_for(self, timer_key: str, message: MessageData, strategy: TaskStrategy) -> float:
+        cadence = self._observe(timer_key, message.timestamp)
+
+        if self._is_terminal(message, strategy):
+            return self.terminal_delay
+
+        if cadence is None:
+            return self.base_delay
+
+        return min(max(cadence * CADENCE_DELAY_FACTOR, self.min_delay), self.base_delay)
+
+    def _observe(self, timer_key: str, timestamp: float) -> float | None:
+        last_timestamp, cadence = self._cadences.pop(timer_key, (None, None))
+
+        # Паузы длиннее базовой задержки — это уже новый запрос, а не продолжение серии
+        if last_timestamp is not None and 0 <= timestamp - last_timestamp <= self.base_delay:
+            gap = timestamp - last_timestamp
+            cadence = gap if cadence is None else CADENCE_SMOOTHING * gap + (1 - CADENCE_SMOOTHING) * cadence
+
+        self._cadences[timer_key] = (timestamp, cadence)
+        if len(self._cadences) > CADENCE_CACHE_SIZE:
+            self._cadences.popitem(last=False)
+
+        return cadence
+
+    def _is_terminal(self, message: MessageData, strategy: TaskStrategy) -> bool:
+        if strategy == TaskStrategy.PHOTO_ONLY and message.has_photo:
+            return True
+
+        text = (message.text or "").strip()
+        return text.endswith("?") or text.casefold() in self._ok_words
+
+
+ProcessCallback = Callable[[str, int, list[MessageData]], Awaitable[None]]
+# Загружает контекст обработки (кабинет, артикулы, заявки) заранее, пока открыто окно накопления
+PrefetchCallback = Callable[[], Awaitable[Any]]
+# Обработчик, которому передаётся загруженный заранее контекст или None, если загрузить его не удалось
+PrefetchedProcessCallback = Callable[[str, int, list[MessageData], Any], Awaitable[None]]
+# Обработчик, который восстанавливает контекст по сохранённым в Redis метаданным (username, fullname и т.п.)
+RestoredProcessCallback = Callable[[str, int, list[MessageData], dict[str, Any]], Awaitable[None]]
 
 
 class MessageDebouncer:
@@ -46,6 +209,20 @@ class MessageDebouncer:
     и их обработки как единого запроса после паузы.
 
     Использует Redis для временного хранения и asyncio для управления таймерами.
+
+    В режиме планировщика (MESSAGE_DEBOUNCER_REDIS_SCHEDULER) таймеры хранятся в Redis sorted set,
+    а наступившие обрабатывает общий цикл ``run_scheduler`` любой реплики. Если у реплики нет локального
+    callback'а для пачки (сообщение пришло на другую реплику или процесс перезапустился), используется
+    обработчик, зарегистрированный через ``register_handler`` под именем ``handler``. Локальные callback'и
+    хранятся по id пачки, а не чата, и забываются, если пачку за отведённое время обработала другая реплика.
+
+    Окно накопления подбирается ``AdaptiveDebouncePolicy`` под темп конкретного чата (MESSAGE_DEBOUNCE_ADAPTIVE),
+    p50/p95 времени ожидания периодически пишутся в лог и доступны через ``wait_time_percentiles``.
+
+    Если в ``add_message`` передан ``prefetch``, контекст обработки загружается сразу, параллельно с окном
+    накопления, и передаётся локальному callback'у последним аргументом. Каждое новое сообщение чата
+    перезапускает загрузку, чтобы контекст не устарел к моменту обработки. В режиме планировщика контекст
+    заранее не загружается: пачку может забрать другая реплика, и обработчик загружает его сам.
     """
 
     def __init__(self, redis: Redis, config: MessageDebouncerConfig) -> None:
@@ -53,42 +230,98 @@ class MessageDebouncer:
         self.delay_seconds = config.message_debounce_delay
         self.ttl_seconds = config.message_accumulation_ttl
         self.immediate_processing_length = config.immediate_processing_length
+        self.use_redis_scheduler = config.use_redis_scheduler
+        self.scheduler_poll_interval = config.scheduler_poll_interval
+        self.scheduler_claim_ttl = config.scheduler_claim_ttl
+        if config.adaptive_debounce:
+            self._policy = AdaptiveDebouncePolicy(
+                config.message_debounce_delay, config.min_debounce_delay, config.terminal_debounce_delay
+            )
+        else:
+            # Окно всегда равно MESSAGE_DEBOUNCE_DELAY
+            self._policy = AdaptiveDebouncePolicy(
+                config.message_debounce_delay, config.message_debounce_delay, config.message_debounce_delay
+            )
+        self._wait_time_stats = WaitTimeStats()
         self._active_timers: dict[str, asyncio.Task] = {}
+        # id пачки -> (callback, когда забыть его по time.monotonic())
+        self._local_callbacks: OrderedDict[str, tuple[ProcessCallback, float]] = OrderedDict()
+        self._prefetches: dict[str, asyncio.Task] = {}
+        self._handlers: dict[str, RestoredProcessCallback] = {}
+        self._processing_tasks: set[asyncio.Task] = set()
+        self._append_message_script = redis.register_script(APPEND_MESSAGE_SCRIPT)
+        self._claim_due_script = redis.register_script(CLAIM_DUE_SCRIPT)
+
+    def register_handler(self, name: str, handler: RestoredProcessCallback) -> None:
+        self._handlers[name] = handler
+
+    def wait_time_percentiles(self) -> tuple[float, float]:
+        """p50 и p95 времени от последнего сообщения клиента до начала обработки"""
+        return self._wait_time_stats.percentiles()
+
+    def _observe_wait_time(self, messages: list[MessageData]) -> None:
+        if self._wait_time_stats.observe(datetime.now(UTC).timestamp() - messages[-1].timestamp):
+            p50, p95 = self._wait_time_stats.percentiles()
+            logger.info("debouncer wait time p50: %.2fs, p95: %.2fs", p50, p95)
 
     async def add_message(
         self,
         business_connection_id: str,
         chat_id: int,
         message_data: MessageData,
-        process_callback: Callable[[str, int, list[MessageData]], Awaitable[None]],
+        process_callback: ProcessCallback | PrefetchedProcessCallback,
         strategy: TaskStrategy = TaskStrategy.ACCUMULATE,
+        *,
+        handler: str | None = None,
+        meta: dict[str, Any] | None = None,
+        prefetch: PrefetchCallback | None = None,
     ) -> bool:
-        redis_key = _get_redis_key(business_connection_id, chat_id)
         timer_key = f"{business_connection_id}:{chat_id}"
+        is_immediate = bool(message_data.text and len(message_data.text) >= self.immediate_processing_length)
+        delay = self._policy.delay_for(timer_key, message_data, strategy)
+        scheduled_at = datetime.now(UTC).timestamp() + delay
+
+        result, burst_id = await self._append_message_script(
+            keys=[f"{BUFFER_KEY_PREFIX}{timer_key}", f"{STATE_KEY_PREFIX}{timer_key}", DUE_ZSET_KEY],
+            args=[
+                _serialize_message(message_data),
+                strategy.value,
+                int(message_data.has_photo),
+                scheduled_at,
+                self.ttl_seconds,
+                handler or "",
+                json.dumps(meta) if meta else "",
+                timer_key,
+                int(self.use_redis_scheduler),
+                int(is_immediate),
+                uuid.uuid4().hex,
+            ],
+        )
 
-        existing_data = await self.redis.get(redis_key)
-        if existing_data:
-            accumulated = _deserialize_messages(existing_data)
-            if accumulated.strategy == TaskStrategy.PHOTO_ONLY and not message_data.has_photo:
-                logger.info("ignoring message without photo (PHOTO_ONLY task already running). chat: %s", chat_id)
-                return False
-        else:
-            accumulated = AccumulatedMessages(
-                messages=[], timer_id=timer_key, scheduled_at=datetime.now(UTC).timestamp(), strategy=strategy
-            )
+        if result == APPEND_REJECTED:
+            logger.info("ignoring message without photo (PHOTO_ONLY task already running). chat: %s", chat_id)
+            return False
 
-        if message_data.text and len(message_data.text) >= self.immediate_processing_length:
+        if result == APPEND_IMMEDIATE:
             logger.info("processing long message immediately (length: %s)", len(message_data.text))
-            await process_callback(business_connection_id, chat_id, [message_data])
+            if prefetch:
+                await process_callback(business_connection_id, chat_id, [message_data], None)
+            else:
+                await process_callback(business_connection_id, chat_id, [message_data])
             return True
 
-        accumulated.messages.append(message_data)
-        accumulated.scheduled_at = datetime.now(UTC).timestamp() + self.delay_seconds
+        logger.info("added message to accumulation buffer. chat: %s, total: %s", chat_id, result)
 
-        serialized = _serialize_messages(accumulated)
-        await self.redis.setex(redis_key, self.ttl_seconds, serialized)
+        if self.use_redis_scheduler:
+            if prefetch:
+                process_callback = _without_prefetched(process_callback)
+            self._remember_local_callback(_decode(burst_id), process_callback)
+            logger.debug("scheduled chat %s at %s", chat_id, scheduled_at)
+            return True
 
-        logger.info("added message to accumulation buffer. chat: %s, total: %s", chat_id, len(accumulated.messages))
+        self._restart_prefetch(timer_key, prefetch)
+        if prefetch:
+            process_callback = self._with_prefetched(timer_key, process_callback)
 
         if timer_key in self._active_timers:
             old_timer = self._active_timers[timer_key]
@@ -97,41 +330,40 @@ class MessageDebouncer:
                 logger.debug("cancelled previous timer for chat %s", chat_id)
 
         timer_task = asyncio.create_task(
-            self._delayed_process(business_connection_id, chat_id, process_callback, self.delay_seconds)
+            self._delayed_process(business_connection_id, chat_id, process_callback, delay)
         )
         self._active_timers[timer_key] = timer_task
 
-        logger.debug("started new timer for chat %s (%ss)", chat_id, self.delay_seconds)
+        logger.debug("started new timer for chat %s (%ss)", chat_id, delay)
         return True
 
     async def _delayed_process(
         self,
         business_connection_id: str,
         chat_id: int,
-        process_callback: Callable[[str, int, list[MessageData]], Awaitable[None]],
+        process_callback: ProcessCallback,
         delay: float,
     ) -> None:
         """Ожидает паузу и затем обрабатывает накопленные сообщения"""
         try:
             await asyncio.sleep(delay)
 
-            redis_key = _get_redis_key(business_connection_id, chat_id)
             timer_key = f"{business_connection_id}:{chat_id}"
 
-            # Получаем накопленные сообщения
-            data = await self.redis.get(redis_key)
-            if not data:
+            # Забираем накопленные сообщения
+            accumulated = await self._pop_accumulated(
+                f"{BUFFER_KEY_PREFIX}{timer_key}", f"{STATE_KEY_PREFIX}{timer_key}", timer_key
+            )
+            if not accumulated:
                 logger.warning("no accumulated messages found for chat %s", chat_id)
                 return
 
-            accumulated = _deserialize_messages(data)
-
             logger.info("processing accumulated messages. chat: %s, total: %s", chat_id, len(accumulated.messages))
 
-            await self.redis.delete(redis_key)
             if timer_key in self._active_timers:
                 del self._active_timers[timer_key]
 
+            self._observe_wait_time(accumulated.messages)
             try:
                 await process_callback(business_connection_id, chat_id, accumulated.messages)
             except Exception as e:
@@ -143,57 +375,234 @@ class MessageDebouncer:
         except Exception as e:
             logger.exception("error in delayed processing: %s", exc_info=e)
 
+    async def run_scheduler(self) -> None:
+        """Общий цикл планировщика: забирает наступившие таймеры из Redis и запускает их обработку."""
+        await self._restore_pending_buffers()
+
+        logger.info("message debouncer scheduler started")
+        try:
+            while True:
+                try:
+                    claims = await self._claim_due()
+                except Exception as e:
+                    logger.exception("failed to claim due debouncer timers", exc_info=e)
+                    claims = []
+
+                for claim in claims:
+                    task = asyncio.create_task(self._process_claim(claim))
+                    self._processing_tasks.add(task)
+                    task.add_done_callback(self._processing_tasks.discard)
+
+                if len(claims) < SCHEDULER_BATCH_SIZE:
+                    await asyncio.sleep(self.scheduler_poll_interval)
+        finally:
+            for task in self._processing_tasks:
+                task.cancel()
+
+    async def _restore_pending_buffers(self) -> None:
+        """Ставит в очередь буферы, оставшиеся без таймера (например, после рестарта в режиме asyncio-таймеров)."""
+        now = datetime.now(UTC).timestamp()
+        restored = 0
+        async for key in self.redis.scan_iter(match=f"{BUFFER_KEY_PREFIX}*"):
+            buffer_key = key.decode("utf-8") if isinstance(key, bytes) else key
+            timer_key = buffer_key.removeprefix(BUFFER_KEY_PREFIX)
+            restored += await self.redis.zadd(DUE_ZSET_KEY, {timer_key: now}, nx=True)
+
+        if restored:
+            logger.info("restored %s pending message buffers on startup", restored)
+
+    async def _claim_due(self) -> list[str]:
+        now = datetime.now(UTC).timestamp()
+        claims = await self._claim_due_script(
+            keys=[DUE_ZSET_KEY, PROCESSING_ZSET_KEY],
+            args=[
+                now,
+                now + self.scheduler_claim_ttl,
+                SCHEDULER_BATCH_SIZE,
+                BUFFER_KEY_PREFIX,
+                PROCESSING_BUFFER_KEY_PREFIX,
+                STATE_KEY_PREFIX,
+                PROCESSING_STATE_KEY_PREFIX,
+                uuid.uuid4().hex,
+                self.ttl_seconds,
+            ],
+        )
+        return [claim.decode("utf-8") if isinstance(claim, bytes) else claim for claim in claims]
+
+    async def _process_claim(self, claim: str) -> None:
+        timer_key = claim.rsplit("#", 1)[0]
+        business_connection_id, chat_id_str = timer_key.rsplit(":", 1)
+        chat_id = int(chat_id_str)
+        processing_buffer_key = f"{PROCESSING_BUFFER_KEY_PREFIX}{claim}"
+        processing_state_key = f"{PROCESSING_STATE_KEY_PREFIX}{claim}"
+        heartbeat = asyncio.create_task(self._renew_claim(claim, processing_buffer_key, processing_state_key))
+
+        try:
+            # Буфер удаляется только после обработки: если реплика упадёт или обработка будет отменена,
+            # claim с истёкшей арендой выдаётся повторно вместе с сообщениями
+            accumulated = await self._read_accumulated(processing_buffer_key, processing_state_key, timer_key)
+            if not accumulated:
+                logger.warning("no accumulated messages found for claim %s", claim)
+            else:
+                logger.info(
+                    "processing accumulated messages. chat: %s, total: %s", chat_id, len(accumulated.messages)
+                )
+                self._observe_wait_time(accumulated.messages)
+
+                local_callback = self._local_callbacks.pop(accumulated.burst_id, None)
+                if local_callback:
+                    await local_callback[0](business_connection_id, chat_id, accumulated.messages)
+                elif accumulated.handler in self._handlers:
+                    await self._handlers[accumulated.handler](
+                        business_connection_id, chat_id, accumulated.messages, accumulated.meta
+                    )
+                else:
+                    logger.error(
+                        "no handler %s registered for chat %s, dropping messages", accumulated.handler, chat_id
+                    )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("error processing accumulated messages", exc_info=e)
+        finally:
+            heartbeat.cancel()
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(processing_buffer_key, processing_state_key)
+            pipe.zrem(PROCESSING_ZSET_KEY, claim)
+            await pipe.execute()
+
+    async def _renew_claim(self, claim: str, processing_buffer_key: str, processing_state_key: str) -> None:
+        """Продлевает аренду claim'а, пока он обрабатывается, — иначе его выдадут повторно и пачка обработается дважды."""
+        while True:
+            await asyncio.sleep(self.scheduler_claim_ttl / CLAIM_RENEW_FACTOR)
+            try:
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.zadd(
+                        PROCESSING_ZSET_KEY, {claim: datetime.now(UTC).timestamp() + self.scheduler_claim_ttl}, xx=True
+                    )
+                    pipe.expire(processing_buffer_key, self.ttl_seconds)
+                    pipe.expire(processing_state_key, self.ttl_seconds)
+                    await pipe.execute()
+            except RedisError as e:
+                logger.warning("failed to renew debouncer claim %s: %s", claim, e)
+
+    def _remember_local_callback(self, burst_id: str, process_callback: ProcessCallback) -> None:
+        """Запоминает callback пачки и забывает просроченные: их пачки уже обработала другая реплика."""
+        now = time.monotonic()
+        while self._local_callbacks and next(iter(self._local_callbacks.values()))[1] <= now:
+            self._local_callbacks.popitem(last=False)
+
+        self._local_callbacks[burst_id] = (process_callback, now + self.ttl_seconds + self.scheduler_claim_ttl)
+        self._local_callbacks.move_to_end(burst_id)
+
+    def _restart_prefetch(self, timer_key: str, prefetch: PrefetchCallback | None) -> None:
+        """Перезапускает загрузку контекста: загруженный до нового сообщения контекст мог устареть."""
+        old_prefetch = self._prefetches.pop(timer_key, None)
+        if old_prefetch:
+            old_prefetch.cancel()
+
+        if prefetch:
+            self._prefetches[timer_key] = asyncio.create_task(prefetch())
+
+    def _with_prefetched(self, timer_key: str, process_callback: PrefetchedProcessCallback) -> ProcessCallback:
+        async def callback(business_connection_id: str, chat_id: int, messages: list[MessageData]) -> None:
+            await process_callback(business_connection_id, chat_id, messages, await self._take_prefetched(timer_key))
+
+        return callback
+
+    async def _take_prefetched(self, timer_key: str) -> Any:
+        """Возвращает загруженный заранее контекст или None — тогда обработчик загрузит его сам."""
+        prefetch = self._prefetches.pop(timer_key, None)
+        if not prefetch:
+            return None
+
+        try:
+            return await prefetch
+        except Exception as e:
+            logger.exception("failed to prefetch context for %s", timer_key, exc_info=e)
+            return None
+
+    async def _read_accumulated(self, buffer_key: str, state_key: str, timer_key: str) -> AccumulatedMessages | None:
+        """Читает буфер сообщений вместе с его состоянием, не удаляя их"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(buffer_key, 0, -1)
+            pipe.hgetall(state_key)
+            raw_messages, state = await pipe.execute()
+
+        if not raw_messages:
+            return None
+
+        return _build_accumulated(timer_key, raw_messages, state)
+
+    async def _pop_accumulated(self, buffer_key: str, state_key: str, timer_key: str) -> AccumulatedMessages | None:
+        """Атомарно читает и удаляет буфер сообщений вместе с его состоянием"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lrange(buffer_key, 0, -1)
+            pipe.hgetall(state_key)
+            pipe.delete(buffer_key, state_key)
+            raw_messages, state, _ = await pipe.execute()
+
+        if not raw_messages:
+            return None
+
+        return _build_accumulated(timer_key, raw_messages, state)
 
-def _get_redis_key(business_connection_id: str, chat_id: int) -> str:
-    """Генерация ключа Redis для уникального чата"""
-    return f"pending_messages:{business_connection_id}:{chat_id}"
 
+def _decode(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
 
-def _serialize_messages(accumulated: AccumulatedMessages) -> str:
-    """Сериализация накопленных сообщений в JSON"""
+
+def _serialize_message(message: MessageData) -> str:
+    """Сериализация одного сообщения в JSON"""
     return json.dumps(
         {
-            "messages": [
-                {
-                    "text": msg.text,
-                    "timestamp": msg.timestamp,
-                    "message_id": msg.message_id,
-                    "has_photo": msg.has_photo,
-                    "photo_url": msg.photo_url,
-                }
-                for msg in accumulated.messages
-            ],
-            "timer_id": accumulated.timer_id,
-            "scheduled_at": accumulated.scheduled_at,
-            "strategy": accumulated.strategy.value,
+            "text": message.text,
+            "timestamp": message.timestamp,
+            "message_id": message.message_id,
+            "has_photo": message.has_photo,
+            "photo_file_id": message.photo_file_id,
+            "photo_unique_id": message.photo_unique_id,
         }
     )
 
 
-def _deserialize_messages(data: bytes | str) -> AccumulatedMessages:
-    """Десериализация накопленных сообщений из JSON"""
-    if isinstance(data, bytes):
-        data = data.decode("utf-8")
+def _deserialize_message(data: bytes | str) -> MessageData:
+    """Десериализация одного сообщения из JSON"""
+    parsed = json.loads(_decode(data))
+    return MessageData(
+        text=parsed["text"],
+        timestamp=parsed["timestamp"],
+        message_id=parsed["message_id"],
+        has_photo=parsed["has_photo"],
+        photo_file_id=parsed.get("photo_file_id"),
+        photo_unique_id=parsed.get("photo_unique_id"),
+    )
+
 
-    parsed = json.loads(data)
-    strategy = TaskStrategy(parsed.get("strategy", "accumulate"))
+def _build_accumulated(
+    timer_key: str, raw_messages: list[bytes | str], state: dict[bytes | str, bytes | str]
+) -> AccumulatedMessages:
+    """Собирает накопленные сообщения из списка сообщений и hash состояния буфера"""
+    decoded_state = {_decode(key): _decode(value) for key, value in state.items()}
     return AccumulatedMessages(
-        messages=[
-            MessageData(
-                text=msg["text"],
-                timestamp=msg["timestamp"],
-                message_id=msg["message_id"],
-                has_photo=msg["has_photo"],
-                photo_url=msg.get("photo_url"),
-            )
-            for msg in parsed["messages"]
-        ],
-        timer_id=parsed["timer_id"],
-        scheduled_at=parsed["scheduled_at"],
-        strategy=strategy,
+        messages=[_deserialize_message(raw) for raw in raw_messages],
+        timer_id=timer_key,
+        scheduled_at=float(decoded_state.get("scheduled_at", 0)),
+        strategy=TaskStrategy(decoded_state.get("strategy", TaskStrategy.ACCUMULATE.value)),
+        handler=decoded_state.get("handler"),
+        meta=json.loads(decoded_state["meta"]) if decoded_state.get("meta") else {},
+        burst_id=decoded_state.get("burst"),
     )
 
 
+def _without_prefetched(process_callback: PrefetchedProcessCallback) -> ProcessCallback:
+    async def callback(business_connection_id: str, chat_id: int, messages: list[MessageData]) -> None:
+        await process_callback(business_connection_id, chat_id, messages, None)
+
+    return callback
+
+
 def merge_messages_text(messages: list[MessageData]) -> str:
     """Объединяет текст из нескольких сообщений в единую строку"""
     texts = [msg.text for msg in messages if msg.text]
@@ -0,0 +1,28 @@
+import statistics
+from collections import deque
+
+WAIT_TIME_WINDOW = 1000
+WAIT_TIME_LOG_EVERY = 100
+
+
+class WaitTimeStats:
+    """Время ожидания по последним WAIT_TIME_WINDOW наблюдениям для p50/p95."""
+
+    def __init__(self) -> None:
+        self._wait_times: deque[float] = deque(maxlen=WAIT_TIME_WINDOW)
+        self._observed = 0
+
+    def observe(self, wait_time: float) -> bool:
+        """Добавляет наблюдение. Возвращает True раз в WAIT_TIME_LOG_EVERY наблюдений — пора писать метрики в лог."""
+        self._wait_times.append(max(wait_time, 0))
+        self._observed += 1
+        return self._observed % WAIT_TIME_LOG_EVERY == 0
+
+    def percentiles(self) -> tuple[float, float]:
+        """Возвращает p50 и p95 времени ожидания"""
+        if len(self._wait_times) < 2:  # noqa: PLR2004
+            wait_time = self._wait_times[0] if self._wait_times else 0.0
+            return wait_time, wait_time
+
+        quantiles = statistics.quantiles(self._wait_times, n=100, method="inclusive")
+        return quantiles[49], quantiles[94]
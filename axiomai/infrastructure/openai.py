@@ -1,8 +1,11 @@
+import hashlib
 import json
 import logging
 import re
+import textwrap
+from collections.abc import Iterable
 from contextlib import suppress
-from typing import TypedDict
+from typing import Any, Self, TypedDict
 
 from httpx import AsyncClient, AsyncHTTPTransport
 from openai import AsyncOpenAI
@@ -17,6 +20,9 @@ from axiomai.constants import (
 )
 from axiomai.infrastructure.database.models import Buyer
 from axiomai.infrastructure.database.models.cashback_table import CashbackArticle
+from axiomai.infrastructure.openai_limiter import OpenAILane, OpenAILimiter, estimate_tokens
+from axiomai.infrastructure.photo_fetcher import Photo
+from axiomai.infrastructure.screenshot_verdict_cache import ScreenshotVerdictCache
 
 logger = logging.getLogger(__name__)
 
@@ -53,25 +59,82 @@ class PredialogResult(TypedDict):
     article_ids: list[int]
 
 
+class PromptBuilder:
+    """
+    Собирает input для Responses API с побайтно стабильным началом.
+
+    Части идут по возрастанию изменчивости: системный промпт → каталог кабинета и инструкция → история диалога →
+    новое сообщение. OpenAI кеширует общий префикс запросов, поэтому всё, что меняется чаще, стоит после более
+    стабильного. Текст нормализуется (общий отступ, пробелы в конце строк), чтобы не зависеть от форматирования кода.
+    """
+
+    def __init__(self, system: str) -> None:
+        self._system = _normalize_prompt(system)
+        self._catalogue: list[dict[str, str]] = []
+        self._history: list[dict[str, str]] = []
+        self._message: list[dict[str, str]] = []
+
+    def catalogue(self, text: str, image_urls: Iterable[str] = ()) -> Self:
+        self._catalogue = _build_content(text, image_urls)
+        return self
+
+    def history(self, entries: list[ChatHistoryEntry]) -> Self:
+        self._history = []
+        for entry in entries:
+            self._history.append({"role": "user", "content": entry["user"]})
+            self._history.append({"role": "assistant", "content": entry["assistant"]})
+        return self
+
+    def message(self, text: str, image_urls: Iterable[str] = ()) -> Self:
+        self._message = _build_content(text, image_urls)
+        return self
+
+    def build(self) -> list[dict[str, Any]]:
+        messages: list[dict[str, Any]] = [{"role": "system", "content": self._system}]
+        if self._catalogue:
+            messages.append({"role": "user", "content": self._catalogue})
+        messages.extend(self._history)
+        if self._message:
+            messages.append({"role": "user", "content": self._message})
+        return messages
+
+    def cache_key(self, operation: str, cabinet_id: int | None) -> str:
+        """Ключ кеша промпта: общий для запросов кабинета с тем же системным промптом и каталогом."""
+        prefix = json.dumps([self._system, self._catalogue], ensure_ascii=False)
+        digest = hashlib.sha256(prefix.encode()).hexdigest()[:16]
+        return f"axiomai:{operation}:{cabinet_id or 0}:{digest}"
+
+
 class OpenAIGateway:
-    def __init__(self, config: OpenAIConfig) -> None:
+    def __init__(self, config: OpenAIConfig, verdict_cache: ScreenshotVerdictCache, limiter: OpenAILimiter) -> None:
         self._client = AsyncOpenAI(
             api_key=config.openai_api_key,
             http_client=AsyncClient(proxy=config.proxy, transport=AsyncHTTPTransport(local_address="0.0.0.0")),
+            # Повторы делает OpenAILimiter, освобождая слот на время задержки
+            max_retries=0,
         )
+        self._verdict_cache = verdict_cache
+        self._limiter = limiter
 
     async def classify_order_screenshot(
         self,
-        photo_url: str,
+        photo: Photo,
         articles: list[CashbackArticle],
     ) -> ClassifyOrderResult:
         """Классифицирует скриншот заказа по списку товаров."""
         articles_text = "\n".join(
             f'- nm_id={art.nm_id}, Название: "{art.title}", Бренд: "{art.brand_name}"'
-            for art in articles
+            for art in _sorted_by_nm_id(articles)
         )
         first_instruction = articles[0].instruction_text if articles else None
         valid_nm_ids = {art.nm_id for art in articles}
+
+        cache_key = ScreenshotVerdictCache.build_key(
+            "classify_order_screenshot", photo.content, valid_nm_ids, first_instruction
+        )
+        if cached := await self._verdict_cache.get(cache_key):
+            logger.info("classify_order_screenshot verdict cache hit %s", cached)
+            return cached
         
         system_content = """
         Ты помощник для анализа скриншотов заказов Wildberries.
@@ -96,37 +159,32 @@ class OpenAIGateway:
         - cancel_reason = причина отказа, если is_order = false
         """
         
-        prompt = f"""
+        catalogue = f"""
         ЦЕЛЕВЫЕ ТОВАРЫ (ищем заказ ОДНОГО из них):
         {articles_text}
 
         ИНСТРУКЦИЯ (дополнительные критерии для проверки):
         {first_instruction}
-        """
-
-        user_content = [
-            {"type": "input_text", "text": prompt},
-            {"type": "input_image", "image_url": photo_url},
-        ]
 
-        for art in articles:
-            if art.image_url:
-                user_content.append({"type": "input_image", "image_url": art.image_url})
+        Далее — эталонные изображения целевых товаров (если есть).
+        """
 
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": user_content},
-        ]
+        prompt = (
+            PromptBuilder(system_content)
+            .catalogue(catalogue, [art.image_url for art in _sorted_by_nm_id(articles) if art.image_url])
+            .message("Скриншот клиента:", [photo.data_url])
+        )
 
-        response = await self._client.responses.create(
+        response = await self._create_response(
+            "classify_order_screenshot",
+            OpenAILane.PHOTO,
             model=MODEL_NAME,
-            input=messages,
+            input=prompt.build(),
             reasoning={"effort": GPT_REASONING},
             max_output_tokens=GPT_MAX_OUTPUT_TOKENS_PHOTO_ANALYSIS,
-            prompt_cache_key=_build_prompt_cache_key("classify_order_screenshot"),
+            prompt_cache_key=prompt.cache_key("classify_order_screenshot", _cabinet_id(articles)),
             prompt_cache_retention="24h",
         )
-        _log_response_usage("classify_order_screenshot", response)
 
         result = _extract_response_text(response)
 
@@ -139,22 +197,30 @@ class OpenAIGateway:
             if parsed.get("nm_id") and parsed["nm_id"] not in valid_nm_ids:
                 parsed["nm_id"] = None
                 parsed["is_order"] = False
+            await self._verdict_cache.set(cache_key, parsed)
             return parsed
 
         return {"is_order": False, "nm_id": None, "price": None, "cancel_reason": None}
 
     async def classify_feedback_screenshot(
         self,
-        photo_url: str,
+        photo: Photo,
         articles: list[CashbackArticle],
     ) -> ClassifyFeedbackResult:
         """Классифицирует скриншот отзыва по списку товаров."""
         articles_text = "\n".join(
             f'- nm_id={art.nm_id}, Название: "{art.title}", Бренд: "{art.brand_name}"'
-            for art in articles
+            for art in _sorted_by_nm_id(articles)
         )
         first_instruction = articles[0].instruction_text if articles else None
         valid_nm_ids = {art.nm_id for art in articles}
+
+        cache_key = ScreenshotVerdictCache.build_key(
+            "classify_feedback_screenshot", photo.content, valid_nm_ids, first_instruction
+        )
+        if cached := await self._verdict_cache.get(cache_key):
+            logger.info("classify_feedback_screenshot verdict cache hit %s", cached)
+            return cached
         
         system_content = """
         Ты помощник для анализа скриншотов отзывов Wildberries.
@@ -177,49 +243,38 @@ class OpenAIGateway:
         - cancel_reason = причина отказа, если is_feedback = false
         """
         
-        prompt = f"""
-        Подумай и скажи есть ли на скриншоте ОТЗЫВ на один из наших товаров на Wildberries, сделанный согласно нашим КРИТЕРИЯМ.
-
+        catalogue = f"""
         ЦЕЛЕВЫЕ ТОВАРЫ (ищем отзыв на ОДИН из них):
         {articles_text}
         
         ИНСТРУКЦИЯ (дополнительные критерии для проверки):
         {first_instruction}
+
+        Далее — эталонные изображения целевых товаров (если есть).
         """
 
-        user_content = [
-            {"type": "input_text", "text": prompt},
-            {"type": "input_image", "image_url": photo_url},
-        ]
-        
-        for art in articles:
-            if art.image_url:
-                user_content.append({"type": "input_image", "image_url": art.image_url})
-        
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user","content": user_content},
-        ]
+        prompt = (
+            PromptBuilder(system_content)
+            .catalogue(catalogue, [art.image_url for art in _sorted_by_nm_id(articles) if art.image_url])
+            .message(
+                "Подумай и скажи есть ли на скриншоте клиента ОТЗЫВ на один из наших товаров на Wildberries, "
+                "сделанный согласно нашим КРИТЕРИЯМ. Скриншот клиента:",
+                [photo.data_url],
+            )
+        )
 
-        response = await self._client.responses.create(
+        response = await self._create_response(
+            "classify_feedback_screenshot",
+            OpenAILane.PHOTO,
             model=MODEL_NAME,
-            input=messages,
+            input=prompt.build(),
             reasoning={"effort": GPT_REASONING},
             max_output_tokens=GPT_MAX_OUTPUT_TOKENS_PHOTO_ANALYSIS,
-            prompt_cache_key=_build_prompt_cache_key("classify_feedback_screenshot"),
+            prompt_cache_key=prompt.cache_key("classify_feedback_screenshot", _cabinet_id(articles)),
             prompt_cache_retention="24h",
         )
-        _log_response_usage("classify_feedback_screenshot", response)
 
-
-        result = None
-        for item in response.output:
-            if getattr(item, "content", None):
-                for block in item.content:
-                    text = getattr(block, "text", None)
-                    if text:
-                        result = text.strip()
-                        break
+        result = _extract_response_text(response)
 
         if not result:
             return {"is_feedback": False, "nm_id": None, "cancel_reason": None}
@@ -231,17 +286,25 @@ class OpenAIGateway:
             if parsed.get("nm_id") and parsed["nm_id"] not in valid_nm_ids:
                 parsed["nm_id"] = None
                 parsed["is_feedback"] = False
+            await self._verdict_cache.set(cache_key, parsed)
             return parsed
 
         return {"is_feedback": False, "nm_id": None, "cancel_reason": None}
 
     async def classify_cut_labels_photo(
         self,
-        photo_url: str,
+        photo: Photo,
         articles: list[CashbackArticle] | None = None,
     ) -> ClassifyCutLabelsResult:
         first_instruction = articles[0].instruction_text if articles else None
 
+        cache_key = ScreenshotVerdictCache.build_key(
+            "classify_cut_labels_photo", photo.content, {art.nm_id for art in articles or []}, first_instruction
+        )
+        if cached := await self._verdict_cache.get(cache_key):
+            logger.info("classify_cut_labels_photo verdict cache hit %s", cached)
+            return cached
+
         system_content = """
         Ты помощник для анализа фотографий разрезанных этикеток Wildberries.
         
@@ -250,32 +313,31 @@ class OpenAIGateway:
         - is_cut_labels = true, если на фотографии есть РАЗРЕЗАННЫЕ/ПОРВАННЫЕ/ЗАМАЗАННЫЕ этикетки (штрихкода или QR-кода) Wildberries,
         - cancel_reason = причина отказа, если is_cut_labels = false
         """
-        prompt = f"""
-        Подумай и скажи есть ли на фотографии клиента РАЗРЕЗАННЫЕ/ПОРВАННЫЕ/ЗАМАЗАННЫЕ этикетки (штрихкода или QR-кода) Wildberries.
-        
+        catalogue = f"""
         ИНСТРУКЦИЯ (дополнительные критерии для проверки):
         {first_instruction}
         """
 
-        user_content = [
-            {"type": "input_text", "text": prompt},
-            {"type": "input_image", "image_url": photo_url},
-        ]
-
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": user_content},
-        ]
+        prompt = (
+            PromptBuilder(system_content)
+            .catalogue(catalogue)
+            .message(
+                "Подумай и скажи есть ли на фотографии клиента РАЗРЕЗАННЫЕ/ПОРВАННЫЕ/ЗАМАЗАННЫЕ этикетки "
+                "(штрихкода или QR-кода) Wildberries. Фотография клиента:",
+                [photo.data_url],
+            )
+        )
 
-        response = await self._client.responses.create(
+        response = await self._create_response(
+            "classify_cut_labels_photo",
+            OpenAILane.PHOTO,
             model=MODEL_NAME,
-            input=messages,
+            input=prompt.build(),
             reasoning={"effort": GPT_REASONING},
             max_output_tokens=GPT_MAX_OUTPUT_TOKENS_PHOTO_ANALYSIS,
-            prompt_cache_key=_build_prompt_cache_key("classify_cut_labels_photo"),
+            prompt_cache_key=prompt.cache_key("classify_cut_labels_photo", _cabinet_id(articles)),
             prompt_cache_retention="24h",
         )
-        _log_response_usage("classify_cut_labels_photo", response)
 
         result = _extract_response_text(response)
 
@@ -285,6 +347,7 @@ class OpenAIGateway:
         with suppress(json.JSONDecodeError, TypeError):
             result = json.loads(result)
             logger.info("classified cut labels screenshot %s", result)
+            await self._verdict_cache.set(cache_key, result)
             return result
 
         return {"is_cut_labels": False, "cancel_reason": None}
@@ -296,7 +359,12 @@ class OpenAIGateway:
         current_buyers: list[Buyer],
     ) -> AnswerResult:
         """Отвечает на вопрос пользователя в контексте кешбек-диалога."""
-        articles_text = "\n".join([f"- ID:{article.id} Артикул WB: {article.nm_id}, Название: {article.title}" for article in articles])
+        articles_text = "\n".join(
+            [
+                f"- ID:{article.id} Артикул WB: {article.nm_id}, Название: {article.title}"
+                for article in _sorted_by_id(articles)
+            ]
+        )
         current_buyers_text = "\n".join(
             [
                 f"- Артикул WB:{buyer.nm_id}, Скриншот заказа:{buyer.is_ordered} Скриншот отзыва:{buyer.is_left_feedback} Фото разрезанных этикеток:{buyer.is_left_feedback}"
@@ -344,33 +412,33 @@ class OpenAIGateway:
         Не путай вопросы или сомнения с командами — только явные намерения.
         """
         
-        prompt = f"""
+        catalogue = f"""
         ИНСТРУКЦИЯ, что и как нужно делать клиенту
         (МОЖЕШЬ  КРАТКО ПЕРЕСКАЗАТЬ КЛИЕНТУ, ЕСЛИ ОН НЕ ПОНИМАЕТ ЧТО ДЕЛАТЬ):
         {instruction_text}
 
         ДОСТУПНЫЕ ТОВАРЫ (`articles_list`):
         {articles_text}
+        """
 
+        message = f"""
         ТЕКУЩИЕ ЗАЯВКИ (`buyers_list`):
         {current_buyers_text}
         
         Новое сообщение клиента: "{user_message}"
         """
 
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": prompt},
-        ]
+        prompt = PromptBuilder(system_content).catalogue(catalogue).message(message)
 
-        response = await self._client.responses.create(
+        response = await self._create_response(
+            "answer_user_question",
+            OpenAILane.TEXT,
             model=MODEL_NAME,
-            input=messages,
+            input=prompt.build(),
             max_output_tokens=GPT_MAX_OUTPUT_TOKENS,
-            prompt_cache_key=_build_prompt_cache_key("answer_user_question"),
+            prompt_cache_key=prompt.cache_key("answer_user_question", _cabinet_id(articles)),
             prompt_cache_retention="24h",
         )
-        _log_response_usage("answer_user_question", response)
 
         result = _extract_response_text(response)
         return _parse_answer_result(result)
@@ -380,21 +448,15 @@ class OpenAIGateway:
         user_message: str,
         articles: list[CashbackArticle],
         chat_history: list[ChatHistoryEntry] | None = None,
-        photo_url: str | None = None,
+        photo: Photo | None = None,
     ) -> PredialogResult:
         """Ведёт pre-dialog общение с клиентом до классификации артикула."""
-        articles_info = "\n".join(f"- ID:{article.id} | Название: {article.title}" for article in articles)
-        articles_titles = "\n".join(f"- {article.title}" for article in articles)
+        articles_info = "\n".join(
+            f"- ID:{article.id} | Название: {article.title}" for article in _sorted_by_id(articles)
+        )
+        articles_titles = "\n".join(f"- {article.title}" for article in _sorted_by_id(articles))
         valid_ids = {article.id for article in articles}
 
-        history_text = ""
-        if chat_history:
-            history_lines = []
-            for entry in chat_history[-10:]:
-                history_lines.append(f"Клиент: {entry['user']}")
-                history_lines.append(f"Ты: {entry['assistant']}")
-            history_text = "\n".join(history_lines)
-
         # во тут вообще без понятия как в промпт передать конктретную инструкцию, поэтому передаю самую первую
         instructions = []
         for article in articles:
@@ -433,7 +495,7 @@ class OpenAIGateway:
         Ответ: [ARTICLE:123]Отлично, заказывайте на сайте товар, артикул: [АРТИКУЛ_РОЛИКА_ИЗ_ARTICLE_TITLES]
         """
         
-        prompt = f"""
+        catalogue = f"""
         ИНСТРУКЦИЯ, что и как нужно делать клиенту
         (МОЖЕШЬ  КРАТКО ПЕРЕСКАЗАТЬ КЛИЕНТУ, ЕСЛИ ОН НЕ ПОНИМАЕТ ЧТО ДЕЛАТЬ):
         {first_instruction_text}
@@ -444,34 +506,25 @@ class OpenAIGateway:
         Список товаров для показа пользователю:
         {articles_titles}
         (ПОКАЗЫВАЙ ТОЛЬКО НАЗВАНИЕ ТОВАРА, БЕЗ ПРИЛАГАТЕЛЬНЫХ, например: Диски ватные специальные -> Диски)
-        
-        {"История диалога:" + chr(10) + history_text if history_text else ""}
-
-        Новое сообщение клиента: "{user_message}"
         """
 
-        user_content: list[dict[str, str]] | str
-        if photo_url:
-            user_content = [
-                {"type": "input_text", "text": prompt},
-                {"type": "input_image", "image_url": photo_url},
-            ]
-        else:
-            user_content = prompt
-
-        messages = [
-            {"role": "system", "content": system_content},
-            {"role": "user", "content": user_content},
-        ]
+        # Предыдущие реплики — отдельными сообщениями, чтобы каждая новая только дописывалась в конец запроса
+        prompt = (
+            PromptBuilder(system_content)
+            .catalogue(catalogue)
+            .history((chat_history or [])[-10:])
+            .message(f'Новое сообщение клиента: "{user_message}"', [photo.data_url] if photo else [])
+        )
 
-        response = await self._client.responses.create(
+        response = await self._create_response(
+            "chat_with_client",
+            OpenAILane.TEXT,
             model=MODEL_NAME,
-            input=messages,
+            input=prompt.build(),
             max_output_tokens=GPT_MAX_OUTPUT_TOKENS,
-            prompt_cache_key=_build_prompt_cache_key("chat_with_client"),
+            prompt_cache_key=prompt.cache_key("chat_with_client", _cabinet_id(articles)),
             prompt_cache_retention="24h",
         )
-        _log_response_usage("chat_with_client", response)
 
         result = _extract_response_text(response)
         parsed = _parse_predialog_result(result)
@@ -481,6 +534,13 @@ class OpenAIGateway:
 
         return parsed
 
+    async def _create_response(self, operation: str, lane: OpenAILane, **request: Any) -> Response:
+        response = await self._limiter.call(
+            lane, estimate_tokens(request), lambda: self._client.responses.create(**request)
+        )
+        _log_response_usage(operation, response)
+        return response
+
 
 def _extract_response_text(response: Response) -> str | None:
     """Извлекает текст ответа из response объекта OpenAI"""
@@ -493,8 +553,26 @@ def _extract_response_text(response: Response) -> str | None:
     return None
 
 
-def _build_prompt_cache_key(scope: str) -> str:
-    return f"axiomai:{scope}"
+def _normalize_prompt(text: str) -> str:
+    return textwrap.dedent("\n".join(line.rstrip() for line in text.splitlines())).strip()
+
+
+def _build_content(text: str, image_urls: Iterable[str]) -> list[dict[str, str]]:
+    content = [{"type": "input_text", "text": _normalize_prompt(text)}]
+    content.extend({"type": "input_image", "image_url": image_url} for image_url in image_urls)
+    return content
+
+
+def _sorted_by_id(articles: list[CashbackArticle]) -> list[CashbackArticle]:
+    return sorted(articles, key=lambda article: article.id)
+
+
+def _sorted_by_nm_id(articles: list[CashbackArticle]) -> list[CashbackArticle]:
+    return sorted(articles, key=lambda article: article.nm_id)
+
+
+def _cabinet_id(articles: list[CashbackArticle] | None) -> int | None:
+    return articles[0].cabinet_id if articles else None
 
 
 def _log_response_usage(operation: str, response: Response) -> None:
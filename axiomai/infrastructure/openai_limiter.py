@@ -0,0 +1,185 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import random
+import re
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from axiomai.config import OpenAIConfig
+from axiomai.constants import (
+    OPENAI_IMAGE_TOKENS,
+    OPENAI_MAX_RETRIES,
+    OPENAI_PHOTO_QUEUE_LIMIT,
+    OPENAI_PHOTO_QUEUE_TIMEOUT,
+    OPENAI_RETRY_BASE_DELAY,
+    OPENAI_RETRY_MAX_DELAY,
+    OPENAI_TEXT_QUEUE_LIMIT,
+    OPENAI_TEXT_QUEUE_TIMEOUT,
+)
+from axiomai.infrastructure.metrics import WaitTimeStats
+from axiomai.infrastructure.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+_RETRYABLE_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+# Грубая оценка: на кириллице токен короче, чем на латинице
+_CHARS_PER_TOKEN = 3
+# Картинки в base64 оцениваются отдельно, их длина к тексту не относится
+_DATA_URL_RE = re.compile(r'"data:[^"]*"')
+
+
+class OpenAILane(IntEnum):
+    """Очереди запросов к OpenAI. Чем меньше значение, тем выше приоритет."""
+
+    TEXT = 0  # ответы клиентам
+    PHOTO = 1  # классификация скриншотов
+
+
+_QUEUE_LIMITS = {OpenAILane.TEXT: OPENAI_TEXT_QUEUE_LIMIT, OpenAILane.PHOTO: OPENAI_PHOTO_QUEUE_LIMIT}
+_QUEUE_TIMEOUTS = {OpenAILane.TEXT: OPENAI_TEXT_QUEUE_TIMEOUT, OpenAILane.PHOTO: OPENAI_PHOTO_QUEUE_TIMEOUT}
+
+
+class OpenAIOverloadedError(Exception):
+    """Запрос сброшен без обращения к OpenAI: очередь переполнена или ожидание слишком долгое."""
+
+
+class OpenAILimiter:
+    """
+    Планировщик запросов к OpenAI внутри процесса.
+
+    Одновременно выполняется не больше OPENAI_MAX_CONCURRENCY запросов в пределах бюджетов RPM и TPM.
+    Ожидающие запросы обслуживаются по приоритету очереди: ответы клиентам раньше классификации фото.
+    Если очередь переполнена или запрос ждёт дольше таймаута своей очереди, он сбрасывается с
+    OpenAIOverloadedError, не доходя до OpenAI. 429, 5xx и сетевые ошибки повторяются с экспоненциальной
+    задержкой и джиттером (или через Retry-After), слот на время задержки освобождается.
+    """
+
+    def __init__(self, config: OpenAIConfig) -> None:
+        self._free_slots = config.max_concurrency
+        self._requests = TokenBucket(config.requests_per_minute / 60, config.requests_per_minute)
+        self._tokens = TokenBucket(config.tokens_per_minute / 60, config.tokens_per_minute)
+        self._waiters: list[tuple[OpenAILane, int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._queue_depth = dict.fromkeys(OpenAILane, 0)
+        self._wait_time_stats = {lane: WaitTimeStats() for lane in OpenAILane}
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    async def call[T](self, lane: OpenAILane, tokens: int, request: Callable[[], Awaitable[T]]) -> T:
+        """Выполняет запрос в очереди ``lane``, повторяя его при временных ошибках OpenAI."""
+        attempt = 0
+        while True:
+            async with self._slot(lane, tokens):
+                try:
+                    return await request()
+                except _RETRYABLE_ERRORS as e:
+                    if attempt >= OPENAI_MAX_RETRIES:
+                        raise
+                    delay = _retry_delay(e, attempt)
+                    logger.warning("openai request failed (%s), retry in %.1fs", type(e).__name__, delay)
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def queue_depth(self, lane: OpenAILane) -> int:
+        return self._queue_depth[lane]
+
+    def wait_time_percentiles(self, lane: OpenAILane) -> tuple[float, float]:
+        """p50 и p95 времени ожидания в очереди"""
+        return self._wait_time_stats[lane].percentiles()
+
+    @asynccontextmanager
+    async def _slot(self, lane: OpenAILane, tokens: int) -> AsyncIterator[None]:
+        await self._acquire(lane, tokens)
+        try:
+            yield
+        finally:
+            self._free_slots += 1
+            self._dispatch()
+
+    async def _acquire(self, lane: OpenAILane, tokens: int) -> None:
+        if self._queue_depth[lane] >= _QUEUE_LIMITS[lane]:
+            logger.warning("openai %s queue is full (%s), shedding request", lane.name, self._queue_depth[lane])
+            raise OpenAIOverloadedError(f"openai {lane.name} queue is full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (lane, next(self._sequence), tokens, future))
+        self._queue_depth[lane] += 1
+        started_at = time.monotonic()
+        self._dispatch()
+
+        try:
+            async with asyncio.timeout(_QUEUE_TIMEOUTS[lane]):
+                await future
+        except (TimeoutError, asyncio.CancelledError) as e:
+            # Слот мог достаться запросу одновременно с отменой — возвращаем его
+            if future.done() and not future.cancelled():
+                self._free_slots += 1
+                self._dispatch()
+            if isinstance(e, TimeoutError):
+                logger.warning("openai %s request waited more than %ss, shedding", lane.name, _QUEUE_TIMEOUTS[lane])
+                raise OpenAIOverloadedError(f"openai {lane.name} queue timeout") from None
+            raise
+        finally:
+            self._queue_depth[lane] -= 1
+
+        wait_time = time.monotonic() - started_at
+        if self._wait_time_stats[lane].observe(wait_time):
+            p50, p95 = self._wait_time_stats[lane].percentiles()
+            logger.info(
+                "openai %s queue depth: %s, wait time p50: %.2fs, p95: %.2fs",
+                lane.name,
+                self._queue_depth[lane],
+                p50,
+                p95,
+            )
+
+    def _dispatch(self) -> None:
+        """Отдаёт свободные слоты ожидающим запросам по приоритету, пока хватает бюджета."""
+        if self._wakeup:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        while self._waiters and self._free_slots > 0:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            wait_time = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+            if wait_time > 0:
+                self._wakeup = asyncio.get_running_loop().call_later(wait_time, self._dispatch)
+                return
+
+            heapq.heappop(self._waiters)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._free_slots -= 1
+            future.set_result(None)
+
+
+def estimate_tokens(request: dict[str, Any]) -> int:
+    """Оценивает, сколько токенов запрос спишет из TPM-бюджета: вход, картинки и максимум выхода."""
+    input_json = _DATA_URL_RE.sub('""', json.dumps(request.get("input", ""), ensure_ascii=False))
+    images = input_json.count('"input_image"')
+    return len(input_json) // _CHARS_PER_TOKEN + images * OPENAI_IMAGE_TOKENS + request.get("max_output_tokens", 0)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    if isinstance(error, RateLimitError):
+        retry_after = error.response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), OPENAI_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+
+    delay = min(OPENAI_RETRY_BASE_DELAY * 2**attempt, OPENAI_RETRY_MAX_DELAY)
+    return delay * random.uniform(0.5, 1.5)
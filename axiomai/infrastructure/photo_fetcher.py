@@ -0,0 +1,88 @@
+import asyncio
+import base64
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+
+from aiogram import Bot
+from aiogram.types import BufferedInputFile, PhotoSize
+
+from axiomai.constants import PHOTO_CACHE_SIZE, PHOTO_MIN_SHORT_SIDE
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Photo:
+    """Скачанное фото из Telegram. Telegram всегда перекодирует фото в JPEG."""
+
+    content: bytes
+    mime_type: str = "image/jpeg"
+
+    @property
+    def data_url(self) -> str:
+        """Фото для OpenAI: без ссылки на api.telegram.org, в которой лежит токен бота"""
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.content).decode()}"
+
+    def as_input_file(self) -> BufferedInputFile:
+        return BufferedInputFile(self.content, filename="photo.jpg")
+
+
+def select_photo_size(photo_sizes: list[PhotoSize]) -> PhotoSize:
+    """
+    Выбирает самое маленькое превью, которого хватает модели.
+
+    Telegram хранит фото в нескольких размерах, а модель в режиме high всё равно уменьшает картинку
+    до PHOTO_MIN_SHORT_SIDE по короткой стороне, поэтому оригинал качать незачем.
+    """
+    photo_sizes = sorted(photo_sizes, key=lambda size: size.width * size.height)
+    return next((size for size in photo_sizes if min(size.width, size.height) >= PHOTO_MIN_SHORT_SIDE), photo_sizes[-1])
+
+
+class PhotoFetcher:
+    """
+    Скачивает фото из Telegram один раз на процесс.
+
+    Скачивание начинается сразу при получении сообщения (``prefetch``), пока идёт debounce, а обработчик
+    забирает готовые байты (``fetch``) и использует их для классификации, пересылки продавцу и хеша вердикта.
+    Последние PHOTO_CACHE_SIZE фото держатся в LRU по file_unique_id, одновременные запросы одного фото
+    ждут одно скачивание. Неудачное скачивание из кеша убирается, следующий ``fetch`` повторит его.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self._bot = bot
+        self._photos: OrderedDict[str, asyncio.Task[Photo]] = OrderedDict()
+
+    def prefetch(self, file_id: str, file_unique_id: str) -> None:
+        self._get_or_start(file_id, file_unique_id)
+
+    async def fetch(self, file_id: str, file_unique_id: str) -> Photo:
+        return await asyncio.shield(self._get_or_start(file_id, file_unique_id))
+
+    def _get_or_start(self, file_id: str, file_unique_id: str) -> asyncio.Task[Photo]:
+        task = self._photos.get(file_unique_id)
+        if task:
+            self._photos.move_to_end(file_unique_id)
+            return task
+
+        task = asyncio.create_task(self._download(file_id))
+        task.add_done_callback(lambda done: self._on_done(file_unique_id, done))
+        self._photos[file_unique_id] = task
+        while len(self._photos) > PHOTO_CACHE_SIZE:
+            self._photos.popitem(last=False)
+        return task
+
+    def _on_done(self, file_unique_id: str, task: asyncio.Task[Photo]) -> None:
+        if not task.cancelled():
+            if task.exception() is None:
+                return
+            logger.warning("failed to download photo %s: %s", file_unique_id, task.exception())
+
+        if self._photos.get(file_unique_id) is task:
+            del self._photos[file_unique_id]
+
+    async def _download(self, file_id: str) -> Photo:
+        destination = BytesIO()
+        await self._bot.download(file_id, destination=destination)
+        return Photo(content=destination.getvalue())
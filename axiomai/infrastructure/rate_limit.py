@@ -0,0 +1,27 @@
+import time
+
+
+class TokenBucket:
+    """Бюджет, который восполняется равномерно: ``rate`` в секунду, но не больше ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._capacity = capacity
+        self._rate = rate
+        self._available = float(capacity)
+        self._updated_at = time.monotonic()
+
+    def wait_time(self, amount: float = 1) -> float:
+        """Сколько секунд ждать, пока в бюджете наберётся ``amount``."""
+        self._refill()
+        amount = min(amount, self._capacity)
+        if self._available >= amount:
+            return 0
+        return (amount - self._available) / self._rate
+
+    def take(self, amount: float = 1) -> None:
+        self._available -= min(amount, self._capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._available = min(self._capacity, self._available + (now - self._updated_at) * self._rate)
+        self._updated_at = now
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import logging
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import Any
+
+from redis.asyncio import Redis
+
+from axiomai.constants import SCREENSHOT_VERDICT_CACHE_MAX_SIZE, SCREENSHOT_VERDICT_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "screenshot_verdict"
+_INDEX_KEY = f"{_KEY_PREFIX}:index"
+
+
+class ScreenshotVerdictCache:
+    """
+    Кеш вердиктов классификации скриншотов.
+
+    Ключ строится по хешу содержимого фото, набору проверяемых nm_id и тексту инструкции,
+    поэтому повторно отправленный покупателем скриншот получает тот же вердикт без запроса к OpenAI.
+    Размер кеша ограничен: в отсортированном множестве хранится время записи каждого ключа,
+    самые старые записи вытесняются при превышении лимита.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._ttl_seconds = SCREENSHOT_VERDICT_CACHE_TTL
+        self._max_size = SCREENSHOT_VERDICT_CACHE_MAX_SIZE
+
+    @staticmethod
+    def build_key(
+        operation: str,
+        image: bytes,
+        nm_ids: Iterable[int],
+        instruction_text: str | None,
+    ) -> str:
+        image_digest = hashlib.sha256(image).hexdigest()
+        scope = json.dumps(
+            {"nm_ids": sorted(set(nm_ids)), "instruction": instruction_text or ""},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        scope_digest = hashlib.sha256(scope.encode("utf-8")).hexdigest()[:16]
+        return f"{_KEY_PREFIX}:{operation}:{image_digest}:{scope_digest}"
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        data = await self._redis.get(key)
+        if not data:
+            return None
+
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            logger.warning("broken screenshot verdict in cache, key %s", key)
+            await self._redis.delete(key)
+            return None
+
+    async def set(self, key: str, verdict: dict[str, Any]) -> None:
+        now = datetime.now(UTC).timestamp()
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.setex(key, self._ttl_seconds, json.dumps(verdict, ensure_ascii=False))
+            pipe.zadd(_INDEX_KEY, {key: now})
+            pipe.zremrangebyscore(_INDEX_KEY, "-inf", now - self._ttl_seconds)
+            pipe.zcard(_INDEX_KEY)
+            *_, size = await pipe.execute()
+
+        overflow = size - self._max_size
+        if overflow <= 0:
+            return
+
+        evicted = await self._redis.zpopmin(_INDEX_KEY, overflow)
+        evicted_keys = [member for member, _ in evicted]
+        if evicted_keys:
+            await self._redis.delete(*evicted_keys)
+            logger.debug("evicted %s screenshot verdicts from cache", len(evicted_keys))
@@ -133,6 +133,10 @@ class Superbanking:
             return self._bank_name_map.get(bank_name.upper())
         return None
 
+    def is_known_bank(self, bank_name_rus: str) -> bool:
+        """Проверяет, что в банк можно сделать выплату, не обращаясь к API."""
+        return self._get_bank_identifier_by_bank_name_rus(bank_name_rus=bank_name_rus) is not None
+
     @staticmethod
     def _convert_phone_number_to_superbanking_format(phone_number: str) -> str:
         digits = re.sub(r"\D", "", phone_number)
@@ -0,0 +1,109 @@
+import logging
+import os
+import socket
+from collections import defaultdict
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError, ResponseError
+
+from axiomai.constants import (
+    SYNC_EVENTS_BATCH_SIZE,
+    SYNC_EVENTS_BLOCK_TIMEOUT,
+    SYNC_EVENTS_CLAIM_IDLE,
+    SYNC_EVENTS_STREAM_MAXLEN,
+)
+
+logger = logging.getLogger(__name__)
+
+_STREAM_KEY = "sync_events"
+_GROUP_NAME = "observer"
+
+
+class SyncEventType(StrEnum):
+    DIRTY_TABLE = "dirty_table"  # изменились покупатели или лиды кабинета — нужно синхронизировать таблицу
+    DIRTY_CABINET = "dirty_cabinet"  # изменился баланс кабинета — нужно проверить уведомления о балансе
+
+
+@dataclass(frozen=True)
+class SyncEventsBatch:
+    """Прочитанные события: id изменённых кабинетов по типам событий и id событий для подтверждения"""
+
+    dirty: dict[SyncEventType, set[int]] = field(default_factory=dict)
+    event_ids: list[bytes | str] = field(default_factory=list)
+
+
+class SyncEvents:
+    """
+    События об изменениях кабинетов для observer'а в Redis stream.
+
+    Интеракторы публикуют событие после коммита, observer читает их через consumer group
+    и синхронизирует только изменённые кабинеты. Событие подтверждается (``ack``) только после обработки:
+    неподтверждённые события (observer упал или обработка не удалась) через SYNC_EVENTS_CLAIM_IDLE
+    забираются повторно. Потерянные события подхватит периодический полный проход.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._consumer = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def publish(self, event_type: SyncEventType, cabinet_id: int) -> None:
+        try:
+            await self._redis.xadd(
+                _STREAM_KEY,
+                {"type": event_type.value, "cabinet_id": cabinet_id},
+                maxlen=SYNC_EVENTS_STREAM_MAXLEN,
+                approximate=True,
+            )
+        except RedisError as e:
+            # Событие не критично: изменения подхватит полный проход observer'а
+            logger.warning("failed to publish %s for cabinet_id=%s: %s", event_type, cabinet_id, e)
+
+    async def ensure_group(self) -> None:
+        try:
+            await self._redis.xgroup_create(_STREAM_KEY, _GROUP_NAME, id="$", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read(self) -> SyncEventsBatch:
+        """Забирает зависшие неподтверждённые события, а если их нет — ждёт новые."""
+        _, entries, *_ = await self._redis.xautoclaim(
+            _STREAM_KEY,
+            _GROUP_NAME,
+            self._consumer,
+            min_idle_time=SYNC_EVENTS_CLAIM_IDLE,
+            count=SYNC_EVENTS_BATCH_SIZE,
+        )
+        if entries:
+            logger.info("reclaimed %s unacknowledged sync events", len(entries))
+        else:
+            response = await self._redis.xreadgroup(
+                _GROUP_NAME,
+                self._consumer,
+                {_STREAM_KEY: ">"},
+                count=SYNC_EVENTS_BATCH_SIZE,
+                block=SYNC_EVENTS_BLOCK_TIMEOUT,
+            )
+            entries = [entry for _, stream_entries in response or [] for entry in stream_entries]
+
+        dirty: dict[SyncEventType, set[int]] = defaultdict(set)
+        event_ids = []
+        for event_id, fields in entries:
+            event_ids.append(event_id)
+            try:
+                event_type = SyncEventType(_decode(fields[b"type"]))
+                dirty[event_type].add(int(fields[b"cabinet_id"]))
+            except (KeyError, TypeError, ValueError):
+                logger.warning("broken sync event %s: %s", event_id, fields)
+
+        return SyncEventsBatch(dirty=dict(dirty), event_ids=event_ids)
+
+    async def ack(self, batch: SyncEventsBatch) -> None:
+        if batch.event_ids:
+            await self._redis.xack(_STREAM_KEY, _GROUP_NAME, *batch.event_ids)
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
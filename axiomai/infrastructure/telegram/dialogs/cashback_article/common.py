@@ -1,5 +1,9 @@
-import asyncio
+import logging
+import time
+from collections.abc import Awaitable
+from dataclasses import dataclass
 from datetime import UTC, datetime
+from typing import Any
 
 from aiogram import Bot
 from aiogram.enums import ChatAction, ParseMode
@@ -9,17 +13,37 @@ from aiogram_dialog.widgets.input import MessageInput
 from dishka import AsyncContainer, FromDishka
 from dishka.integrations.aiogram_dialog import inject
 
+from axiomai.application.dto import CabinetSnapshot
 from axiomai.application.interactors.create_buyer import CreateBuyer
 from axiomai.config import Config
 from axiomai.constants import OK_WORDS
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.chat_history import add_to_chat_history
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
 from axiomai.infrastructure.database.models import Buyer
-from axiomai.infrastructure.message_debouncer import MessageData, MessageDebouncer, merge_messages_text
+from axiomai.infrastructure.database.models.cashback_table import CashbackArticle
+from axiomai.infrastructure.message_debouncer import (
+    DebounceHandler,
+    MessageData,
+    MessageDebouncer,
+    merge_messages_text,
+)
 from axiomai.infrastructure.openai import OpenAIGateway
 from axiomai.infrastructure.telegram.dialogs.states import CashbackArticleStates
+from axiomai.infrastructure.telegram.outbound import TelegramOutbound
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DialogContext:
+    """Кабинет, артикулы и текущие заявки клиента. Загружается заранее, пока копятся сообщения."""
+
+    cabinet: CabinetSnapshot
+    articles: list[CashbackArticle]
+    current_buyers: list[Buyer]
 
 
 def get_pending_nm_ids_for_step(buyers: list[Buyer], step: str) -> list[int]:
@@ -53,7 +77,7 @@ async def mes_input_handler(
             timestamp=datetime.now(UTC).timestamp(),
             message_id=message.message_id,
             has_photo=False,
-            photo_url=None,
+            photo_file_id=None,
             chat_id=message.chat.id,
         )
 
@@ -64,9 +88,12 @@ async def mes_input_handler(
             business_connection_id=message.business_connection_id,
             chat_id=message.chat.id,
             message_data=message_data,
-            process_callback=lambda biz_id, chat_id, msgs: _process_dialog_messages(
-                biz_id, chat_id, message.from_user.username, message.from_user.full_name, msgs, bot, app_container, bg_manager
+            process_callback=lambda biz_id, chat_id, msgs, context: _process_dialog_messages(
+                biz_id, chat_id, message.from_user.username, message.from_user.full_name, msgs, bot, app_container, bg_manager, context
             ),
+            handler=DebounceHandler.DIALOG,
+            meta={"username": message.from_user.username, "fullname": message.from_user.full_name},
+            prefetch=lambda: _load_dialog_context(app_container, message.business_connection_id, message.chat.id),
         )
         dialog_manager.show_mode = ShowMode.NO_UPDATE
         return
@@ -74,6 +101,29 @@ async def mes_input_handler(
     await dialog_manager.show(ShowMode.SEND)
 
 
+async def _load_dialog_context(
+    di_container: AsyncContainer, business_connection_id: str, chat_id: int
+) -> DialogContext | None:
+    async with di_container() as r_container:
+        cashback_table_gateway = await r_container.get(CashbackTableGateway)
+        cabinet_gateway = await r_container.get(CabinetGateway)
+        buyer_gateway = await r_container.get(BuyerGateway)
+        cabinet_snapshot_cache = await r_container.get(CabinetSnapshotCache)
+
+        cabinet = await cabinet_snapshot_cache.get_or_load(
+            business_connection_id, cabinet_gateway.get_cabinet_snapshot_by_business_connection_id
+        )
+        if not cabinet:
+            return None
+
+        articles = await cashback_table_gateway.get_in_stock_cashback_articles_by_cabinet_id(cabinet.id, chat_id)
+        current_buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(
+            chat_id, cabinet.id
+        )
+
+    return DialogContext(cabinet=cabinet, articles=articles, current_buyers=current_buyers)
+
+
 async def _process_dialog_messages(
     business_connection_id: str,
     chat_id: int,
@@ -83,19 +133,22 @@ async def _process_dialog_messages(
     bot: Bot,
     di_container: AsyncContainer,
     bg_manager: DialogManager,
+    context: DialogContext | None = None,
 ) -> None:
+    if context is None:
+        context = await _load_dialog_context(di_container, business_connection_id, chat_id)
+    if context is None:
+        logger.warning("cabinet not found for business_connection_id %s", business_connection_id)
+        return
+
+    cabinet = context.cabinet
+    articles = context.articles
+    current_buyers = context.current_buyers
+
     async with di_container() as r_container:
         config = await r_container.get(Config)
         openai_gateway = await r_container.get(OpenAIGateway)
-        cashback_table_gateway = await r_container.get(CashbackTableGateway)
-        cabinet_gateway = await r_container.get(CabinetGateway)
-        buyer_gateway = await r_container.get(BuyerGateway)
-
-        cabinet = await cabinet_gateway.get_cabinet_by_business_connection_id(business_connection_id)
-        articles = await cashback_table_gateway.get_in_stock_cashback_articles_by_cabinet_id(cabinet.id, chat_id)
-        current_buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(
-            chat_id, cabinet.id
-        )
+        outbound = await r_container.get(TelegramOutbound)
 
     combined_text = merge_messages_text(messages)
 
@@ -111,6 +164,12 @@ async def _process_dialog_messages(
 
     combined_text = merge_messages_text(messages)
 
+    # Клиент видит, что ему печатают, пока модель генерирует ответ
+    started_at = time.monotonic()
+    outbound.post(
+        bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING, business_connection_id=business_connection_id)
+    )
+
     result = await openai_gateway.answer_user_question(
         user_message=combined_text,
         articles=articles,
@@ -123,39 +182,58 @@ async def _process_dialog_messages(
 
     await add_to_chat_history(di_container, chat_id, cabinet.id, combined_text, response_text)
 
-    await bot.send_chat_action(
-        chat_id=chat_id,
-        action=ChatAction.TYPING,
-        business_connection_id=business_connection_id,
-    )
-    await asyncio.sleep(config.delay_between_bot_messages)
-
-    await bot.send_message(
-        chat_id=chat_id,
-        text=response_text,
-        business_connection_id=business_connection_id,
-        parse_mode=ParseMode.MARKDOWN,
-    )
+    # Ответ уйдёт после паузы "набора" (она частично прошла, пока генерировался ответ), обработка его не ждёт
+    send_at = started_at + config.delay_between_bot_messages
 
     if switch_to_article_id and switch_to_article_id in valid_ids:
+        # Новая заявка продолжает текущий диалог покупателя
+        dialog_started_at = min((b.dialog_started_at for b in current_buyers), default=None)
+        await _create_buyer(di_container, chat_id, username, fullname, switch_to_article_id, dialog_started_at=dialog_started_at)
+
         async with di_container() as r_container:
-            create_buyer = await r_container.get(CreateBuyer)
             buyer_gateway = await r_container.get(BuyerGateway)
-            await create_buyer.execute(chat_id, username, fullname, switch_to_article_id, [])
-
             active_buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(
                 chat_id, cabinet.id
             )
 
-        await bg_manager.start(
+    reply = bot.send_message(
+        chat_id=chat_id,
+        text=response_text,
+        business_connection_id=business_connection_id,
+        parse_mode=ParseMode.MARKDOWN,
+    )
+
+    if switch_to_article_id and switch_to_article_id in valid_ids:
+        resume = bg_manager.start(
             determine_resume_state(active_buyers),
             mode=StartMode.RESET_STACK,
             show_mode=ShowMode.SEND,
         )
-        return
+        outbound.post_at(send_at, send_in_order(reply, resume))
+    elif wants_to_stop:
+        outbound.post_at(send_at, send_in_order(reply, bg_manager.done()))
+    else:
+        outbound.post_at(send_at, reply)
+
 
-    if wants_to_stop:
-        await bg_manager.done()
+async def send_in_order(*requests: Awaitable[Any]) -> None:
+    """Выполняет отправки по очереди: например, ответ клиенту и следом окно диалога."""
+    for request in requests:
+        await request
+
+
+async def _create_buyer(
+    di_container: AsyncContainer,
+    telegram_id: int,
+    username: str | None,
+    fullname: str,
+    article_id: int,
+    *,
+    dialog_started_at: datetime | None,
+) -> None:
+    async with di_container() as r_container:
+        create_buyer = await r_container.get(CreateBuyer)
+        await create_buyer.execute(telegram_id, username, fullname, article_id, dialog_started_at)
 
 
 def determine_resume_state(buyers: list[Buyer]) -> CashbackArticleStates | None:
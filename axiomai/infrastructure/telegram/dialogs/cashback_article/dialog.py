@@ -14,9 +14,9 @@ from dishka import FromDishka
 from dishka.integrations.aiogram_dialog import inject
 from redis.asyncio import Redis
 
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
-from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
 from axiomai.infrastructure.telegram.dialogs.cashback_article.common import (
     get_pending_nm_ids_for_step,
     mes_input_handler,
@@ -41,7 +41,7 @@ async def article_getter(
     dialog_manager: DialogManager,
     cabinet_gateway: FromDishka[CabinetGateway],
     buyer_gateway: FromDishka[BuyerGateway],
-    cashback_table_gateway: FromDishka[CashbackTableGateway],
+    cabinet_snapshot_cache: FromDishka[CabinetSnapshotCache],
     **kwargs: dict[str, Any],
 ) -> dict[str, Any]:
     if isinstance(dialog_manager.event, CallbackQuery):
@@ -49,16 +49,18 @@ async def article_getter(
     else:
         business_connection_id = dialog_manager.event.business_connection_id
 
-    cabinet = await cabinet_gateway.get_cabinet_by_business_connection_id(business_connection_id)
+    cabinet = await cabinet_snapshot_cache.get_or_load(
+        business_connection_id, cabinet_gateway.get_cabinet_snapshot_by_business_connection_id
+    )
     buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(dialog_manager.event.from_user.id, cabinet.id)
 
     pending_order_nm_ids = get_pending_nm_ids_for_step(buyers, "check_order")
     pending_feedback_nm_ids = get_pending_nm_ids_for_step(buyers, "check_received")
     pending_labels_nm_ids = get_pending_nm_ids_for_step(buyers, "check_labels_cut")
 
-    pending_order =  await cashback_table_gateway.get_cashback_articles_by_nm_ids(pending_order_nm_ids)
-    pending_feedback = await cashback_table_gateway.get_cashback_articles_by_nm_ids(pending_feedback_nm_ids)
-    pending_labels = await cashback_table_gateway.get_cashback_articles_by_nm_ids(pending_labels_nm_ids)
+    pending_order = cabinet.get_articles_by_nm_ids(pending_order_nm_ids)
+    pending_feedback = cabinet.get_articles_by_nm_ids(pending_feedback_nm_ids)
+    pending_labels = cabinet.get_articles_by_nm_ids(pending_labels_nm_ids)
 
     buyer_map = {b.nm_id: b for b in buyers if not b.is_ordered}
     cancellable_buyers = [
@@ -80,9 +82,12 @@ async def requisites_getter(
     dialog_manager: DialogManager,
     cabinet_gateway: FromDishka[CabinetGateway],
     buyer_gateway: FromDishka[BuyerGateway],
+    cabinet_snapshot_cache: FromDishka[CabinetSnapshotCache],
     **kwargs: dict[str, Any],
 ) -> dict[str, Any]:
-    cabinet = await cabinet_gateway.get_cabinet_by_business_connection_id(dialog_manager.event.business_connection_id)
+    cabinet = await cabinet_snapshot_cache.get_or_load(
+        dialog_manager.event.business_connection_id, cabinet_gateway.get_cabinet_snapshot_by_business_connection_id
+    )
     buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(dialog_manager.event.from_user.id, cabinet.id)
 
     # Суммируем amount по всем завершённым заявкам (с фото этикеток)
@@ -1,28 +1,32 @@
-import asyncio
 import json
 import logging
+import time
 from datetime import UTC, datetime
 
 from aiogram import Bot
 from aiogram.enums import ChatAction
-from aiogram.types import Message, URLInputFile
+from aiogram.types import Message
 from aiogram_dialog import DialogManager, ShowMode
 from aiogram_dialog.widgets.input import MessageInput
 from dishka import AsyncContainer, FromDishka
 from dishka.integrations.aiogram_dialog import inject
 
 from axiomai.config import Config
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.chat_history import add_to_chat_history
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
-from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
-from axiomai.infrastructure.message_debouncer import MessageData, MessageDebouncer, TaskStrategy
+from axiomai.infrastructure.message_debouncer import DebounceHandler, MessageData, MessageDebouncer, TaskStrategy
 from axiomai.infrastructure.openai import ClassifyFeedbackResult, OpenAIGateway
+from axiomai.infrastructure.photo_fetcher import PhotoFetcher, select_photo_size
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
 from axiomai.infrastructure.telegram.dialogs.cashback_article.common import (
     get_pending_nm_ids_for_step,
+    send_in_order,
 )
 from axiomai.infrastructure.telegram.dialogs.states import CashbackArticleStates
+from axiomai.infrastructure.telegram.outbound import TelegramOutbound
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +40,7 @@ async def on_input_feedback_screenshot(
     di_container: FromDishka[AsyncContainer],
     message_debouncer: FromDishka[MessageDebouncer],
     config: FromDishka[Config],
+    photo_fetcher: FromDishka[PhotoFetcher],
 ) -> None:
     bot: Bot = dialog_manager.middleware_data["bot"]
 
@@ -45,16 +50,17 @@ async def on_input_feedback_screenshot(
         await message.answer("Пожалуйста, отправьте фото скриншота отзыва")
         return
 
-    photo = message.photo[-1]
-    file = await bot.get_file(photo.file_id)
-    photo_url = f"https://api.telegram.org/file/bot{bot.token}/{file.file_path}"
+    photo = select_photo_size(message.photo)
+    # Фото скачивается, пока идёт debounce
+    photo_fetcher.prefetch(photo.file_id, photo.file_unique_id)
 
     message_data = MessageData(
         text=message.caption,
         timestamp=datetime.now(UTC).timestamp(),
         message_id=message.message_id,
         has_photo=bool(message.photo),
-        photo_url=photo_url,
+        photo_file_id=photo.file_id,
+        photo_unique_id=photo.file_unique_id,
     )
 
     bg_manager = dialog_manager.bg()
@@ -76,7 +82,9 @@ async def on_input_feedback_screenshot(
             username=message.from_user.username,
             fullname=message.from_user.full_name,
         ),
-        strategy=TaskStrategy.PHOTO_ONLY
+        strategy=TaskStrategy.PHOTO_ONLY,
+        handler=DebounceHandler.FEEDBACK_SCREENSHOT,
+        meta={"username": message.from_user.username, "fullname": message.from_user.full_name},
     )
 
 
@@ -92,9 +100,9 @@ async def _process_feedback_screenshot_background(  # noqa: PLR0915
     username: str | None = None,
     fullname: str = "",
 ) -> None:
-    photo_urls = [msg.photo_url for msg in messages if msg.photo_url]
+    photo_messages = [msg for msg in messages if msg.photo_file_id]
 
-    if len(photo_urls) > 1:
+    if len(photo_messages) > 1:
         await bot.send_message(
             chat_id,
             "Пожалуйста, отправьте только один скриншот отзыва. Я получил несколько фото, и не могу понять, какое из них правильное.",
@@ -102,26 +110,33 @@ async def _process_feedback_screenshot_background(  # noqa: PLR0915
         )
         return
 
-    photo_url = photo_urls[0]
+    photo_message = photo_messages[0]
 
-    await bot.send_message(chat_id, "⏳ Проверяю скриншот отзыва...", business_connection_id=business_connection_id)
+    started_at = time.monotonic()
+    outbound = await di_container.get(TelegramOutbound)
+    # Сообщение о проверке не задерживает скачивание фото и классификацию
+    outbound.post(bot.send_message(chat_id, "⏳ Проверяю скриншот отзыва...", business_connection_id=business_connection_id))
 
     async with di_container() as r_container:
         buyer_gateway = await r_container.get(BuyerGateway)
         cabinet_gateway = await r_container.get(CabinetGateway)
-        cashback_table_gateway = await r_container.get(CashbackTableGateway)
+        cabinet_snapshot_cache = await r_container.get(CabinetSnapshotCache)
 
-        cabinet = await cabinet_gateway.get_cabinet_by_business_connection_id(business_connection_id)
+        cabinet = await cabinet_snapshot_cache.get_or_load(
+            business_connection_id, cabinet_gateway.get_cabinet_snapshot_by_business_connection_id
+        )
         buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(chat_id, cabinet.id)
-        articles = await cashback_table_gateway.get_cashback_articles_by_nm_ids([b.nm_id for b in buyers])
+        articles = cabinet.get_articles_by_nm_ids([b.nm_id for b in buyers])
 
     pending_nm_ids = get_pending_nm_ids_for_step(buyers, step="check_received")
     pending_articles = [a for a in articles if a.nm_id in pending_nm_ids]
 
+    photo_fetcher = await di_container.get(PhotoFetcher)
     result: str | None | ClassifyFeedbackResult = None
     try:
+        photo = await photo_fetcher.fetch(photo_message.photo_file_id, photo_message.photo_unique_id)
         result = await openai_gateway.classify_feedback_screenshot(
-            photo_url=photo_url,
+            photo=photo,
             articles=pending_articles,
         )
     except Exception as e:
@@ -134,12 +149,11 @@ async def _process_feedback_screenshot_background(  # noqa: PLR0915
     finally:
         await add_to_chat_history(di_container, chat_id, cabinet.id, "[Скрин отзыва]", json.dumps(result))
 
-    await bot.send_chat_action(
-        chat_id=chat_id,
-        action=ChatAction.TYPING,
-        business_connection_id=business_connection_id,
+    outbound.post(
+        bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING, business_connection_id=business_connection_id)
     )
-    await asyncio.sleep(config.delay_between_bot_messages)
+    # Ответ клиенту уйдёт после паузы "набора", обработка его не ждёт
+    send_at = started_at + config.delay_between_bot_messages
 
     if not result["is_feedback"] or not result["nm_id"]:
         cancel_reason = result["cancel_reason"]
@@ -150,7 +164,7 @@ async def _process_feedback_screenshot_background(  # noqa: PLR0915
         user_ref = f'<a href="{chat_link}">@{username}</a>' if username else fullname
         await bot.send_photo(
             chat_id=cabinet.business_account_id,
-            photo=URLInputFile(photo_url),
+            photo=photo.as_input_file(),
             caption=(
                 f"⚠️ У пользователя {user_ref} ошибка со скрином отзыва\n\n"
                 f"<code>{cancel_reason}</code>\n\n"
@@ -167,9 +181,11 @@ async def _process_feedback_screenshot_background(  # noqa: PLR0915
     async with di_container() as r_container:
         buyer_gateway = await r_container.get(BuyerGateway)
         transaction_manager = await r_container.get(TransactionManager)
+        sync_events = await r_container.get(SyncEvents)
         buyer = await buyer_gateway.get_buyer_by_id(buyer_id)
         buyer.is_left_feedback = True
         await transaction_manager.commit()
+        await sync_events.publish(SyncEventType.DIRTY_TABLE, cabinet.id)
 
         buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(chat_id, cabinet.id)
 
@@ -178,14 +194,12 @@ async def _process_feedback_screenshot_background(  # noqa: PLR0915
     if not article:
         raise ValueError(f"Article in result {result["nm_id"]} not found in {pending_nm_ids}")
 
-    await bot.send_message(
+    accepted = bot.send_message(
         chat_id,
         f"✅ Скриншот отзыва для <b>{article.title}</b> принят!",
         business_connection_id=business_connection_id,
     )
 
     pending_feedback = get_pending_nm_ids_for_step(buyers, "check_received")
-    if pending_feedback:
-        await bg_manager.switch_to(CashbackArticleStates.check_received, show_mode=ShowMode.SEND)
-    else:
-        await bg_manager.switch_to(CashbackArticleStates.check_labels_cut, show_mode=ShowMode.SEND)
+    next_state = CashbackArticleStates.check_received if pending_feedback else CashbackArticleStates.check_labels_cut
+    outbound.post_at(send_at, send_in_order(accepted, bg_manager.switch_to(next_state, show_mode=ShowMode.SEND)))
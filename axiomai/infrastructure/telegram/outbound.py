@@ -0,0 +1,308 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Coroutine, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage,
+    ForwardMessage,
+    SendAnimation,
+    SendAudio,
+    SendChatAction,
+    SendContact,
+    SendDocument,
+    SendLocation,
+    SendMediaGroup,
+    SendMessage,
+    SendPhoto,
+    SendSticker,
+    SendVideo,
+    SendVoice,
+    TelegramMethod,
+)
+from aiogram.methods.base import TelegramType
+
+from axiomai.constants import (
+    TELEGRAM_BROADCAST_RATE,
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_CHAT_CACHE_SIZE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_SEND_MAX_RETRIES,
+    TELEGRAM_TYPING_TTL,
+)
+from axiomai.infrastructure.metrics import WaitTimeStats
+from axiomai.infrastructure.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+_SEND_METHODS = (
+    CopyMessage,
+    ForwardMessage,
+    SendAnimation,
+    SendAudio,
+    SendContact,
+    SendDocument,
+    SendLocation,
+    SendMediaGroup,
+    SendMessage,
+    SendPhoto,
+    SendSticker,
+    SendVideo,
+    SendVoice,
+)
+
+type ChatKey = tuple[str | None, int | str]
+
+
+class OutboundPriority(IntEnum):
+    """Приоритет исходящих сообщений. Чем меньше значение, тем раньше отправляется."""
+
+    INTERACTIVE = 0  # ответы в живых диалогах
+    BROADCAST = 1  # напоминания и уведомления observer'а
+
+
+_priority: ContextVar[OutboundPriority] = ContextVar("outbound_priority", default=OutboundPriority.INTERACTIVE)
+
+
+@contextmanager
+def broadcast() -> Iterator[None]:
+    """Отправки внутри блока (и в задачах, созданных в нём) идут с приоритетом рассылки."""
+    token = _priority.set(OutboundPriority.BROADCAST)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TelegramOutbound(BaseRequestMiddleware):
+    """
+    Очередь исходящих сообщений бота, подключается как middleware сессии.
+
+    Каждая отправка ждёт бюджета: общего на бота (TELEGRAM_GLOBAL_RATE), своего чата (TELEGRAM_CHAT_RATE)
+    и, для рассылок, бюджета рассылок (TELEGRAM_BROADCAST_RATE), так что массовые напоминания не съедают
+    лимит живых диалогов. Ожидающие отправки обслуживаются по приоритету, внутри чата — по порядку.
+    На 429 чат ставится на паузу на retry_after, и отправка повторяется.
+
+    "Печатает" не стоит в очереди: повтор того же действия в чат в течение TELEGRAM_TYPING_TTL
+    не отправляется вовсе.
+
+    При остановке вызывается ``flush``: отложенные через ``post_at`` сообщения отправляются сразу, а не теряются.
+    """
+
+    def __init__(self) -> None:
+        self._global = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+        self._broadcast = TokenBucket(TELEGRAM_BROADCAST_RATE, TELEGRAM_BROADCAST_RATE)
+        self._chats: OrderedDict[ChatKey, TokenBucket] = OrderedDict()
+        self._paused_until: dict[ChatKey, float] = {}
+        self._broadcast_paused_until = 0.0
+        self._chat_actions: OrderedDict[ChatKey, tuple[str, float]] = OrderedDict()
+        self._waiters: list[tuple[OutboundPriority, int, ChatKey, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+        self._wait_time_stats = {priority: WaitTimeStats() for priority in OutboundPriority}
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._posted: set[asyncio.Task] = set()
+        self._scheduled: dict[int, tuple[asyncio.TimerHandle, Coroutine[Any, Any, Any]]] = {}
+        self._scheduled_ids = itertools.count()
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Any:
+        if isinstance(method, SendChatAction):
+            if self._is_chat_action_fresh(_chat_key(method), method.action):
+                return True
+            return await make_request(bot, method)
+
+        if not isinstance(method, _SEND_METHODS):
+            return await make_request(bot, method)
+
+        chat_key = _chat_key(method)
+        priority = _priority.get()
+        # Повтор после 429 сохраняет место в очереди чата
+        sequence = next(self._sequence)
+        attempt = 0
+        while True:
+            await self._acquire(priority, sequence, chat_key)
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt >= TELEGRAM_SEND_MAX_RETRIES:
+                    raise
+                logger.warning("telegram flood control for chat %s, retry in %ss", chat_key[1], e.retry_after)
+                self._pause(chat_key, priority, e.retry_after)
+                attempt += 1
+                continue
+
+            # Сообщение сбрасывает "печатает" в чате
+            self._chat_actions.pop(chat_key, None)
+            return result
+
+    def post(self, request: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """
+        Отправляет сообщение, не дожидаясь доставки: для отправок, чей результат не нужен.
+
+        Запрос встаёт в очередь сразу, поэтому порядок сообщений в чате сохраняется. Ошибки пишутся в лог.
+        """
+        task = asyncio.Task(request, loop=asyncio.get_running_loop(), eager_start=True)
+        if task.done():
+            self._on_posted(task)
+            return task
+
+        self._posted.add(task)
+        task.add_done_callback(self._on_posted)
+        return task
+
+    def post_at(self, send_at: float, request: Coroutine[Any, Any, Any]) -> None:
+        """
+        Отправляет сообщение не раньше ``send_at`` (по ``time.monotonic()``), не задерживая вызывающего.
+
+        До этого момента запрос не запущен и не занимает ни очередь, ни контекст вызывающего; приоритет
+        (``broadcast()``) берётся из контекста вызова. ``request`` может быть и сценарием из нескольких
+        отправок, которые должны уйти по порядку.
+        """
+        delay = send_at - time.monotonic()
+        if delay <= 0:
+            self.post(request)
+            return
+
+        scheduled_id = next(self._scheduled_ids)
+        handle = asyncio.get_running_loop().call_later(delay, self._post_scheduled, scheduled_id)
+        self._scheduled[scheduled_id] = (handle, request)
+
+    async def flush(self) -> None:
+        """Отправляет отложенные сообщения сразу и дожидается всех начатых отправок. Вызывается при остановке."""
+        for scheduled_id, (handle, _) in list(self._scheduled.items()):
+            handle.cancel()
+            self._post_scheduled(scheduled_id)
+
+        if self._posted:
+            await asyncio.wait(self._posted)
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def scheduled_count(self) -> int:
+        return len(self._scheduled)
+
+    def _post_scheduled(self, scheduled_id: int) -> None:
+        _, request = self._scheduled.pop(scheduled_id)
+        self.post(request)
+
+    def _on_posted(self, task: asyncio.Task) -> None:
+        self._posted.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("failed to send telegram message", exc_info=task.exception())
+
+    async def _acquire(self, priority: OutboundPriority, sequence: int, chat_key: ChatKey) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((priority, sequence, chat_key, future))
+        started_at = time.monotonic()
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._dispatch()
+            raise
+
+        if self._wait_time_stats[priority].observe(time.monotonic() - started_at):
+            p50, p95 = self._wait_time_stats[priority].percentiles()
+            logger.info(
+                "telegram %s send queue depth: %s, wait time p50: %.2fs, p95: %.2fs",
+                priority.name,
+                len(self._waiters),
+                p50,
+                p95,
+            )
+
+    def _dispatch(self) -> None:
+        """Разрешает отправки, для которых хватает бюджета, в порядке приоритета; остальные ждут."""
+        if self._wakeup:
+            self._wakeup.cancel()
+            self._wakeup = None
+
+        now = time.monotonic()
+        next_wakeup: float | None = None
+        blocked_chats: set[ChatKey] = set()
+        waiting = []
+        for waiter in sorted(self._waiters, key=lambda waiter: waiter[:2]):
+            priority, _, chat_key, future = waiter
+            if future.done():
+                continue
+            if chat_key in blocked_chats:
+                # Сообщения одного чата уходят по порядку
+                waiting.append(waiter)
+                continue
+
+            wait_time = self._wait_time(priority, chat_key, now)
+            if wait_time > 0:
+                blocked_chats.add(chat_key)
+                waiting.append(waiter)
+                next_wakeup = wait_time if next_wakeup is None else min(next_wakeup, wait_time)
+                continue
+
+            self._global.take()
+            self._chat_bucket(chat_key).take()
+            if priority == OutboundPriority.BROADCAST:
+                self._broadcast.take()
+            future.set_result(None)
+
+        self._waiters = waiting
+        if next_wakeup is not None:
+            self._wakeup = asyncio.get_running_loop().call_later(next_wakeup, self._dispatch)
+
+    def _wait_time(self, priority: OutboundPriority, chat_key: ChatKey, now: float) -> float:
+        wait_time = max(
+            self._global.wait_time(),
+            self._chat_bucket(chat_key).wait_time(),
+            self._paused_until.get(chat_key, 0) - now,
+        )
+        if priority == OutboundPriority.BROADCAST:
+            wait_time = max(wait_time, self._broadcast.wait_time(), self._broadcast_paused_until - now)
+        return wait_time
+
+    def _pause(self, chat_key: ChatKey, priority: OutboundPriority, retry_after: float) -> None:
+        paused_until = time.monotonic() + retry_after
+        self._paused_until[chat_key] = max(self._paused_until.get(chat_key, 0), paused_until)
+        if priority == OutboundPriority.BROADCAST:
+            # Рассылка упёрлась в лимит — притормаживаем её целиком, а не только этот чат
+            self._broadcast_paused_until = max(self._broadcast_paused_until, paused_until)
+
+    def _chat_bucket(self, chat_key: ChatKey) -> TokenBucket:
+        bucket = self._chats.get(chat_key)
+        if bucket is None:
+            bucket = self._chats[chat_key] = TokenBucket(TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST)
+            while len(self._chats) > TELEGRAM_CHAT_CACHE_SIZE:
+                evicted, _ = self._chats.popitem(last=False)
+                self._paused_until.pop(evicted, None)
+        else:
+            self._chats.move_to_end(chat_key)
+        return bucket
+
+    def _is_chat_action_fresh(self, chat_key: ChatKey, action: str) -> bool:
+        now = time.monotonic()
+        last_action = self._chat_actions.get(chat_key)
+        if last_action and last_action[0] == action and now - last_action[1] < TELEGRAM_TYPING_TTL:
+            return True
+
+        self._chat_actions[chat_key] = (action, now)
+        self._chat_actions.move_to_end(chat_key)
+        while len(self._chat_actions) > TELEGRAM_CHAT_CACHE_SIZE:
+            self._chat_actions.popitem(last=False)
+        return False
+
+
+def _chat_key(method: TelegramMethod[Any]) -> ChatKey:
+    return getattr(method, "business_connection_id", None), method.chat_id
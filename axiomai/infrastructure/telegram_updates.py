@@ -0,0 +1,162 @@
+import json
+import logging
+import time
+import zlib
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+from axiomai.constants import (
+    TELEGRAM_UPDATES_BATCH_SIZE,
+    TELEGRAM_UPDATES_BLOCK_TIMEOUT,
+    TELEGRAM_UPDATES_LEASE_TTL,
+    TELEGRAM_UPDATES_STREAM_MAXLEN,
+)
+
+logger = logging.getLogger(__name__)
+
+_STREAM_KEY_PREFIX = "telegram_updates:"
+_LEASE_KEY_PREFIX = "telegram_updates_lease:"
+_WORKERS_KEY = "telegram_updates_workers"
+_GROUP_NAME = "tgbot"
+
+# Продлевает или снимает аренду, только если она всё ещё принадлежит этому воркеру
+RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TelegramUpdateQueue:
+    """
+    Очередь апдейтов Telegram между приёмником вебхука и воркерами бота.
+
+    Апдейты раскладываются по партициям (отдельный Redis stream на партицию) по хешу
+    (business_connection_id, chat_id), поэтому апдейты одного чата всегда попадают в одну партицию.
+    Партицию в каждый момент читает один воркер — тот, у кого её аренда, — и обрабатывает апдейты
+    по порядку, так что порядок сообщений и состояние FSM чата не разъезжаются между репликами.
+
+    Читатель партиции в consumer group всегда один и тот же (``partition-N``): новый владелец партиции
+    сначала дочитывает то, что предыдущий получил, но не успел подтвердить.
+    """
+
+    def __init__(self, redis: Redis, partitions: int) -> None:
+        self._redis = redis
+        self._partitions = partitions
+        self._renew_lease_script = redis.register_script(RENEW_LEASE_SCRIPT)
+        self._release_lease_script = redis.register_script(RELEASE_LEASE_SCRIPT)
+
+    @property
+    def partitions(self) -> int:
+        return self._partitions
+
+    async def publish(self, update: dict[str, Any]) -> None:
+        """Кладёт апдейт в партицию его чата. Ошибку Redis не глушит: Telegram повторит доставку."""
+        partition = partition_for(update, self._partitions)
+        await self._redis.xadd(
+            _stream_key(partition),
+            {"update": json.dumps(update, ensure_ascii=False)},
+            maxlen=TELEGRAM_UPDATES_STREAM_MAXLEN,
+            approximate=True,
+        )
+
+    async def ensure_groups(self) -> None:
+        for partition in range(self._partitions):
+            try:
+                await self._redis.xgroup_create(_stream_key(partition), _GROUP_NAME, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def read(self, partition: int, *, pending: bool = False) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Читает следующую пачку апдейтов партиции.
+
+        ``pending`` — вернуть апдейты, полученные раньше, но не подтверждённые (без ожидания новых).
+        """
+        response = await self._redis.xreadgroup(
+            _GROUP_NAME,
+            _consumer_name(partition),
+            {_stream_key(partition): "0" if pending else ">"},
+            count=TELEGRAM_UPDATES_BATCH_SIZE,
+            block=None if pending else TELEGRAM_UPDATES_BLOCK_TIMEOUT,
+        )
+
+        updates = []
+        for _, entries in response or []:
+            for entry_id, fields in entries:
+                try:
+                    updates.append((_decode(entry_id), json.loads(_decode(fields[b"update"]))))
+                except (KeyError, TypeError, ValueError):
+                    # Пустые поля — у апдейта, вытесненного из stream по maxlen
+                    logger.warning("broken telegram update %s in partition %s: %s", entry_id, partition, fields)
+                    await self.ack(partition, _decode(entry_id))
+
+        return updates
+
+    async def ack(self, partition: int, entry_id: str) -> None:
+        await self._redis.xack(_stream_key(partition), _GROUP_NAME, entry_id)
+
+    async def heartbeat(self, worker_id: str) -> int:
+        """Отмечает воркер живым и возвращает число живых воркеров."""
+        now = time.time()
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(_WORKERS_KEY, {worker_id: now})
+            pipe.zremrangebyscore(_WORKERS_KEY, "-inf", now - TELEGRAM_UPDATES_LEASE_TTL)
+            pipe.zcard(_WORKERS_KEY)
+            *_, workers = await pipe.execute()
+        return workers
+
+    async def leave(self, worker_id: str) -> None:
+        await self._redis.zrem(_WORKERS_KEY, worker_id)
+
+    async def acquire(self, partition: int, worker_id: str) -> bool:
+        return bool(await self._redis.set(_lease_key(partition), worker_id, nx=True, ex=TELEGRAM_UPDATES_LEASE_TTL))
+
+    async def renew(self, partition: int, worker_id: str) -> bool:
+        renewed = await self._renew_lease_script(
+            keys=[_lease_key(partition)], args=[worker_id, TELEGRAM_UPDATES_LEASE_TTL * 1000]
+        )
+        return bool(renewed)
+
+    async def release(self, partition: int, worker_id: str) -> None:
+        await self._release_lease_script(keys=[_lease_key(partition)], args=[worker_id])
+
+
+def partition_for(update: dict[str, Any], partitions: int) -> int:
+    """Партиция апдейта по (business_connection_id, chat_id) его события."""
+    event = next(
+        (value for key, value in update.items() if key != "update_id" and isinstance(value, dict)),
+        {},
+    )
+    # У callback_query чат и бизнес-подключение — у сообщения с кнопкой
+    message = event.get("message") if isinstance(event.get("message"), dict) else event
+    chat_id = (message.get("chat") or {}).get("id") or (event.get("from") or event.get("user") or {}).get("id")
+    business_connection_id = message.get("business_connection_id") or event.get("business_connection_id")
+    return zlib.crc32(f"{business_connection_id}:{chat_id}".encode()) % partitions
+
+
+def _stream_key(partition: int) -> str:
+    return f"{_STREAM_KEY_PREFIX}{partition}"
+
+
+def _lease_key(partition: int) -> str:
+    return f"{_LEASE_KEY_PREFIX}{partition}"
+
+
+def _consumer_name(partition: int) -> str:
+    return f"partition-{partition}"
+
+
+def _decode(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
@@ -5,14 +5,26 @@ from aiogram import Bot
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from dishka import AsyncContainer, make_async_container
+from redis.asyncio import Redis
 
 from axiomai.application.interactors.observe_balance_notifications import ObserveBalanceNotifications
 from axiomai.application.interactors.observe_cashback_tables import ObserveCashbackTables
 from axiomai.application.interactors.observe_inactive_reminders import ObserveInactiveReminders
-from axiomai.application.interactors.sync_cashback_tables import SyncCashbackTables
 from axiomai.config import Config, load_config
-from axiomai.infrastructure.di import DatabaseProvider, GatewaysProvider, ObserverInteractorsProvider
+from axiomai.constants import INACTIVE_REMINDERS_INTERVAL, SYNC_CASHBACK_TABLES_INTERVAL, SYNC_RECONCILE_INTERVAL
+from axiomai.infrastructure.di import (
+    ConfigProvider,
+    DatabaseProvider,
+    GatewaysProvider,
+    ObserverInteractorsProvider,
+    SuperbankingProvider,
+)
 from axiomai.infrastructure.logging import setup_logging
+from axiomai.infrastructure.sync_events import SyncEvents
+from axiomai.infrastructure.telegram.outbound import TelegramOutbound
+from axiomai.observer.payout_worker import SuperbankingPayoutWorker
+from axiomai.observer.sync_events_consumer import SyncEventsConsumer
+from axiomai.observer.sync_pipeline import SyncCashbackTablesPipeline
 
 logger = logging.getLogger(__name__)
 
@@ -27,51 +39,64 @@ async def run_cashback_tables_observer(di_container: AsyncContainer) -> None:
         await asyncio.sleep(10)
 
 
-async def run_sync_cashback_tables(di_container: AsyncContainer) -> None:
-    logger.info("start sync cashback tables...")
-    while True:
-        async with di_container() as r_container:
-            sync_cashback_tables = await r_container.get(SyncCashbackTables)
-            await sync_cashback_tables.execute()
-
-        await asyncio.sleep(10)
-
-
-async def run_balance_notifications_observer(di_container: AsyncContainer) -> None:
+async def run_balance_notifications_observer(di_container: AsyncContainer, interval: int = 10) -> None:
     logger.info("start balance notifications observer...")
     while True:
         async with di_container() as r_container:
             observe_balance_notifications = await r_container.get(ObserveBalanceNotifications)
             await observe_balance_notifications.execute()
 
-        await asyncio.sleep(10)
+        await asyncio.sleep(interval)
 
 
 async def run_inactive_reminders_observer(di_container: AsyncContainer) -> None:
     logger.info("start inactive reminders observer...")
     while True:
-        async with di_container() as r_container:
-            observe_inactive_reminders = await r_container.get(ObserveInactiveReminders)
-            await observe_inactive_reminders.execute()
+        try:
+            async with di_container() as r_container:
+                observe_inactive_reminders = await r_container.get(ObserveInactiveReminders)
+                await observe_inactive_reminders.execute()
+        except Exception as e:
+            logger.exception("failed to send inactive reminders", exc_info=e)
 
-        await asyncio.sleep(3600)  # Проверяем раз в час
+        # Выбираются только наступившие напоминания, поэтому проверка дешёвая
+        await asyncio.sleep(INACTIVE_REMINDERS_INTERVAL)
 
 
 async def main() -> None:
     config = load_config()
     setup_logging(json_logs=config.json_logs)
     bot = Bot(token=config.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    redis = Redis.from_url(config.redis_uri)
     di_container = make_async_container(
+        ConfigProvider(),
         DatabaseProvider(),
         ObserverInteractorsProvider(),
         GatewaysProvider(),
-        context={Config: config, Bot: bot},
+        SuperbankingProvider(),
+        context={Config: config, Bot: bot, Redis: redis},
     )
+    bot.session.middleware(await di_container.get(TelegramOutbound))
+    if config.use_sync_events:
+        # Изменения приходят событиями, полный проход остаётся страховкой от потерянных событий
+        sync_pipeline = SyncCashbackTablesPipeline(di_container, interval=SYNC_RECONCILE_INTERVAL)
+        sync_events_consumer = SyncEventsConsumer(di_container, await di_container.get(SyncEvents), sync_pipeline)
+        tasks = [
+            run_balance_notifications_observer(di_container, interval=SYNC_RECONCILE_INTERVAL),
+            sync_events_consumer.run(),
+        ]
+    else:
+        sync_pipeline = SyncCashbackTablesPipeline(di_container, interval=SYNC_CASHBACK_TABLES_INTERVAL)
+        tasks = [run_balance_notifications_observer(di_container)]
+    payout_worker = SuperbankingPayoutWorker(di_container)
+
     try:
         await asyncio.gather(
             asyncio.create_task(run_cashback_tables_observer(di_container)),
-            asyncio.create_task(run_sync_cashback_tables(di_container)),
-            asyncio.create_task(run_balance_notifications_observer(di_container)),
+            asyncio.create_task(sync_pipeline.run()),
+            asyncio.create_task(run_inactive_reminders_observer(di_container)),
+            asyncio.create_task(payout_worker.run()),
+            *(asyncio.create_task(task) for task in tasks),
         )
     finally:
         await di_container.close()
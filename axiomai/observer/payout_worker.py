@@ -0,0 +1,82 @@
+import asyncio
+import logging
+
+from dishka import AsyncContainer
+
+from axiomai.application.interactors.process_superbanking_payout import ProcessSuperbankingPayout
+from axiomai.constants import (
+    SUPERBANKING_PAYOUT_LEASE,
+    SUPERBANKING_PAYOUT_TIMEOUT,
+    SUPERBANKING_PAYOUTS_CONCURRENCY,
+    SUPERBANKING_PAYOUTS_INTERVAL,
+)
+from axiomai.infrastructure.database.gateways.superbanking_payout import SuperbankingPayoutGateway
+from axiomai.infrastructure.database.transaction_manager import TransactionManager
+
+logger = logging.getLogger(__name__)
+
+
+class SuperbankingPayoutWorker:
+    """
+    Фоновое проведение выплат Superbanking.
+
+    Каждый тик берёт из БД выплаты, чья очередь наступила, и проводит каждую в своём request-scope,
+    одновременно — не больше SUPERBANKING_PAYOUTS_CONCURRENCY. Выплаты берутся только под свободные места,
+    чтобы аренда не истекала, пока выплата ждёт своей очереди в процессе. Состояние выплаты хранится в БД,
+    поэтому после перезапуска воркер продолжает с сохранённого статуса: выплата упавшего процесса
+    возвращается в очередь через SUPERBANKING_PAYOUT_LEASE.
+    """
+
+    def __init__(self, di_container: AsyncContainer, interval: int = SUPERBANKING_PAYOUTS_INTERVAL) -> None:
+        self._di_container = di_container
+        self._interval = interval
+        self._in_flight: dict[int, asyncio.Task] = {}
+
+    async def run(self) -> None:
+        logger.info("start superbanking payouts worker...")
+        try:
+            while True:
+                try:
+                    await self.tick()
+                except Exception as e:
+                    logger.exception("failed to schedule superbanking payouts", exc_info=e)
+
+                await asyncio.sleep(self._interval)
+        finally:
+            for task in list(self._in_flight.values()):
+                task.cancel()
+
+    async def tick(self) -> list[asyncio.Task]:
+        """Берёт в работу наступившие выплаты, пока в пуле есть место."""
+        limit = SUPERBANKING_PAYOUTS_CONCURRENCY - len(self._in_flight)
+        if limit <= 0:
+            return []
+
+        async with self._di_container() as r_container:
+            superbanking_payout_gateway = await r_container.get(SuperbankingPayoutGateway)
+            transaction_manager = await r_container.get(TransactionManager)
+            payout_ids = await superbanking_payout_gateway.claim_due_payouts(limit, SUPERBANKING_PAYOUT_LEASE)
+            await transaction_manager.commit()
+
+        started = []
+        for payout_id in payout_ids:
+            if payout_id in self._in_flight:
+                continue
+
+            task = asyncio.create_task(self._process(payout_id))
+            self._in_flight[payout_id] = task
+            task.add_done_callback(lambda _, payout_id=payout_id: self._in_flight.pop(payout_id, None))
+            started.append(task)
+
+        return started
+
+    async def _process(self, payout_id: int) -> None:
+        try:
+            async with asyncio.timeout(SUPERBANKING_PAYOUT_TIMEOUT), self._di_container() as r_container:
+                process_superbanking_payout = await r_container.get(ProcessSuperbankingPayout)
+                await process_superbanking_payout.execute(payout_id)
+        except TimeoutError:
+            # Выплата вернётся в очередь, когда истечёт аренда
+            logger.warning("superbanking payout %s timed out after %ss", payout_id, SUPERBANKING_PAYOUT_TIMEOUT)
+        except Exception as e:
+            logger.exception("failed to process superbanking payout %s", payout_id, exc_info=e)
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+from dishka import AsyncContainer
+
+from axiomai.application.interactors.observe_balance_notifications import ObserveBalanceNotifications
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
+from axiomai.observer.sync_pipeline import SyncCashbackTablesPipeline
+
+logger = logging.getLogger(__name__)
+
+_RETRY_DELAY = 5
+
+
+class SyncEventsConsumer:
+    """
+    Синхронизирует таблицы и проверяет балансы только тех кабинетов, по которым пришли события.
+
+    События подтверждаются, только когда все их таблицы записаны; иначе они будут прочитаны повторно.
+    """
+
+    def __init__(
+        self,
+        di_container: AsyncContainer,
+        sync_events: SyncEvents,
+        sync_pipeline: SyncCashbackTablesPipeline,
+    ) -> None:
+        self._di_container = di_container
+        self._sync_events = sync_events
+        self._sync_pipeline = sync_pipeline
+
+    async def run(self) -> None:
+        logger.info("start sync events consumer...")
+        await self._sync_events.ensure_group()
+        while True:
+            try:
+                batch = await self._sync_events.read()
+                await self.handle(batch.dirty)
+                await self._sync_events.ack(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("failed to handle sync events", exc_info=e)
+                await asyncio.sleep(_RETRY_DELAY)
+
+    async def handle(self, dirty: dict[SyncEventType, set[int]]) -> None:
+        synced = []
+        if dirty_tables := dirty.get(SyncEventType.DIRTY_TABLE):
+            synced = await asyncio.gather(*await self._sync_pipeline.sync_cabinets(sorted(dirty_tables)))
+
+        if dirty_cabinets := dirty.get(SyncEventType.DIRTY_CABINET):
+            async with self._di_container() as r_container:
+                observe_balance_notifications = await r_container.get(ObserveBalanceNotifications)
+                await observe_balance_notifications.execute(sorted(dirty_cabinets))
+
+        if not all(synced):
+            raise RuntimeError(f"failed to sync cashback tables of cabinets {sorted(dirty_tables)}")
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+
+from dishka import AsyncContainer
+
+from axiomai.application.interactors.sync_cashback_tables import SyncCashbackTables
+from axiomai.constants import (
+    SYNC_CASHBACK_TABLE_TIMEOUT,
+    SYNC_CASHBACK_TABLES_CONCURRENCY,
+    SYNC_CASHBACK_TABLES_INTERVAL,
+)
+from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
+
+logger = logging.getLogger(__name__)
+
+
+class SyncCashbackTablesPipeline:
+    """
+    Параллельная синхронизация таблиц кешбека.
+
+    Каждая таблица синхронизируется в своём request-scope (своя сессия БД), одновременно — не больше
+    SYNC_CASHBACK_TABLES_CONCURRENCY таблиц. Таблица, которая ещё синхронизируется, пропускается на следующих
+    тиках, поэтому медленная таблица не задерживает остальные.
+
+    Кроме тиков по интервалу таблицы можно синхронизировать по событиям (``sync_cabinets``): если таблица
+    в этот момент синхронизируется, она будет синхронизирована ещё раз сразу после завершения.
+    Каждая синхронизация завершается True, если таблица записана, и False, если синхронизация не удалась.
+    """
+
+    def __init__(self, di_container: AsyncContainer, interval: int = SYNC_CASHBACK_TABLES_INTERVAL) -> None:
+        self._di_container = di_container
+        self._interval = interval
+        self._timeout = SYNC_CASHBACK_TABLE_TIMEOUT
+        self._semaphore = asyncio.Semaphore(SYNC_CASHBACK_TABLES_CONCURRENCY)
+        self._in_flight: dict[int, asyncio.Task[bool]] = {}
+        # Таблицы, которые нужно синхронизировать ещё раз, и результат этой повторной синхронизации
+        self._resync: dict[int, asyncio.Future[bool]] = {}
+
+    async def run(self) -> None:
+        logger.info("start sync cashback tables...")
+        try:
+            while True:
+                try:
+                    await self.tick()
+                except Exception as e:
+                    logger.exception("failed to schedule cashback tables sync", exc_info=e)
+
+                await asyncio.sleep(self._interval)
+        finally:
+            for future in self._resync.values():
+                future.cancel()
+            self._resync.clear()
+            for task in list(self._in_flight.values()):
+                task.cancel()
+
+    async def tick(self) -> list[asyncio.Task[bool]]:
+        """Запускает синхронизацию активных таблиц, которые сейчас не синхронизируются."""
+        async with self._di_container() as r_container:
+            cashback_table_gateway = await r_container.get(CashbackTableGateway)
+            cashback_table_ids = await cashback_table_gateway.get_active_cashback_table_ids()
+
+        started = []
+        for cashback_table_id in cashback_table_ids:
+            if cashback_table_id in self._in_flight:
+                logger.debug("cashback table %s is still syncing, skip", cashback_table_id)
+                continue
+
+            started.append(self._start(cashback_table_id))
+
+        return started
+
+    async def sync_cabinets(self, cabinet_ids: list[int]) -> list[asyncio.Future[bool]]:
+        """
+        Запускает синхронизацию таблиц изменённых кабинетов.
+
+        Для таблицы, которая уже синхронизируется, возвращается результат её повторной синхронизации.
+        """
+        async with self._di_container() as r_container:
+            cashback_table_gateway = await r_container.get(CashbackTableGateway)
+            cashback_table_ids = await cashback_table_gateway.get_active_cashback_table_ids_by_cabinet_ids(cabinet_ids)
+
+        started = []
+        for cashback_table_id in cashback_table_ids:
+            if cashback_table_id in self._in_flight:
+                # Изменения могли не попасть в текущую синхронизацию
+                if cashback_table_id not in self._resync:
+                    self._resync[cashback_table_id] = asyncio.get_running_loop().create_future()
+                started.append(self._resync[cashback_table_id])
+                continue
+
+            started.append(self._start(cashback_table_id))
+
+        return started
+
+    def _start(self, cashback_table_id: int) -> asyncio.Task[bool]:
+        task = asyncio.create_task(self._sync_table(cashback_table_id))
+        self._in_flight[cashback_table_id] = task
+        task.add_done_callback(lambda _: self._on_done(cashback_table_id))
+        return task
+
+    def _on_done(self, cashback_table_id: int) -> None:
+        self._in_flight.pop(cashback_table_id, None)
+        future = self._resync.pop(cashback_table_id, None)
+        if future:
+            self._start(cashback_table_id).add_done_callback(lambda task: _copy_result(task, future))
+
+    async def _sync_table(self, cashback_table_id: int) -> bool:
+        async with self._semaphore:
+            started_at = time.perf_counter()
+            try:
+                async with asyncio.timeout(self._timeout), self._di_container() as r_container:
+                    sync_cashback_tables = await r_container.get(SyncCashbackTables)
+                    await sync_cashback_tables.execute_for_table(cashback_table_id)
+            except TimeoutError:
+                logger.warning("cashback table %s sync timed out after %ss", cashback_table_id, self._timeout)
+                return False
+            except Exception as e:
+                logger.exception("failed to sync cashback table %s", cashback_table_id, exc_info=e)
+                return False
+            else:
+                return True
+            finally:
+                logger.info(
+                    "cashback table %s synced in %.2fs", cashback_table_id, time.perf_counter() - started_at
+                )
+
+
+def _copy_result(task: asyncio.Task[bool], future: asyncio.Future[bool]) -> None:
+    if future.done():
+        return
+    if task.cancelled():
+        future.cancel()
+    else:
+        future.set_result(task.result())
@@ -12,11 +12,22 @@ from dishka.integrations.aiogram import setup_dishka
 from redis.asyncio import Redis
 
 from axiomai.config import Config, load_config
-from axiomai.infrastructure.di import ConfigProvider, DatabaseProvider, GatewaysProvider, TgbotInteractorsProvider
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
+from axiomai.infrastructure.di import (
+    ConfigProvider,
+    DatabaseProvider,
+    GatewaysProvider,
+    SuperbankingProvider,
+    TgbotInteractorsProvider,
+)
 from axiomai.infrastructure.logging import setup_logging
+from axiomai.infrastructure.message_debouncer import MessageDebouncer
 from axiomai.infrastructure.telegram import dialogs
 from axiomai.infrastructure.telegram.middleware.forward_seller_messages import ForwardSellerMessagesMiddleware
-from axiomai.tgbot import bot_commands, handlers
+from axiomai.infrastructure.telegram.outbound import TelegramOutbound
+from axiomai.infrastructure.telegram_updates import TelegramUpdateQueue
+from axiomai.tgbot import bot_commands, debounce_handlers, handlers
+from axiomai.tgbot.update_worker import UpdateWorker
 
 
 async def main() -> None:
@@ -35,22 +46,50 @@ async def main() -> None:
         DatabaseProvider(),
         TgbotInteractorsProvider(),
         GatewaysProvider(),
+        SuperbankingProvider(),
         context={Config: config, Redis: redis, Bot: bot, BaseStorage: storage},
     )
 
+    # Все отправки бота идут через общую очередь с лимитами Telegram
+    outbound = await di_container.get(TelegramOutbound)
+    bot.session.middleware(outbound)
     dispatcher.message.middleware(ForwardSellerMessagesMiddleware(config.admin_telegram_ids))
 
     handlers.setup(dispatcher)
     dialogs.setup(dispatcher)
 
     setup_jinja(dispatcher)
-    setup_dialogs(dispatcher)
+    bg_manager_factory = setup_dialogs(dispatcher)
     setup_dishka(di_container, dispatcher)
 
+    cabinet_snapshot_cache = await di_container.get(CabinetSnapshotCache)
+    cabinet_snapshot_task = asyncio.create_task(cabinet_snapshot_cache.listen())
+
+    scheduler_task = None
+    if config.message_debouncer.use_redis_scheduler:
+        debouncer = await di_container.get(MessageDebouncer)
+        debounce_handlers.setup(debouncer, bot, storage, bg_manager_factory, di_container)
+        scheduler_task = asyncio.create_task(debouncer.run_scheduler())
+
     try:
         await bot_commands.setup(bot)
-        await dispatcher.start_polling(bot, di_container=di_container)
+        if config.webhook.webhook_url:
+            # Апдейты принимает axiomai.webhook, реплики бота делят их по партициям
+            await bot.set_webhook(
+                config.webhook.webhook_url,
+                secret_token=config.webhook.webhook_secret,
+                allowed_updates=dispatcher.resolve_used_update_types(),
+            )
+            update_queue = TelegramUpdateQueue(redis, config.webhook.update_partitions)
+            await UpdateWorker(update_queue, dispatcher, bot, di_container=di_container).run()
+        else:
+            await bot.delete_webhook()
+            await dispatcher.start_polling(bot, di_container=di_container)
     finally:
+        cabinet_snapshot_task.cancel()
+        if scheduler_task:
+            scheduler_task.cancel()
+        await outbound.flush()
         await bot.session.close()
 
 
@@ -0,0 +1,114 @@
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import Bot
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram_dialog import BaseDialogManager, BgManagerFactory
+from dishka import AsyncContainer
+
+from axiomai.config import Config
+from axiomai.infrastructure.message_debouncer import (
+    DebounceHandler,
+    MessageData,
+    MessageDebouncer,
+    RestoredProcessCallback,
+)
+from axiomai.infrastructure.openai import OpenAIGateway
+from axiomai.infrastructure.telegram.dialogs.cashback_article.common import _process_dialog_messages
+from axiomai.infrastructure.telegram.dialogs.cashback_article.q1_input_order_screenshot import (
+    _process_order_screenshot_background,
+)
+from axiomai.infrastructure.telegram.dialogs.cashback_article.q2_input_feedback_screenshot import (
+    _process_feedback_screenshot_background,
+)
+from axiomai.infrastructure.telegram.dialogs.cashback_article.q3_input_cut_labels_screenshot import (
+    _process_cut_labels_photo_background,
+)
+from axiomai.tgbot.handlers.process_clients import _process_accumulated_messages
+
+
+def setup(
+    debouncer: MessageDebouncer,
+    bot: Bot,
+    storage: BaseStorage,
+    bg_manager_factory: BgManagerFactory,
+    di_container: AsyncContainer,
+) -> None:
+    """
+    Регистрирует обработчики для планировщика MessageDebouncer.
+
+    Они восстанавливают FSMContext и DialogManager по business_connection_id и chat_id,
+    чтобы обработать сообщения, принятые другой репликой или до перезапуска процесса.
+    """
+
+    def _bg_manager(business_connection_id: str, chat_id: int) -> BaseDialogManager:
+        return bg_manager_factory.bg(
+            bot=bot, user_id=chat_id, chat_id=chat_id, business_connection_id=business_connection_id
+        )
+
+    async def predialog(
+        business_connection_id: str, chat_id: int, messages: list[MessageData], meta: dict[str, Any]
+    ) -> None:
+        state = FSMContext(
+            storage,
+            StorageKey(
+                bot_id=bot.id, chat_id=chat_id, user_id=chat_id, business_connection_id=business_connection_id
+            ),
+        )
+        await _process_accumulated_messages(
+            business_connection_id,
+            chat_id,
+            meta.get("username"),
+            meta.get("fullname", ""),
+            messages,
+            bot,
+            state,
+            _bg_manager(business_connection_id, chat_id),
+            di_container,
+        )
+
+    async def dialog(
+        business_connection_id: str, chat_id: int, messages: list[MessageData], meta: dict[str, Any]
+    ) -> None:
+        await _process_dialog_messages(
+            business_connection_id,
+            chat_id,
+            meta.get("username"),
+            meta.get("fullname", ""),
+            messages,
+            bot,
+            di_container,
+            _bg_manager(business_connection_id, chat_id),
+        )
+
+    def screenshot_handler(process_background: Callable[..., Awaitable[None]]) -> RestoredProcessCallback:
+        async def handler(
+            business_connection_id: str, chat_id: int, messages: list[MessageData], meta: dict[str, Any]
+        ) -> None:
+            await process_background(
+                messages=messages,
+                bot=bot,
+                bg_manager=_bg_manager(business_connection_id, chat_id),
+                di_container=di_container,
+                openai_gateway=await di_container.get(OpenAIGateway),
+                config=await di_container.get(Config),
+                chat_id=chat_id,
+                business_connection_id=business_connection_id,
+                username=meta.get("username"),
+                fullname=meta.get("fullname", ""),
+            )
+
+        return handler
+
+    debouncer.register_handler(DebounceHandler.PREDIALOG, predialog)
+    debouncer.register_handler(DebounceHandler.DIALOG, dialog)
+    debouncer.register_handler(
+        DebounceHandler.ORDER_SCREENSHOT, screenshot_handler(_process_order_screenshot_background)
+    )
+    debouncer.register_handler(
+        DebounceHandler.FEEDBACK_SCREENSHOT, screenshot_handler(_process_feedback_screenshot_background)
+    )
+    debouncer.register_handler(
+        DebounceHandler.CUT_LABELS_SCREENSHOT, screenshot_handler(_process_cut_labels_photo_background)
+    )
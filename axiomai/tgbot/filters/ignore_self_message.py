@@ -1,9 +1,19 @@
 from aiogram import Bot
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
+from dishka import AsyncContainer
+
+from axiomai.infrastructure.business_connection_cache import BusinessConnectionCache
 
 
 class SelfBusinessMessageFilter(BaseFilter):
-    async def __call__(self, message: Message, bot: Bot) -> bool:
-        business_connection = await bot.get_business_connection(message.business_connection_id)
-        return message.from_user.id == business_connection.user.id
+    async def __call__(self, message: Message, bot: Bot, dishka_container: AsyncContainer) -> bool:
+        business_connection_cache = await dishka_container.get(BusinessConnectionCache)
+
+        owner_id = await business_connection_cache.get(message.business_connection_id)
+        if owner_id is None:
+            business_connection = await bot.get_business_connection(message.business_connection_id)
+            owner_id = business_connection.user.id
+            await business_connection_cache.set(message.business_connection_id, owner_id)
+
+        return message.from_user.id == owner_id
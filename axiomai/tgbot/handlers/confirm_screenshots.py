@@ -14,6 +14,7 @@ from axiomai.application.interactors.cancel_buyer import CancelBuyer
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventType
 from axiomai.infrastructure.telegram.dialogs.cashback_article.common import determine_resume_state
 from axiomai.infrastructure.telegram.dialogs.states import CashbackArticleStates
 from axiomai.tgbot.filters.ignore_self_message import SelfBusinessMessageFilter
@@ -41,6 +42,7 @@ async def on_seller_confirm_screenshot(
     cabinet_gateway: FromDishka[CabinetGateway],
     buyer_gateway: FromDishka[BuyerGateway],
     transaction_manager: FromDishka[TransactionManager],
+    sync_events: FromDishka[SyncEvents],
 ) -> None:
     try:
         await bot.delete_business_messages(
@@ -83,6 +85,7 @@ async def on_seller_confirm_screenshot(
         target.is_cut_labels = True
 
     await transaction_manager.commit()
+    await sync_events.publish(SyncEventType.DIRTY_TABLE, cabinet.id)
 
     buyers = await buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(lead_id, cabinet.id)
     next_state = determine_resume_state(buyers) or CashbackArticleStates.input_requisites
@@ -6,6 +6,8 @@ from aiogram.types import BusinessConnection, Message
 from dishka import FromDishka
 from dishka.integrations.aiogram import inject
 
+from axiomai.infrastructure.business_connection_cache import BusinessConnectionCache
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
 
@@ -59,7 +61,11 @@ async def enable_business_connection_handler(
     bot: Bot,
     cabinet_gateway: FromDishka[CabinetGateway],
     transaction_manager: FromDishka[TransactionManager],
+    business_connection_cache: FromDishka[BusinessConnectionCache],
+    cabinet_snapshot_cache: FromDishka[CabinetSnapshotCache],
 ) -> None:
+    await business_connection_cache.set(business_connection.id, business_connection.user.id)
+
     if not all(
         (
             business_connection.rights.can_reply,
@@ -89,6 +95,7 @@ async def enable_business_connection_handler(
 
     cabinet.business_connection_id = business_connection.id
     await transaction_manager.commit()
+    await cabinet_snapshot_cache.invalidate(cabinet.id)
 
     await bot.send_message(business_connection.user.id, "✅ Бизнес-аккаунт успешно подключен и готов к работе!")
 
@@ -100,11 +107,16 @@ async def disable_business_connection_handler(
     bot: Bot,
     cabinet_gateway: FromDishka[CabinetGateway],
     transaction_manager: FromDishka[TransactionManager],
+    business_connection_cache: FromDishka[BusinessConnectionCache],
+    cabinet_snapshot_cache: FromDishka[CabinetSnapshotCache],
 ) -> None:
+    await business_connection_cache.delete(business_connection.id)
+
     cabinet = await cabinet_gateway.get_cabinet_by_business_account_id(business_connection.user.id)
 
     cabinet.business_connection_id = None
     await transaction_manager.commit()
+    await cabinet_snapshot_cache.invalidate(cabinet.id)
 
     await bot.send_message(
         business_connection.user.id,
@@ -1,5 +1,6 @@
-import asyncio
 import logging
+import time
+from dataclasses import dataclass
 from datetime import UTC, datetime
 
 from aiogram import Bot, Router
@@ -14,18 +15,23 @@ from redis.asyncio import Redis
 
 from axiomai.application.interactors.create_buyer import CreateBuyer
 from axiomai.config import Config
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
 from axiomai.infrastructure.chat_history import (
     add_predialog_chat_history,
     clear_predialog_chat_history,
     get_predialog_chat_history,
+    save_predialog_chat_history,
 )
 from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
 from axiomai.infrastructure.database.gateways.cabinet import CabinetGateway
 from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
-from axiomai.infrastructure.message_debouncer import MessageData, MessageDebouncer, merge_messages_text
+from axiomai.infrastructure.database.models.cashback_table import CashbackArticle, CashbackTable
+from axiomai.infrastructure.message_debouncer import DebounceHandler, MessageData, MessageDebouncer, merge_messages_text
 from axiomai.infrastructure.openai import OpenAIGateway
-from axiomai.infrastructure.telegram.dialogs.cashback_article.common import determine_resume_state
+from axiomai.infrastructure.photo_fetcher import Photo, PhotoFetcher, select_photo_size
+from axiomai.infrastructure.telegram.dialogs.cashback_article.common import determine_resume_state, send_in_order
 from axiomai.infrastructure.telegram.dialogs.states import CashbackArticleStates
+from axiomai.infrastructure.telegram.outbound import TelegramOutbound
 from axiomai.tgbot.filters.ignore_self_message import SelfBusinessMessageFilter
 
 logger = logging.getLogger(__name__)
@@ -34,6 +40,14 @@ router = Router()
 router.business_message.filter(~SelfBusinessMessageFilter())
 
 
+@dataclass(frozen=True)
+class PredialogContext:
+    """Таблица кешбека и доступные клиенту артикулы. Загружается заранее, пока копятся сообщения."""
+
+    cashback_table: CashbackTable | None
+    articles: list[CashbackArticle]
+
+
 @router.business_message(StateFilter(None))
 @inject
 async def process_clients_business_message(
@@ -45,8 +59,12 @@ async def process_clients_business_message(
     debouncer: FromDishka[MessageDebouncer],
     cabinet_gateway: FromDishka[CabinetGateway],
     buyer_gateway: FromDishka[BuyerGateway],
+    cabinet_snapshot_cache: FromDishka[CabinetSnapshotCache],
+    photo_fetcher: FromDishka[PhotoFetcher],
 ) -> None:
-    cabinet = await cabinet_gateway.get_cabinet_by_business_connection_id(message.business_connection_id)
+    cabinet = await cabinet_snapshot_cache.get_or_load(
+        message.business_connection_id, cabinet_gateway.get_cabinet_snapshot_by_business_connection_id
+    )
 
     if not cabinet:
         logger.warning("no cabinet found for business connection %s, skipping message from chat %s", message.business_connection_id, message.chat.id)
@@ -79,18 +97,18 @@ async def process_clients_business_message(
 
     message_text = message.text or message.caption or ""
 
-    photo_url = None
-    if message.photo:
-        photo = message.photo[-1]
-        file = await bot.get_file(photo.file_id)
-        photo_url = f"https://api.telegram.org/file/bot{bot.token}/{file.file_path}"
+    photo = select_photo_size(message.photo) if message.photo else None
+    if photo:
+        # Фото скачивается, пока идёт debounce
+        photo_fetcher.prefetch(photo.file_id, photo.file_unique_id)
 
     message_data = MessageData(
         text=message_text,
         timestamp=datetime.now(UTC).timestamp(),
         message_id=message.message_id,
         has_photo=bool(message.photo),
-        photo_url=photo_url,
+        photo_file_id=photo.file_id if photo else None,
+        photo_unique_id=photo.file_unique_id if photo else None,
     )
     bg_manager = dialog_manager.bg()
     app_container = di_container.parent_container
@@ -99,12 +117,47 @@ async def process_clients_business_message(
         business_connection_id=message.business_connection_id,
         chat_id=message.chat.id,
         message_data=message_data,
-        process_callback=lambda biz_id, chat_id, msgs: _process_accumulated_messages(
-            biz_id, chat_id, message.from_user.username, message.from_user.full_name, msgs, bot, state, bg_manager, app_container
+        process_callback=lambda biz_id, chat_id, msgs, context: _process_accumulated_messages(
+            biz_id, chat_id, message.from_user.username, message.from_user.full_name, msgs, bot, state, bg_manager, app_container, context
         ),
+        handler=DebounceHandler.PREDIALOG,
+        meta={"username": message.from_user.username, "fullname": message.from_user.full_name},
+        prefetch=lambda: _load_predialog_context(app_container, message.business_connection_id, message.chat.id),
     )
 
 
+async def _fetch_first_photo(photo_fetcher: PhotoFetcher, messages: list[MessageData], chat_id: int) -> Photo | None:
+    photo_message = next((msg for msg in messages if msg.photo_file_id), None)
+    if not photo_message:
+        return None
+
+    try:
+        return await photo_fetcher.fetch(photo_message.photo_file_id, photo_message.photo_unique_id)
+    except Exception as e:
+        # Без фото модель всё равно ответит по тексту
+        logger.exception("failed to fetch photo for chat %s", chat_id, exc_info=e)
+        return None
+
+
+async def _load_predialog_context(
+    di_container: AsyncContainer, business_connection_id: str, chat_id: int
+) -> PredialogContext:
+    async with di_container() as r_container:
+        cashback_table_gateway = await r_container.get(CashbackTableGateway)
+
+        cashback_table = await cashback_table_gateway.get_active_cashback_table_by_business_connection_id(
+            business_connection_id
+        )
+        if not cashback_table:
+            return PredialogContext(cashback_table=None, articles=[])
+
+        articles = await cashback_table_gateway.get_in_stock_cashback_articles_by_cabinet_id(
+            cabinet_id=cashback_table.cabinet_id, telegram_id=chat_id
+        )
+
+    return PredialogContext(cashback_table=cashback_table, articles=articles)
+
+
 async def _process_accumulated_messages(
     business_connection_id: str,
     chat_id: int,
@@ -115,94 +168,107 @@ async def _process_accumulated_messages(
     state: FSMContext,
     dialog_manager: DialogManager,
     di_container: AsyncContainer,
+    context: PredialogContext | None = None,
 ) -> None:
-    """Обработка накопленных сообщений после паузы. Вызывается MessageDebouncer автоматически."""
+    """
+    Обработка накопленных сообщений после паузы. Вызывается MessageDebouncer автоматически.
+
+    ``context`` загружается заранее параллельно с окном накопления; если его нет, загружается здесь.
+    """
     logger.info("processing %s accumulated messages for chat %s", len(messages), chat_id)
 
-    async with di_container() as r_container:
-        config = await r_container.get(Config)
-        cashback_table_gateway = await r_container.get(CashbackTableGateway)
-        openai_gateway = await r_container.get(OpenAIGateway)
-        redis = await r_container.get(Redis)
+    if context is None:
+        context = await _load_predialog_context(di_container, business_connection_id, chat_id)
 
-        cashback_table = await cashback_table_gateway.get_active_cashback_table_by_business_connection_id(
-            business_connection_id
-        )
-
-        if not cashback_table:
-            await bot.send_message(
-                chat_id=chat_id,
-                text="Таблица кешбека не найдена или не активна.",
-                business_connection_id=business_connection_id,
-            )
-            return
+    cashback_table = context.cashback_table
+    articles = context.articles
 
-        articles = await cashback_table_gateway.get_in_stock_cashback_articles_by_cabinet_id(
-            cabinet_id=cashback_table.cabinet_id, telegram_id=chat_id
+    if not cashback_table:
+        await bot.send_message(
+            chat_id=chat_id,
+            text="Таблица кешбека не найдена или не активна.",
+            business_connection_id=business_connection_id,
         )
+        return
 
-        if not articles:
-            logger.info("skip processing no articles for user %s", chat_id)
-            return
+    if not articles:
+        logger.info("skip processing no articles for user %s", chat_id)
+        return
+
+    async with di_container() as r_container:
+        config = await r_container.get(Config)
+        openai_gateway = await r_container.get(OpenAIGateway)
+        photo_fetcher = await r_container.get(PhotoFetcher)
+        outbound = await r_container.get(TelegramOutbound)
+        redis = await r_container.get(Redis)
 
     chat_history = await get_predialog_chat_history(redis, business_connection_id, chat_id)
 
     combined_text = merge_messages_text(messages)
 
-    photo_urls = [msg.photo_url for msg in messages if msg.photo_url]
-    photo_url = photo_urls[0] if photo_urls else None
+    photo = await _fetch_first_photo(photo_fetcher, messages, chat_id)
 
     logger.debug("combined text: %s...", combined_text[:100])
-    logger.debug("photo urls: %s", len(photo_urls))
+
+    # Клиент видит, что ему печатают, пока модель генерирует ответ
+    started_at = time.monotonic()
+    outbound.post(
+        bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING, business_connection_id=business_connection_id)
+    )
 
     result = await openai_gateway.chat_with_client(
         user_message=combined_text,
         articles=articles,
         chat_history=chat_history,
-        photo_url=photo_url,
+        photo=photo,
     )
 
     response_text = result["response"]
     classified_article_ids = result["article_ids"]
 
-    await bot.send_chat_action(
-        chat_id=chat_id,
-        action=ChatAction.TYPING,
-        business_connection_id=business_connection_id,
-    )
-    await asyncio.sleep(config.delay_between_bot_messages)
+    await add_predialog_chat_history(redis, business_connection_id, chat_id, combined_text, response_text)
 
-    if classified_article_ids:
-        await add_predialog_chat_history(redis, business_connection_id, chat_id, combined_text, response_text)
-
-        await bot.send_message(
-            chat_id=chat_id,
-            text=response_text,
-            business_connection_id=business_connection_id,
-            parse_mode=ParseMode.MARKDOWN,
-        )
+    # Ответ уйдёт после паузы "набора" (она частично прошла, пока генерировался ответ), обработка его не ждёт
+    send_at = started_at + config.delay_between_bot_messages
 
+    if classified_article_ids:
         predialog_history = await get_predialog_chat_history(redis, business_connection_id, chat_id)
         await clear_predialog_chat_history(redis, business_connection_id, chat_id)
 
         await state.set_state("client_processing")
 
-        async with di_container() as r_container:
-            create_buyer = await r_container.get(CreateBuyer)
-            for article_id in classified_article_ids:
-                await create_buyer.execute(chat_id, username, fullname, article_id, predialog_history)
+        # Заявкам принадлежит и pre-dialog переписка, которая привела к выбору товара
+        dialog_started_at = datetime.fromisoformat(predialog_history[0]["created_at"]) if predialog_history else None
+        await _create_buyers(di_container, chat_id, username, fullname, classified_article_ids, dialog_started_at=dialog_started_at)
 
-        await dialog_manager.start(
-            CashbackArticleStates.check_order,
-            mode=StartMode.RESET_STACK,
-            show_mode=ShowMode.SEND
-        )
-    else:
-        await add_predialog_chat_history(redis, business_connection_id, chat_id, combined_text, response_text)
+        await save_predialog_chat_history(di_container, chat_id, cashback_table.cabinet_id, predialog_history)
 
-        await bot.send_message(
-            chat_id=chat_id,
-            text=response_text,
-            business_connection_id=business_connection_id,
-            parse_mode=ParseMode.MARKDOWN,
-        )
+    reply = bot.send_message(
+        chat_id=chat_id,
+        text=response_text,
+        business_connection_id=business_connection_id,
+        parse_mode=ParseMode.MARKDOWN,
+    )
+    if not classified_article_ids:
+        outbound.post_at(send_at, reply)
+        return
+
+    start_dialog = dialog_manager.start(
+        CashbackArticleStates.check_order, mode=StartMode.RESET_STACK, show_mode=ShowMode.SEND
+    )
+    outbound.post_at(send_at, send_in_order(reply, start_dialog))
+
+
+async def _create_buyers(
+    di_container: AsyncContainer,
+    telegram_id: int,
+    username: str | None,
+    fullname: str,
+    article_ids: list[int],
+    *,
+    dialog_started_at: datetime | None,
+) -> None:
+    async with di_container() as r_container:
+        create_buyer = await r_container.get(CreateBuyer)
+        for article_id in article_ids:
+            await create_buyer.execute(telegram_id, username, fullname, article_id, dialog_started_at)
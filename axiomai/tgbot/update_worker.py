@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import math
+import os
+import socket
+import uuid
+from contextlib import suppress
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from redis.exceptions import RedisError
+
+from axiomai.constants import TELEGRAM_UPDATES_REBALANCE_INTERVAL
+from axiomai.infrastructure.telegram_updates import TelegramUpdateQueue
+
+logger = logging.getLogger(__name__)
+
+_RETRY_DELAY = 1
+_SHUTDOWN_TIMEOUT = 10
+
+
+class UpdateWorker:
+    """
+    Воркер бота в режиме вебхука: читает апдейты из TelegramUpdateQueue и передаёт их в Dispatcher.
+
+    Партиции делятся поровну между живыми воркерами: каждый берёт в аренду свою долю свободных партиций,
+    продлевает аренду каждые TELEGRAM_UPDATES_REBALANCE_INTERVAL секунд и отпускает лишние, когда
+    появляются новые воркеры. Апдейты одной партиции обрабатываются строго по очереди, разные партиции —
+    параллельно, поэтому пропускная способность растёт с числом воркеров и партиций.
+    """
+
+    def __init__(self, queue: TelegramUpdateQueue, dispatcher: Dispatcher, bot: Bot, **workflow_data: Any) -> None:
+        self._queue = queue
+        self._dispatcher = dispatcher
+        self._bot = bot
+        self._workflow_data = workflow_data
+        self._worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._consumers: dict[int, tuple[asyncio.Task, asyncio.Event]] = {}
+        # Включая партиции, которые уже отпущены, но ещё дообрабатывают текущий апдейт
+        self._tasks: set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        await self._queue.ensure_groups()
+        await self._dispatcher.emit_startup(bot=self._bot, bots=[self._bot], **self._workflow_data)
+        logger.info("update worker %s started", self._worker_id)
+        try:
+            while True:
+                try:
+                    await self.rebalance()
+                except RedisError as e:
+                    logger.warning("failed to rebalance telegram update partitions: %s", e)
+
+                await asyncio.sleep(TELEGRAM_UPDATES_REBALANCE_INTERVAL)
+        finally:
+            await self._stop_consumers()
+            with suppress(RedisError):
+                await self._queue.leave(self._worker_id)
+            await self._dispatcher.emit_shutdown(bot=self._bot, bots=[self._bot], **self._workflow_data)
+
+    async def rebalance(self) -> None:
+        """Продлевает аренду своих партиций, отпускает лишние и берёт свободные до своей доли."""
+        workers = await self._queue.heartbeat(self._worker_id)
+        share = math.ceil(self._queue.partitions / max(workers, 1))
+
+        for partition, (task, stop) in list(self._consumers.items()):
+            if task.done() or not await self._queue.renew(partition, self._worker_id):
+                logger.warning("lost telegram update partition %s", partition)
+                stop.set()
+                del self._consumers[partition]
+
+        for partition in sorted(self._consumers)[share:]:
+            # Партиция освободится, когда воркер дообработает текущий апдейт
+            _, stop = self._consumers.pop(partition)
+            stop.set()
+
+        for partition in range(self._queue.partitions):
+            if len(self._consumers) >= share:
+                break
+            if partition in self._consumers or not await self._queue.acquire(partition, self._worker_id):
+                continue
+
+            stop = asyncio.Event()
+            task = asyncio.create_task(self._consume(partition, stop))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self._consumers[partition] = (task, stop)
+
+        logger.debug("update worker %s owns partitions %s", self._worker_id, sorted(self._consumers))
+
+    async def _stop_consumers(self) -> None:
+        """Даёт партициям дообработать текущий апдейт, чтобы он не достался следующему владельцу повторно."""
+        for _, stop in self._consumers.values():
+            stop.set()
+        self._consumers.clear()
+
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=_SHUTDOWN_TIMEOUT)
+            for task in pending:
+                task.cancel()
+
+    async def _consume(self, partition: int, stop: asyncio.Event) -> None:
+        pending = True
+        try:
+            while not stop.is_set():
+                try:
+                    updates = await self._queue.read(partition, pending=pending)
+                    if pending and not updates:
+                        pending = False
+
+                    for entry_id, data in updates:
+                        if stop.is_set():
+                            # Неподтверждённые апдейты дочитает следующий владелец партиции
+                            break
+                        await self._feed_update(data)
+                        await self._queue.ack(partition, entry_id)
+                except RedisError as e:
+                    logger.warning("failed to read telegram update partition %s: %s", partition, e)
+                    # Без подтверждения апдейт остался в pending, перечитываем с него
+                    pending = True
+                    await asyncio.sleep(_RETRY_DELAY)
+        finally:
+            with suppress(RedisError):
+                await self._queue.release(partition, self._worker_id)
+
+    async def _feed_update(self, data: dict[str, Any]) -> None:
+        try:
+            update = Update.model_validate(data, context={"bot": self._bot})
+            await self._dispatcher.feed_update(self._bot, update, **self._workflow_data)
+        except Exception as e:
+            # Апдейт всё равно подтверждается, иначе он будет бесконечно блокировать партицию
+            logger.exception("failed to process telegram update %s", data.get("update_id"), exc_info=e)
@@ -0,0 +1,75 @@
+import asyncio
+import hmac
+import logging
+
+from aiohttp import web
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from axiomai.config import load_config
+from axiomai.infrastructure.logging import setup_logging
+from axiomai.infrastructure.telegram_updates import TelegramUpdateQueue
+
+logger = logging.getLogger(__name__)
+
+_SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+update_queue_key = web.AppKey("update_queue", TelegramUpdateQueue)
+webhook_secret_key = web.AppKey("webhook_secret", str)
+
+
+async def handle_update(request: web.Request) -> web.Response:
+    """Принимает апдейт от Telegram и кладёт его в очередь. Обработка — в воркерах бота."""
+    secret = request.app[webhook_secret_key]
+    if secret and not hmac.compare_digest(request.headers.get(_SECRET_HEADER, ""), secret):
+        return web.Response(status=401)
+
+    try:
+        update = await request.json()
+    except ValueError:
+        return web.Response(status=400)
+    if not isinstance(update, dict):
+        return web.Response(status=400)
+
+    try:
+        await request.app[update_queue_key].publish(update)
+    except RedisError as e:
+        # Telegram повторит доставку апдейта, если ответить ошибкой
+        logger.warning("failed to enqueue telegram update %s: %s", update.get("update_id"), e)
+        return web.Response(status=503)
+
+    return web.Response()
+
+
+def create_app(update_queue: TelegramUpdateQueue, webhook_secret: str | None, path: str) -> web.Application:
+    app = web.Application()
+    app[update_queue_key] = update_queue
+    app[webhook_secret_key] = webhook_secret or ""
+    app.router.add_post(path, handle_update)
+    return app
+
+
+async def main() -> None:
+    config = load_config()
+    setup_logging(json_logs=config.json_logs)
+
+    redis = Redis.from_url(config.redis_uri)
+    update_queue = TelegramUpdateQueue(redis, config.webhook.update_partitions)
+    app = create_app(update_queue, config.webhook.webhook_secret, config.webhook.webhook_path)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "0.0.0.0", config.webhook.webhook_port).start()
+    logger.info("webhook receiver listening on port %s", config.webhook.webhook_port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("webhook receiver stopped")
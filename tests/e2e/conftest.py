@@ -2,7 +2,7 @@ import asyncio
 import secrets
 import uuid
 from collections.abc import AsyncIterable
-from datetime import datetime
+from datetime import datetime, timedelta
 from random import randint
 from unittest.mock import AsyncMock, MagicMock
 
@@ -19,14 +19,16 @@ from testcontainers.postgres import PostgresContainer
 from alembic.config import Config as AlembicConfig
 
 from axiomai.config import Config
-from axiomai.infrastructure.database.models import Cabinet, CashbackTable, Buyer
+from axiomai.constants import INACTIVE_REMINDER_DELAY
+from axiomai.infrastructure.database.models import Cabinet, CashbackTable, Buyer, ChatMessage
 from axiomai.infrastructure.database.models.cashback_table import CashbackTableStatus, CashbackArticle
 from axiomai.infrastructure.database.models.user import User
 from axiomai.infrastructure.google_sheets import GoogleSheetsGateway
 from axiomai.infrastructure.message_debouncer import MessageDebouncer
 from axiomai.infrastructure.openai import OpenAIGateway
+from axiomai.infrastructure.photo_fetcher import PhotoFetcher
 from axiomai.infrastructure.superbanking import Superbanking
-from tests.e2e.mocks import MocksProvider, FakeMessageDebouncer
+from tests.e2e.mocks import MocksProvider, FakeMessageDebouncer, FakePhotoFetcher
 
 
 class FakeRedis:
@@ -49,6 +51,12 @@ class FakeRedis:
     async def delete(self, key: str) -> None:
         self._data.pop(key, None)
 
+    async def publish(self, channel: str, message: str | int) -> int:
+        return 0
+
+    async def xadd(self, name: str, fields: dict, **kwargs) -> bytes:
+        return b"0-0"
+
 
 @pytest.fixture(scope="session")
 def postgres_uri():
@@ -91,7 +99,7 @@ async def session(engine) -> AsyncIterable[AsyncSession]:
 @pytest.fixture
 async def di_container(session):
     google_sheets_mock = AsyncMock()
-    google_sheets_mock.sync_buyers_to_sheet = AsyncMock()
+    google_sheets_mock.write_cashback_table = AsyncMock()
     config = MagicMock()
     config.delay_between_bot_messages = 0
 
@@ -104,6 +112,7 @@ async def di_container(session):
             OpenAIGateway: AsyncMock(),
             Config: config,
             MessageDebouncer: FakeMessageDebouncer(),
+            PhotoFetcher: FakePhotoFetcher(),
             Redis: FakeRedis(),
             BaseStorage: JsonMemoryStorage(),
             Superbanking: MagicMock(),
@@ -232,13 +241,22 @@ def buyer_factory(session, cabinet_factory):
             phone_number=phone_number,
             bank=bank,
             amount=amount,
-            chat_history=chat_history if chat_history is not None else [{"role": "user", "text": "hi"}],
         )
         session.add(buyer)
+        for entry in chat_history if chat_history is not None else [{"user": "hi", "assistant": "hello"}]:
+            session.add(
+                ChatMessage(
+                    cabinet_id=cabinet_id,
+                    telegram_id=buyer.telegram_id,
+                    user_message=entry["user"],
+                    assistant_message=entry["assistant"],
+                )
+            )
         await session.flush()
 
         if updated_at:
             buyer.updated_at = updated_at
+            buyer.next_reminder_at = updated_at + timedelta(seconds=INACTIVE_REMINDER_DELAY)
             await session.flush()
 
         return buyer
@@ -1,4 +1,4 @@
-from typing import Callable, Awaitable
+from typing import Any, Callable, Awaitable
 
 from dishka import Scope, provide, provide_all
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,10 +14,13 @@ from axiomai.application.interactors.create_user import CreateSeller
 from axiomai.application.interactors.observe_balance_notifications import ObserveBalanceNotifications
 from axiomai.application.interactors.observe_cashback_tables import ObserveCashbackTables
 from axiomai.application.interactors.observe_inactive_reminders import ObserveInactiveReminders
+from axiomai.application.interactors.process_superbanking_payout import ProcessSuperbankingPayout
 from axiomai.application.interactors.sync_cashback_tables import SyncCashbackTables
+from axiomai.infrastructure.business_connection_cache import BusinessConnectionCache
 from axiomai.infrastructure.database.transaction_manager import TransactionManager
 from axiomai.infrastructure.di import GatewaysProvider
 from axiomai.infrastructure.message_debouncer import MessageData, TaskStrategy
+from axiomai.infrastructure.photo_fetcher import Photo
 
 
 class FakeTransactionManager(TransactionManager):
@@ -37,17 +40,32 @@ class FakeMessageDebouncer:
         business_connection_id: str,
         chat_id: int,
         message_data: MessageData,
-        process_callback: Callable[[str, int, list[MessageData]], Awaitable[None]],
+        process_callback: Callable[..., Awaitable[None]],
         strategy: TaskStrategy = TaskStrategy.ACCUMULATE,
+        handler: str | None = None,
+        meta: dict[str, Any] | None = None,
+        prefetch: Callable[[], Awaitable[Any]] | None = None,
     ) -> bool:
-        await process_callback(business_connection_id, chat_id, [message_data])
+        if prefetch:
+            await process_callback(business_connection_id, chat_id, [message_data], await prefetch())
+        else:
+            await process_callback(business_connection_id, chat_id, [message_data])
         return True
 
 
+class FakePhotoFetcher:
+    def prefetch(self, file_id: str, file_unique_id: str) -> None:
+        pass
+
+    async def fetch(self, file_id: str, file_unique_id: str) -> Photo:
+        return Photo(content=b"fake photo")
+
+
 class MocksProvider(GatewaysProvider):
     scope = Scope.APP
 
     transaction_manager = provide(FakeTransactionManager, provides=TransactionManager)
+    business_connection_cache = provide(BusinessConnectionCache)
 
     interactors = provide_all(
         CreateSeller,
@@ -62,4 +80,5 @@ class MocksProvider(GatewaysProvider):
         CreateBuyer,
         CancelBuyer,
         CreateSuperbankingPayment,
+        ProcessSuperbankingPayout,
     )
@@ -0,0 +1,171 @@
+import datetime
+import json
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from axiomai.infrastructure.database.gateways.buyer import BuyerGateway
+from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
+from axiomai.infrastructure.database.gateways.chat_message import ChatMessageGateway
+
+BUYERS_COUNT = 50_000
+ARTICLES_COUNT = 5_000
+CHAT_MESSAGES_COUNT = 100_000
+
+
+@pytest.fixture
+async def seeded_cabinet_id(session: AsyncSession, cabinet_factory) -> int:
+    cabinet = await cabinet_factory()
+    other_cabinet = await cabinet_factory()
+
+    # Большая часть заявок — в другом кабинете и уже завершена, как на проде
+    await session.execute(
+        text(
+            """
+            INSERT INTO buyers (
+                cabinet_id, username, fullname, telegram_id, nm_id, is_ordered, is_left_feedback, is_cut_labels,
+                is_superbanking_paid, is_paid_manually, is_canceled
+            )
+            SELECT
+                CASE WHEN i % 100 = 0 THEN :cabinet_id ELSE :other_cabinet_id END,
+                'user' || i, 'User ' || i, i % 20000, i % 1000, true, true, true,
+                i % 3 = 0, i % 3 = 1, false
+            FROM generate_series(1, :count) AS i
+            """
+        ),
+        {"cabinet_id": cabinet.id, "other_cabinet_id": other_cabinet.id, "count": BUYERS_COUNT},
+    )
+    await session.execute(
+        text(
+            """
+            INSERT INTO articles (cabinet_id, nm_id, title, image_url, brand_name, instruction_text, in_stock, is_deleted)
+            SELECT
+                CASE WHEN i % 100 = 0 THEN :cabinet_id ELSE :other_cabinet_id END,
+                i, 'Article ' || i, '', '', '', true, false
+            FROM generate_series(1, :count) AS i
+            """
+        ),
+        {"cabinet_id": cabinet.id, "other_cabinet_id": other_cabinet.id, "count": ARTICLES_COUNT},
+    )
+    await session.execute(
+        text(
+            """
+            INSERT INTO chat_messages (cabinet_id, telegram_id, user_message, assistant_message)
+            SELECT
+                CASE WHEN i % 100 = 0 THEN :cabinet_id ELSE :other_cabinet_id END,
+                i % 20000, 'message ' || i, 'answer ' || i
+            FROM generate_series(1, :count) AS i
+            """
+        ),
+        {"cabinet_id": cabinet.id, "other_cabinet_id": other_cabinet.id, "count": CHAT_MESSAGES_COUNT},
+    )
+    await session.execute(text("ANALYZE buyers"))
+    await session.execute(text("ANALYZE articles"))
+    await session.execute(text("ANALYZE chat_messages"))
+
+    return cabinet.id
+
+
+async def _explain(session: AsyncSession, query: Callable[[], Awaitable[Any]]) -> list[dict]:
+    """Выполняет запрос гейтвея и возвращает планы всех SQL-запросов, которые он отправил."""
+    statements: list[tuple[str, Any]] = []
+    sync_engine = session.bind.sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:  # noqa: PLR0917
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        await query()
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+
+    connection = await session.connection()
+    plans = []
+    for statement, parameters in statements:
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar_one()
+        plans.append(plan[0]["Plan"] if isinstance(plan, list) else json.loads(plan)[0]["Plan"])
+
+    return plans
+
+
+def _seq_scanned_tables(plan: dict) -> set[str]:
+    tables = set()
+    if plan.get("Node Type") == "Seq Scan":
+        tables.add(plan["Relation Name"])
+    for subplan in plan.get("Plans", []):
+        tables |= _seq_scanned_tables(subplan)
+    return tables
+
+
+async def _assert_no_seq_scan(session: AsyncSession, query: Callable[[], Awaitable[Any]]) -> None:
+    plans = await _explain(session, query)
+
+    assert plans
+    for plan in plans:
+        assert not _seq_scanned_tables(plan) & {"buyers", "articles", "chat_messages"}, plan
+
+
+async def test_active_buyers_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    buyer_gateway = BuyerGateway(session)
+
+    await _assert_no_seq_scan(
+        session, lambda: buyer_gateway.get_active_buyers_by_telegram_id_and_cabinet_id(100, seeded_cabinet_id)
+    )
+
+
+async def test_incompleted_buyers_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    buyer_gateway = BuyerGateway(session)
+
+    await _assert_no_seq_scan(
+        session, lambda: buyer_gateway.get_incompleted_buyers_by_telegram_id_and_cabinet_id(100, seeded_cabinet_id)
+    )
+
+
+async def test_buyer_by_telegram_id_and_nm_id_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    buyer_gateway = BuyerGateway(session)
+
+    await _assert_no_seq_scan(session, lambda: buyer_gateway.get_buyer_by_telegram_id_and_nm_id(100, 100))
+
+
+async def test_buyers_by_cabinet_id_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    buyer_gateway = BuyerGateway(session)
+
+    await _assert_no_seq_scan(session, lambda: buyer_gateway.get_buyers_by_cabinet_id(seeded_cabinet_id))
+
+
+async def test_due_reminders_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    buyer_gateway = BuyerGateway(session)
+
+    async def query() -> None:
+        async for _ in buyer_gateway.iter_buyers_with_due_reminder(datetime.datetime.now(datetime.UTC), page_size=100):
+            pass
+
+    await _assert_no_seq_scan(session, query)
+
+
+async def test_in_stock_articles_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    cashback_table_gateway = CashbackTableGateway(session)
+
+    await _assert_no_seq_scan(
+        session, lambda: cashback_table_gateway.get_in_stock_cashback_articles_by_cabinet_id(seeded_cabinet_id, 100)
+    )
+
+
+async def test_last_chat_messages_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    chat_message_gateway = ChatMessageGateway(session)
+
+    await _assert_no_seq_scan(
+        session, lambda: chat_message_gateway.get_last_chat_messages(seeded_cabinet_id, 100, limit=10)
+    )
+
+
+async def test_chat_summaries_query_uses_index(session: AsyncSession, seeded_cabinet_id: int) -> None:
+    chat_message_gateway = ChatMessageGateway(session)
+
+    await _assert_no_seq_scan(session, lambda: chat_message_gateway.get_chat_summaries_by_cabinet_id(seeded_cabinet_id))
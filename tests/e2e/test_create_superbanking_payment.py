@@ -1,14 +1,18 @@
-from unittest.mock import MagicMock, AsyncMock
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, AsyncMock, Mock
 
 import pytest
+from aiogram import Bot
 from sqlalchemy import select
 
 from axiomai.application.exceptions.payment import NotEnoughBalanceError
-from axiomai.application.exceptions.superbanking import CreatePaymentError
+from axiomai.application.exceptions.superbanking import CreatePaymentError, SignPaymentError
 from axiomai.application.interactors.create_superbanking_payment import CreateSuperbankingPayment
-from axiomai.constants import AXIOMAI_COMMISSION, SUPERBANKING_COMMISSION
-from axiomai.infrastructure.database.models import Buyer, Cabinet
-from axiomai.infrastructure.database.models.superbanking import SuperbankingPayout
+from axiomai.application.interactors.process_superbanking_payout import ProcessSuperbankingPayout
+from axiomai.constants import AXIOMAI_COMMISSION, SUPERBANKING_COMMISSION, SUPERBANKING_PAYOUT_MAX_ATTEMPTS
+from axiomai.infrastructure.database.models import BalanceEntry, Buyer, Cabinet
+from axiomai.infrastructure.database.models.balance_entry import BalanceEntryReason
+from axiomai.infrastructure.database.models.superbanking import SuperbankingPayout, SuperbankingPayoutStatus
 from axiomai.infrastructure.superbanking import Superbanking
 
 
@@ -17,6 +21,15 @@ async def create_superbanking_payment(di_container) -> CreateSuperbankingPayment
     return await di_container.get(CreateSuperbankingPayment)
 
 
+@pytest.fixture
+async def process_superbanking_payout(di_container) -> ProcessSuperbankingPayout:
+    return await di_container.get(ProcessSuperbankingPayout)
+
+
+async def _get_payout(session, order_number: str) -> SuperbankingPayout:
+    return await session.scalar(select(SuperbankingPayout).where(SuperbankingPayout.order_number == order_number))
+
+
 async def _create_buyer(
     session,
     cabinet_factory,
@@ -60,11 +73,71 @@ async def test_create_superbanking_payment_creates_payout(
         amount=200,
     )
 
-    payout = await session.scalar(select(SuperbankingPayout).where(SuperbankingPayout.order_number == order_number))
+    payout = await _get_payout(session, order_number)
     assert payout is not None
-    assert payout.order_number == order_number
+    assert payout.status == SuperbankingPayoutStatus.CREATED
+    assert payout.charge == buyer.amount + SUPERBANKING_COMMISSION + AXIOMAI_COMMISSION
+    # Деньги зарезервированы сразу, перевод проводит воркер
+    assert cabinet.balance == 1000 - payout.charge
+    assert buyer.is_superbanking_paid is False
+    superbanking.create_payment.assert_not_called()
+
+
+async def test_create_superbanking_payment_is_idempotent(
+    create_superbanking_payment, di_container, session, cabinet_factory
+):
+    buyer, cabinet = await _create_buyer(session, cabinet_factory, amount=200, cabinet_balance=1000)
+
+    order_numbers = [
+        await create_superbanking_payment.execute(
+            telegram_id=buyer.telegram_id,
+            cabinet_id=buyer.cabinet_id,
+            phone_number="+7 910 111 22 33",
+            bank="Тинькофф",
+            amount=200,
+        )
+        for _ in range(2)
+    ]
+
+    assert order_numbers[0] == order_numbers[1]
+    assert cabinet.balance == 1000 - (200 + SUPERBANKING_COMMISSION + AXIOMAI_COMMISSION)
+
+
+async def test_process_superbanking_payout_sends_receipt(
+    create_superbanking_payment, process_superbanking_payout, di_container, session, cabinet_factory
+):
+    buyer, cabinet = await _create_buyer(session, cabinet_factory, amount=200, cabinet_balance=1000)
+    superbanking = await di_container.get(Superbanking)
+    superbanking.create_payment = AsyncMock(return_value="tx-1")
+    superbanking.sign_payment = AsyncMock(return_value=True)
+    superbanking.confirm_operation = AsyncMock(return_value="https://example.com/receipt.pdf")
+    bot = await di_container.get(Bot)
+
+    order_number = await create_superbanking_payment.execute(
+        telegram_id=buyer.telegram_id,
+        cabinet_id=buyer.cabinet_id,
+        phone_number="+7 910 111 22 33",
+        bank="Тинькофф",
+        amount=200,
+    )
+    payout = await _get_payout(session, order_number)
+
+    await process_superbanking_payout.execute(payout.id)
+
+    assert payout.status == SuperbankingPayoutStatus.SIGNED
+    assert payout.cabinet_transaction_id == "tx-1"
+    assert payout.next_attempt_at > datetime.now(UTC)
     assert buyer.is_superbanking_paid is True
-    assert cabinet.balance == 1000 - (buyer.amount + SUPERBANKING_COMMISSION + AXIOMAI_COMMISSION)
+    superbanking.confirm_operation.assert_not_called()
+
+    await process_superbanking_payout.execute(payout.id)
+
+    assert payout.status == SuperbankingPayoutStatus.RECEIPT_SENT
+    assert payout.receipt_url == "https://example.com/receipt.pdf"
+    superbanking.create_payment.assert_awaited_once()
+    bot.send_document.assert_awaited_once()
+    assert bot.send_document.await_args.kwargs["chat_id"] == buyer.telegram_id
+    assert cabinet.balance == 1000 - payout.charge
 
 
 async def test_create_superbanking_payment_missing_bank_raises(
@@ -72,8 +145,8 @@ async def test_create_superbanking_payment_missing_bank_raises(
 ):
     buyer, cabinet = await _create_buyer(session, cabinet_factory, amount=200, cabinet_balance=1000)
     superbanking = await di_container.get(Superbanking)
-    superbanking.create_payment = AsyncMock(side_effect=CreatePaymentError("Unknown bank"))
-    superbanking.sign_payment = AsyncMock(return_value=True)
+    superbanking.is_known_bank = Mock(return_value=False)
+    superbanking.create_payment = AsyncMock()
 
     with pytest.raises(CreatePaymentError):
         await create_superbanking_payment.execute(
@@ -84,12 +157,13 @@ async def test_create_superbanking_payment_missing_bank_raises(
             amount=200,
         )
 
+    superbanking.create_payment.assert_not_called()
     assert buyer.is_superbanking_paid is False
     assert cabinet.balance == 1000
 
 
 async def test_create_superbanking_payment_distributes_amount_to_buyers_without_amount(
-    create_superbanking_payment, di_container, session, cabinet_factory
+    create_superbanking_payment, process_superbanking_payout, di_container, session, cabinet_factory
 ):
     cabinet = await cabinet_factory(balance=1000, is_superbanking_connect=True)
     buyer1 = Buyer(
@@ -115,13 +189,15 @@ async def test_create_superbanking_payment_distributes_amount_to_buyers_without_
     superbanking.create_payment = AsyncMock(return_value="tx-1")
     superbanking.sign_payment = AsyncMock(return_value=True)
 
-    await create_superbanking_payment.execute(
+    order_number = await create_superbanking_payment.execute(
         telegram_id=123456,
         cabinet_id=cabinet.id,
         phone_number="+7 910 111 22 33",
         bank="Тинькофф",
         amount=400,
     )
+    payout = await _get_payout(session, order_number)
+    await process_superbanking_payout.execute(payout.id)
 
     assert buyer1.amount == 200
     assert buyer2.amount == 200
@@ -253,3 +329,73 @@ async def test_create_superbanking_payment_succeeds_with_exact_balance(
     )
 
     assert cabinet.balance == 0
+
+
+async def test_process_superbanking_payout_retries_with_backoff(
+    create_superbanking_payment, process_superbanking_payout, di_container, session, cabinet_factory
+):
+    buyer, cabinet = await _create_buyer(session, cabinet_factory, amount=200, cabinet_balance=1000)
+    superbanking = await di_container.get(Superbanking)
+    superbanking.create_payment = AsyncMock(return_value="tx-1")
+    superbanking.sign_payment = AsyncMock(side_effect=[SignPaymentError(), True])
+
+    order_number = await create_superbanking_payment.execute(
+        telegram_id=buyer.telegram_id,
+        cabinet_id=buyer.cabinet_id,
+        phone_number="+7 910 111 22 33",
+        bank="Тинькофф",
+        amount=200,
+    )
+    payout = await _get_payout(session, order_number)
+
+    await process_superbanking_payout.execute(payout.id)
+
+    assert payout.status == SuperbankingPayoutStatus.CREATED
+    assert payout.attempts == 1
+    assert payout.next_attempt_at > datetime.now(UTC)
+    assert payout.last_error.startswith("SignPaymentError")
+
+    await process_superbanking_payout.execute(payout.id)
+
+    # Перевод уже создан, повторяется только подписание
+    superbanking.create_payment.assert_awaited_once()
+    assert payout.status == SuperbankingPayoutStatus.SIGNED
+    assert payout.attempts == 0
+    assert buyer.is_superbanking_paid is True
+
+
+async def test_process_superbanking_payout_refunds_reserved_balance_on_failure(
+    create_superbanking_payment, process_superbanking_payout, di_container, session, cabinet_factory
+):
+    buyer, cabinet = await _create_buyer(session, cabinet_factory, amount=200, cabinet_balance=1000)
+    superbanking = await di_container.get(Superbanking)
+    superbanking.create_payment = AsyncMock(side_effect=CreatePaymentError("Unknown bank"))
+    bot = await di_container.get(Bot)
+
+    order_number = await create_superbanking_payment.execute(
+        telegram_id=buyer.telegram_id,
+        cabinet_id=buyer.cabinet_id,
+        phone_number="+7 910 111 22 33",
+        bank="Тинькофф",
+        amount=200,
+    )
+    payout = await _get_payout(session, order_number)
+    for _ in range(SUPERBANKING_PAYOUT_MAX_ATTEMPTS):
+        await process_superbanking_payout.execute(payout.id)
+
+    assert payout.status == SuperbankingPayoutStatus.FAILED
+    assert buyer.is_superbanking_paid is False
+    sent_texts = [call.kwargs["text"] for call in bot.send_message.await_args_list]
+    assert "Не удалось отправить выплату. Мы свяжемся с вами." in sent_texts
+
+    total_charge = 200 + SUPERBANKING_COMMISSION + AXIOMAI_COMMISSION
+    entries = list(
+        await session.scalars(
+            select(BalanceEntry).where(BalanceEntry.cabinet_id == cabinet.id).order_by(BalanceEntry.id)
+        )
+    )
+    assert [(entry.reason, entry.balance_delta, entry.balance_after) for entry in entries] == [
+        (BalanceEntryReason.PAYOUT_DEBIT, -total_charge, 1000 - total_charge),
+        (BalanceEntryReason.PAYOUT_REFUND, total_charge, 1000),
+    ]
+    assert cabinet.balance == 1000
@@ -6,7 +6,7 @@ from aiogram_dialog.test_tools.keyboard import InlineButtonTextLocator
 from sqlalchemy import select
 
 from axiomai.constants import AXIOMAI_COMMISSION, SUPERBANKING_COMMISSION
-from axiomai.infrastructure.database.models import Buyer
+from axiomai.infrastructure.database.models import Buyer, ChatMessage
 from axiomai.infrastructure.database.models.cashback_table import CashbackTableStatus
 from axiomai.infrastructure.openai import OpenAIGateway
 from axiomai.infrastructure.superbanking import Superbanking
@@ -14,6 +14,15 @@ from tests.e2e.conftest import cashback_table_factory, cashback_article_factory
 from tests.e2e.test_dialogs.conftest import FakeBotClient, FakeBot
 
 
+async def _chat_history(session, buyer: Buyer) -> list[ChatMessage]:
+    result = await session.scalars(
+        select(ChatMessage)
+        .where(ChatMessage.cabinet_id == buyer.cabinet_id, ChatMessage.telegram_id == buyer.telegram_id)
+        .order_by(ChatMessage.created_at, ChatMessage.id)
+    )
+    return list(result)
+
+
 async def test_exact_ok_word_silently_ignores_message(
     cabinet_factory,
     cashback_table_factory,
@@ -223,9 +232,10 @@ async def test_cashback_article_q1_input_order_screenshot(
     assert "Скриншот заказа" in last_message.text and "принят" in last_message.text
     assert buyer.is_ordered is True
     assert cabinet.leads_balance == 999
-    assert len(buyer.chat_history) == 2
-    assert buyer.chat_history[1]["user"] == "[Скрин заказа]"
-    assert '"is_order": true' in buyer.chat_history[1]["assistant"]
+    chat_history = await _chat_history(session, buyer)
+    assert len(chat_history) == 2
+    assert chat_history[1].user_message == "[Скрин заказа]"
+    assert '"is_order": true' in chat_history[1].assistant_message
 
 
 async def test_cashback_article_q2_input_feedback_screenshot(
@@ -267,9 +277,10 @@ async def test_cashback_article_q2_input_feedback_screenshot(
     last_message = fake_bot.sent_messages[-1]
     assert "Скриншот отзыва" in last_message.text and "принят" in last_message.text
     assert buyer.is_left_feedback is True
-    assert len(buyer.chat_history) == 3
-    assert buyer.chat_history[2]["user"] == "[Скрин отзыва]"
-    assert '"is_feedback": true' in buyer.chat_history[2]["assistant"]
+    chat_history = await _chat_history(session, buyer)
+    assert len(chat_history) == 3
+    assert chat_history[2].user_message == "[Скрин отзыва]"
+    assert '"is_feedback": true' in chat_history[2].assistant_message
 
 
 async def test_cashback_article_q3_input_cut_labels_screenshot(
@@ -316,9 +327,10 @@ async def test_cashback_article_q3_input_cut_labels_screenshot(
     last_message = fake_bot.sent_messages[-1]
     assert last_message.text == "☺ Вы прислали все фотографии, которые были нам нужны. Спасибо!"
     assert buyer.is_cut_labels is True
-    assert len(buyer.chat_history) == 4
-    assert buyer.chat_history[3]["user"] == "[Скрин этикеток]"
-    assert '"is_cut_labels": true' in buyer.chat_history[3]["assistant"]
+    chat_history = await _chat_history(session, buyer)
+    assert len(chat_history) == 4
+    assert chat_history[3].user_message == "[Скрин этикеток]"
+    assert '"is_cut_labels": true' in chat_history[3].assistant_message
 
 
 async def test_cashback_article_q4_input_requisites(
@@ -373,11 +385,12 @@ async def test_cashback_article_q4_input_requisites(
     assert buyer.phone_number == "89275554444"
     assert buyer.bank == "Сбербанк"
     assert buyer.amount == 1500
-    assert len(buyer.chat_history) == 6
-    assert buyer.chat_history[4]["user"] == "89275554444 сбер"
-    assert buyer.chat_history[4]["assistant"] == "null"
-    assert buyer.chat_history[5]["user"] == "127 руб"
-    assert buyer.chat_history[5]["assistant"] == "null"
+    chat_history = await _chat_history(session, buyer)
+    assert len(chat_history) == 6
+    assert chat_history[4].user_message == "89275554444 сбер"
+    assert chat_history[4].assistant_message == "null"
+    assert chat_history[5].user_message == "127 руб"
+    assert chat_history[5].assistant_message == "null"
 
 
 async def test_cashback_article_switch_to_second_article_during_dialog(
@@ -711,9 +724,10 @@ async def test_chat_history_saved_on_order_screenshot_error(
 
     buyer = await session.scalar(select(Buyer).where(Buyer.telegram_id == bot_client.user.id))
     assert buyer.is_ordered is False
-    assert len(buyer.chat_history) == 2
-    assert buyer.chat_history[1]["user"] == "[Скрин заказа]"
-    assert buyer.chat_history[1]["assistant"] == '"classify order screenshot error"'
+    chat_history = await _chat_history(session, buyer)
+    assert len(chat_history) == 2
+    assert chat_history[1].user_message == "[Скрин заказа]"
+    assert chat_history[1].assistant_message == '"classify order screenshot error"'
 
 
 async def test_chat_history_saved_on_feedback_screenshot_error(
@@ -750,9 +764,10 @@ async def test_chat_history_saved_on_feedback_screenshot_error(
     buyer = await session.scalar(select(Buyer).where(Buyer.telegram_id == bot_client.user.id))
     assert buyer.is_ordered is True
     assert buyer.is_left_feedback is False
-    assert len(buyer.chat_history) == 3
-    assert buyer.chat_history[2]["user"] == "[Скрин отзыва]"
-    assert buyer.chat_history[2]["assistant"] == '"classify feedback screenshot error"'
+    chat_history = await _chat_history(session, buyer)
+    assert len(chat_history) == 3
+    assert chat_history[2].user_message == "[Скрин отзыва]"
+    assert chat_history[2].assistant_message == '"classify feedback screenshot error"'
 
 
 async def test_chat_history_saved_on_cut_labels_screenshot_error(
@@ -794,9 +809,10 @@ async def test_chat_history_saved_on_cut_labels_screenshot_error(
 
     buyer = await session.scalar(select(Buyer).where(Buyer.telegram_id == bot_client.user.id))
     assert buyer.is_cut_labels is False
-    assert len(buyer.chat_history) == 4
-    assert buyer.chat_history[3]["user"] == "[Скрин этикеток]"
-    assert buyer.chat_history[3]["assistant"] == '"classify cut labels photo error"'
+    chat_history = await _chat_history(session, buyer)
+    assert len(chat_history) == 4
+    assert chat_history[3].user_message == "[Скрин этикеток]"
+    assert chat_history[3].assistant_message == '"classify cut labels photo error"'
 
 
 async def test_multiple_articles_selected_from_predialog(
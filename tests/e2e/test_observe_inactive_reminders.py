@@ -3,6 +3,7 @@ import datetime
 import pytest
 
 from axiomai.application.interactors.observe_inactive_reminders import ObserveInactiveReminders
+from axiomai.infrastructure.database.models import ChatMessage
 
 
 @pytest.fixture
@@ -148,6 +149,27 @@ async def test_no_reminder_for_buyer_without_dialog(observe_inactive_reminders,
     observe_inactive_reminders._bot.send_message.assert_not_awaited()
 
 
+async def test_no_reminder_for_buyer_with_only_previous_dialog(
+    observe_inactive_reminders, buyer_factory, session
+) -> None:
+    """Переписка по прошлым заявкам не считается диалогом новой заявки."""
+    buyer = await buyer_factory(chat_history=[], updated_at=_old_timestamp())
+    session.add(
+        ChatMessage(
+            cabinet_id=buyer.cabinet_id,
+            telegram_id=buyer.telegram_id,
+            user_message="hi",
+            assistant_message="hello",
+            created_at=datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=30),
+        )
+    )
+    await session.flush()
+
+    await observe_inactive_reminders.execute()
+
+    observe_inactive_reminders._bot.send_message.assert_not_awaited()
+
+
 async def test_updates_timestamp_after_reminder(observe_inactive_reminders, buyer_factory, session) -> None:
     """После отправки напоминания обновляется updated_at."""
     old_time = _old_timestamp()
@@ -168,3 +190,40 @@ async def test_no_duplicate_reminder_after_send(observe_inactive_reminders, buye
     await observe_inactive_reminders.execute()
 
     observe_inactive_reminders._bot.send_message.assert_not_awaited()
+
+
+async def test_sends_reminders_to_all_pages(observe_inactive_reminders, buyer_factory, session, monkeypatch) -> None:
+    """Напоминания отправляются всем неактивным покупателям, даже если они не помещаются в одну страницу."""
+    monkeypatch.setattr("axiomai.application.interactors.observe_inactive_reminders.INACTIVE_REMINDERS_PAGE_SIZE", 2)
+    old_time = _old_timestamp()
+    buyers = [await buyer_factory(updated_at=old_time) for _ in range(5)]
+
+    await observe_inactive_reminders.execute()
+
+    assert observe_inactive_reminders._bot.send_message.await_count == len(buyers)
+    for buyer in buyers:
+        await session.refresh(buyer)
+        assert buyer.updated_at > old_time
+
+
+async def test_reminder_is_postponed_by_buyer_activity(observe_inactive_reminders, buyer_factory, session) -> None:
+    """Изменение заявки откладывает напоминание."""
+    buyer = await buyer_factory(updated_at=_old_timestamp())
+    buyer.is_ordered = True
+    await session.flush()
+
+    await observe_inactive_reminders.execute()
+
+    observe_inactive_reminders._bot.send_message.assert_not_awaited()
+
+
+async def test_failed_reminder_is_retried_later(observe_inactive_reminders, buyer_factory, session) -> None:
+    """Неотправленное напоминание переносится на повтор, а не теряется."""
+    buyer = await buyer_factory(updated_at=_old_timestamp())
+    observe_inactive_reminders._bot.send_message.side_effect = RuntimeError("telegram is down")
+
+    await observe_inactive_reminders.execute()
+
+    await session.refresh(buyer)
+    assert buyer.next_reminder_at > datetime.datetime.now(datetime.UTC)
+    assert buyer.updated_at < datetime.datetime.now(datetime.UTC) - datetime.timedelta(hours=48)
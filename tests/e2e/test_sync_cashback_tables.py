@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from axiomai.application.dto import CashbackArticle as CashbackArticleDTO
 from axiomai.application.interactors.sync_cashback_tables import SyncCashbackTables
 from axiomai.infrastructure.database.models.cashback_table import CashbackTableStatus, CashbackArticle
+from axiomai.infrastructure.google_sheets import CashbackTableSheets
 
 
 @pytest.fixture
@@ -23,7 +24,9 @@ async def test_sync_cashback_tables_creates_articles(
         CashbackArticleDTO(nm_id=123, title="Product 1", brand_name="Brand A", instruction_text="Instruction 1", image_url="http://img1.jpg", in_stock=True),
         CashbackArticleDTO(nm_id=456, title="Product 2", brand_name="Brand B", instruction_text="Instruction 2", image_url="http://img2.jpg", in_stock=False),
     ]
-    sync_cashback_tables._google_sheets_gateway.get_cashback_articles = AsyncMock(return_value=articles_dto)
+    sync_cashback_tables._google_sheets_gateway.read_cashback_table = AsyncMock(
+        return_value=CashbackTableSheets(table_id=cashback_table.table_id, articles=articles_dto)
+    )
 
     await sync_cashback_tables.execute()
 
@@ -39,7 +42,9 @@ async def test_sync_cashback_tables_updates_last_synced_at(
     cashback_table = await cashback_table_factory(status=CashbackTableStatus.PAID)
     assert cashback_table.last_synced_at is None
 
-    sync_cashback_tables._google_sheets_gateway.get_cashback_articles = AsyncMock(return_value=[])
+    sync_cashback_tables._google_sheets_gateway.read_cashback_table = AsyncMock(
+        return_value=CashbackTableSheets(table_id=cashback_table.table_id, articles=[])
+    )
 
     await sync_cashback_tables.execute()
 
@@ -66,7 +71,9 @@ async def test_sync_cashback_tables_deletes_removed_articles(
     new_articles_dto = [
         CashbackArticleDTO(nm_id=111, title="New Product", brand_name="New Brand", instruction_text="New Instruction", image_url="http://new.jpg", in_stock=True),
     ]
-    sync_cashback_tables._google_sheets_gateway.get_cashback_articles = AsyncMock(return_value=new_articles_dto)
+    sync_cashback_tables._google_sheets_gateway.read_cashback_table = AsyncMock(
+        return_value=CashbackTableSheets(table_id=cashback_table.table_id, articles=new_articles_dto)
+    )
 
     await sync_cashback_tables.execute()
 
@@ -102,7 +109,9 @@ async def test_sync_cashback_tables_updates_existing_articles(
     updated_dto = [
         CashbackArticleDTO(nm_id=123, title="New Title", brand_name="New Brand", instruction_text="New Instruction", image_url="http://new.jpg", in_stock=True),
     ]
-    sync_cashback_tables._google_sheets_gateway.get_cashback_articles = AsyncMock(return_value=updated_dto)
+    sync_cashback_tables._google_sheets_gateway.read_cashback_table = AsyncMock(
+        return_value=CashbackTableSheets(table_id=cashback_table.table_id, articles=updated_dto)
+    )
 
     await sync_cashback_tables.execute()
 
@@ -121,11 +130,13 @@ async def test_sync_cashback_tables_skips_inactive_tables(
 ) -> None:
     cashback_table = await cashback_table_factory(status=CashbackTableStatus.NEW)
 
-    sync_cashback_tables._google_sheets_gateway.get_cashback_articles = AsyncMock(return_value=[])
+    sync_cashback_tables._google_sheets_gateway.read_cashback_table = AsyncMock(
+        return_value=CashbackTableSheets(table_id=cashback_table.table_id, articles=[])
+    )
 
     await sync_cashback_tables.execute()
 
-    sync_cashback_tables._google_sheets_gateway.get_cashback_articles.assert_not_awaited()
+    sync_cashback_tables._google_sheets_gateway.read_cashback_table.assert_not_awaited()
     assert cashback_table.last_synced_at is None
 
 
@@ -137,14 +148,17 @@ async def test_sync_cashback_tables_continues_on_error(
 
     call_count = 0
 
-    async def mock_get_articles(table_id: str):
+    async def mock_read_cashback_table(table_id: str):
         nonlocal call_count
         call_count += 1
         if table_id == table1.table_id:
             raise Exception("API error")
-        return [CashbackArticleDTO(nm_id=777, title="Product", brand_name="Brand", instruction_text="Instr", image_url="http://img.jpg", in_stock=True)]
+        return CashbackTableSheets(
+            table_id=table_id,
+            articles=[CashbackArticleDTO(nm_id=777, title="Product", brand_name="Brand", instruction_text="Instr", image_url="http://img.jpg", in_stock=True)],
+        )
 
-    sync_cashback_tables._google_sheets_gateway.get_cashback_articles = mock_get_articles
+    sync_cashback_tables._google_sheets_gateway.read_cashback_table = mock_read_cashback_table
 
     await sync_cashback_tables.execute()
 
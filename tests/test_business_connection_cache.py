@@ -0,0 +1,47 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.asyncio import Redis
+
+from axiomai.infrastructure.business_connection_cache import BusinessConnectionCache
+from axiomai.tgbot.filters.ignore_self_message import SelfBusinessMessageFilter
+
+
+def _redis_mock(stored: bytes | None = None) -> MagicMock:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.get = AsyncMock(return_value=stored)
+    redis_mock.setex = AsyncMock()
+    redis_mock.delete = AsyncMock()
+    return redis_mock
+
+
+async def test_get_uses_local_cache_after_redis_hit() -> None:
+    redis_mock = _redis_mock(stored=b"42")
+    cache = BusinessConnectionCache(redis_mock)
+
+    assert await cache.get("biz_1") == 42
+    assert await cache.get("biz_1") == 42
+    redis_mock.get.assert_awaited_once()
+
+
+async def test_delete_invalidates_local_cache() -> None:
+    redis_mock = _redis_mock()
+    cache = BusinessConnectionCache(redis_mock)
+
+    await cache.set("biz_1", 42)
+    await cache.delete("biz_1")
+
+    assert await cache.get("biz_1") is None
+    redis_mock.delete.assert_awaited_once_with("business_connection_owner:biz_1")
+
+
+async def test_filter_requests_business_connection_only_on_cache_miss() -> None:
+    cache = BusinessConnectionCache(_redis_mock())
+    container = MagicMock()
+    container.get = AsyncMock(return_value=cache)
+    bot = MagicMock()
+    bot.get_business_connection = AsyncMock(return_value=MagicMock(user=MagicMock(id=42)))
+    message = MagicMock(business_connection_id="biz_1", from_user=MagicMock(id=42))
+
+    assert await SelfBusinessMessageFilter()(message, bot, container) is True
+    assert await SelfBusinessMessageFilter()(message, bot, container) is True
+    bot.get_business_connection.assert_awaited_once_with("biz_1")
@@ -0,0 +1,72 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.asyncio import Redis
+
+from axiomai.application.dto import ArticleSnapshot, CabinetSnapshot
+from axiomai.infrastructure.cabinet_snapshot_cache import CabinetSnapshotCache
+
+
+def _snapshot(cabinet_id: int = 1) -> CabinetSnapshot:
+    return CabinetSnapshot(
+        id=cabinet_id,
+        user_id=1,
+        organization_name="Бренд",
+        business_connection_id="biz_1",
+        business_account_id=100,
+        leads_balance=10,
+        articles=(
+            ArticleSnapshot(
+                id=1,
+                cabinet_id=cabinet_id,
+                nm_id=111,
+                title="Ролик",
+                brand_name="Бренд",
+                instruction_text="инструкция",
+                image_url="https://example.com/image.jpg",
+                in_stock=True,
+            ),
+        ),
+    )
+
+
+def _redis_mock() -> MagicMock:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.publish = AsyncMock()
+    return redis_mock
+
+
+async def test_get_or_load_reads_database_once() -> None:
+    cache = CabinetSnapshotCache(_redis_mock())
+    loader = AsyncMock(return_value=_snapshot())
+
+    first = await cache.get_or_load("biz_1", loader)
+    second = await cache.get_or_load("biz_1", loader)
+
+    assert first is second
+    loader.assert_awaited_once_with("biz_1")
+    assert [a.nm_id for a in first.get_articles_by_nm_ids([111, 222])] == [111]
+
+
+async def test_invalidate_drops_snapshot_and_notifies_other_processes() -> None:
+    redis_mock = _redis_mock()
+    cache = CabinetSnapshotCache(redis_mock)
+    loader = AsyncMock(return_value=_snapshot(cabinet_id=7))
+
+    await cache.get_or_load("biz_1", loader)
+    await cache.invalidate(7)
+    await cache.get_or_load("biz_1", loader)
+
+    assert loader.await_count == 2
+    redis_mock.publish.assert_awaited_once_with("cabinet_snapshot:invalidate", 7)
+
+
+async def test_snapshot_loaded_during_invalidation_is_not_cached() -> None:
+    cache = CabinetSnapshotCache(_redis_mock())
+
+    async def loader(business_connection_id: str) -> CabinetSnapshot:
+        await cache.invalidate(1)
+        return _snapshot()
+
+    await cache.get_or_load("biz_1", loader)
+
+    assert cache._snapshots == {}
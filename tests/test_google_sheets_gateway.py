@@ -0,0 +1,244 @@
+import asyncio
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+from aiogoogle import GoogleAPI
+
+from axiomai.application.dto import ChatSummary
+from axiomai.infrastructure.database.models import Buyer
+from axiomai.infrastructure.google_sheets import GoogleSheetsGateway
+
+TABLE_ID = "table"
+SHEET_ID = 7
+SETTINGS_SHEET_ID = 8
+
+
+def _buyer(telegram_id: int, nm_id: int, *, is_ordered: bool = False) -> Buyer:
+    return Buyer(
+        cabinet_id=1,
+        username=f"user{telegram_id}",
+        fullname="Покупатель",
+        telegram_id=telegram_id,
+        nm_id=nm_id,
+        is_ordered=is_ordered,
+        is_left_feedback=False,
+        is_cut_labels=False,
+        is_superbanking_paid=False,
+        is_paid_manually=False,
+    )
+
+
+def _cells(*values: str) -> dict:
+    return {"values": [{"formattedValue": value} for value in values]}
+
+
+SPREADSHEET = {
+    "sheets": [
+        {
+            "properties": {"sheetId": 0, "title": "Артикулы", "gridProperties": {"rowCount": 100}},
+            "data": [
+                {
+                    "startColumn": 3,
+                    "rowData": [
+                        _cells("TRUE", "123", "http://img.jpg", "Ролик", "Бренд", "Инструкция"),
+                        _cells("FALSE", "not a number"),
+                        {},
+                    ],
+                }
+            ],
+        },
+        {
+            "properties": {
+                "sheetId": SHEET_ID,
+                "title": "Покупатели",
+                "index": 1,
+                "gridProperties": {"rowCount": 1000},
+            },
+            "conditionalFormats": [{}],
+            "data": [
+                {
+                    "startColumn": 1,
+                    "rowData": [_cells("1", "", "", "", "", "10", "", "", "", "", "", "", "", "", "TRUE")],
+                }
+            ],
+        },
+        {
+            "properties": {"sheetId": SETTINGS_SHEET_ID, "title": "Настройка", "index": 2},
+            "data": [{"rowData": [_cells("5", "2026-01-01 00:00:00")]}],
+        },
+    ]
+}
+
+
+def _gateway(discovery_cache_dir: Path | None = None) -> tuple[GoogleSheetsGateway, MagicMock]:
+    sheets_v4 = MagicMock()
+    sheets_v4.spreadsheets.get.return_value = "spreadsheets.get"
+    responses = {"spreadsheets.get": SPREADSHEET}
+
+    aiogoogle = MagicMock()
+    sheets_v4.discovery_document = {"name": "sheets", "version": "v4"}
+    aiogoogle.discover = AsyncMock(return_value=sheets_v4)
+    aiogoogle.as_service_account = AsyncMock(side_effect=lambda request: responses.get(request, {}))
+    aiogoogle_context = MagicMock()
+    aiogoogle_context.__aenter__ = AsyncMock(return_value=aiogoogle)
+    aiogoogle_context.__aexit__ = AsyncMock(return_value=None)
+
+    gateway = GoogleSheetsGateway.__new__(GoogleSheetsGateway)
+    gateway._aiogoogle = aiogoogle_context
+    gateway._apis = {}
+    gateway._discovery_lock = asyncio.Lock()
+    gateway._discovery_cache_dir = discovery_cache_dir
+    gateway._written_sheets = {}
+    gateway._written_settings = {}
+    return gateway, sheets_v4
+
+
+async def _sync(
+    gateway: GoogleSheetsGateway,
+    buyers: list[Buyer],
+    leads_balance: int = 5,
+    chat_summaries: dict[int, ChatSummary] | None = None,
+) -> None:
+    table_sheets = await gateway.read_cashback_table(TABLE_ID)
+    await gateway.write_cashback_table(table_sheets, buyers, chat_summaries or {}, leads_balance, "2026-01-01 00:00:00")
+
+
+def _batch_update_requests(sheets_v4: MagicMock) -> list[list[dict]]:
+    return [call.kwargs["json"]["requests"] for call in sheets_v4.spreadsheets.batchUpdate.call_args_list]
+
+
+async def test_read_cashback_table_parses_all_sheets_from_one_request() -> None:
+    gateway, sheets_v4 = _gateway()
+
+    table_sheets = await gateway.read_cashback_table(TABLE_ID)
+
+    sheets_v4.spreadsheets.get.assert_called_once()
+    assert [article.nm_id for article in table_sheets.articles] == [123]
+    assert table_sheets.articles[0].in_stock is True
+    assert table_sheets.paid_manually == {(1, 10): True}
+    assert table_sheets.buyers_sheet.sheet_id == SHEET_ID
+    assert table_sheets.settings_sheet_id == SETTINGS_SHEET_ID
+
+
+async def test_write_cashback_table_sends_buyers_and_settings_in_one_batch_update() -> None:
+    gateway, sheets_v4 = _gateway()
+    buyer = _buyer(1, 10)
+
+    await _sync(gateway, [buyer])
+
+    [requests] = _batch_update_requests(sheets_v4)
+    assert any("setDataValidation" in request for request in requests)
+    assert requests[-1]["updateCells"]["start"]["sheetId"] == SETTINGS_SHEET_ID
+    # Ручная отметка о выплате из таблицы переносится в покупателя
+    assert buyer.is_paid_manually is True
+
+
+async def test_sync_buyers_skips_write_when_nothing_changed() -> None:
+    gateway, sheets_v4 = _gateway()
+    buyers = [_buyer(2, 20), _buyer(1, 10)]
+
+    await _sync(gateway, buyers)
+    await _sync(gateway, buyers)
+
+    assert len(_batch_update_requests(sheets_v4)) == 1
+
+
+async def test_settings_are_written_when_leads_balance_changed() -> None:
+    gateway, sheets_v4 = _gateway()
+    buyers = [_buyer(1, 10)]
+
+    await _sync(gateway, buyers, leads_balance=5)
+    await _sync(gateway, buyers, leads_balance=4)
+
+    requests = _batch_update_requests(sheets_v4)[-1]
+    assert len(requests) == 1
+    assert requests[0]["updateCells"]["rows"][0]["values"][0] == {"userEnteredValue": {"numberValue": 4}}
+
+
+async def test_sync_buyers_writes_only_changed_rows() -> None:
+    gateway, sheets_v4 = _gateway()
+    await _sync(gateway, [_buyer(3, 30), _buyer(2, 20), _buyer(1, 10)])
+
+    await _sync(gateway, [_buyer(3, 30), _buyer(2, 20, is_ordered=True), _buyer(1, 10)])
+
+    requests = _batch_update_requests(sheets_v4)[-1]
+    update_cells = [
+        request["updateCells"] for request in requests if request["updateCells"]["start"]["sheetId"] == SHEET_ID
+    ]
+    assert len(update_cells) == 1
+    assert update_cells[0]["start"]["rowIndex"] == 2
+    assert len(update_cells[0]["rows"]) == 1
+
+
+async def test_buyer_row_contains_chat_summary() -> None:
+    gateway, sheets_v4 = _gateway()
+    chat_summary = ChatSummary(
+        first_message_at=datetime(2026, 1, 1, 9, 0, tzinfo=UTC),
+        last_message_at=datetime(2026, 1, 2, 9, 30, tzinfo=UTC),
+        last_message_text="Где кешбек?",
+    )
+
+    buyer = _buyer(1, 10)
+    buyer.id = 7
+
+    await _sync(gateway, [buyer], chat_summaries={7: chat_summary})
+
+    [requests] = _batch_update_requests(sheets_v4)
+    update_cells = next(request["updateCells"] for request in requests if "rows" in request.get("updateCells", {}))
+    values = [cell["userEnteredValue"].get("stringValue") for cell in update_cells["rows"][0]["values"]]
+    assert values[3:6] == ["2026-01-01 12:00:00", "2026-01-02 12:30:00", "Где кешбек?"]
+
+
+async def test_sync_buyers_inserts_new_buyers_on_top() -> None:
+    gateway, sheets_v4 = _gateway()
+    await _sync(gateway, [_buyer(1, 10)])
+
+    await _sync(gateway, [_buyer(3, 30), _buyer(2, 20), _buyer(1, 10)])
+
+    requests = _batch_update_requests(sheets_v4)[-1]
+    assert requests[0]["insertDimension"]["range"]["endIndex"] == 3
+    update_cells = [
+        request["updateCells"]
+        for request in requests
+        if "updateCells" in request and request["updateCells"]["start"]["sheetId"] == SHEET_ID
+    ]
+    assert len(update_cells) == 1
+    assert update_cells[0]["start"]["rowIndex"] == 1
+    assert len(update_cells[0]["rows"]) == 2
+
+
+async def test_sync_buyers_rewrites_sheet_when_buyer_removed() -> None:
+    gateway, sheets_v4 = _gateway()
+    await _sync(gateway, [_buyer(2, 20), _buyer(1, 10)])
+
+    await _sync(gateway, [_buyer(1, 10)])
+
+    requests = _batch_update_requests(sheets_v4)[-1]
+    assert any("deleteConditionalFormatRule" in request for request in requests)
+    assert any("setDataValidation" in request for request in requests)
+
+
+async def test_discovery_document_is_fetched_once() -> None:
+    gateway, _ = _gateway()
+
+    await _sync(gateway, [_buyer(1, 10)])
+    await _sync(gateway, [_buyer(2, 20), _buyer(1, 10)])
+
+    aiogoogle = await gateway._aiogoogle.__aenter__()
+    aiogoogle.discover.assert_awaited_once_with("sheets", "v4")
+
+
+async def test_discovery_document_is_persisted_to_disk(tmp_path: Path) -> None:
+    gateway, _ = _gateway(tmp_path)
+    await gateway.read_cashback_table(TABLE_ID)
+
+    assert json.loads((tmp_path / "sheets_v4.json").read_text()) == {"name": "sheets", "version": "v4"}
+
+    restarted_gateway, _ = _gateway(tmp_path)
+    aiogoogle = await restarted_gateway._aiogoogle.__aenter__()
+    sheets_v4 = await restarted_gateway._discover(aiogoogle, "sheets", "v4")
+
+    assert isinstance(sheets_v4, GoogleAPI)
+    aiogoogle.discover.assert_not_awaited()
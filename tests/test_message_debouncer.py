@@ -1,14 +1,25 @@
+import asyncio
+import itertools
+import json
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock
 
+import pytest
 from redis.asyncio import Redis
 
 from axiomai.config import MessageDebouncerConfig
 from axiomai.infrastructure.message_debouncer import (
+    APPEND_IMMEDIATE,
+    APPEND_REJECTED,
+    AdaptiveDebouncePolicy,
+    DebounceHandler,
     MessageDebouncer,
     MessageData,
+    TaskStrategy,
+    _serialize_message,
     merge_messages_text,
 )
+from axiomai.infrastructure.metrics import WaitTimeStats
 
 
 class TestMessageMerging:
@@ -47,11 +58,15 @@ class TestMessageMerging:
         assert merged == ""
 
 
+def _redis_mock(append_result: int = 1) -> MagicMock:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.register_script.return_value = AsyncMock(return_value=[append_result, b"burst_1"])
+    return redis_mock
+
+
 async def test_immediate_processing_for_long_messages():
     """Длинные сообщения должны обрабатываться немедленно"""
-    redis_mock = MagicMock(spec=Redis)
-    redis_mock.get = AsyncMock(return_value=None)
-    redis_mock.setex = AsyncMock()
+    redis_mock = _redis_mock(append_result=APPEND_IMMEDIATE)
 
     debouncer = MessageDebouncer(redis=redis_mock, config=MessageDebouncerConfig(IMMEDIATE_PROCESSING_LENGTH=100))
 
@@ -73,4 +88,365 @@ async def test_immediate_processing_for_long_messages():
     )
 
     process_callback.assert_called_once()
-    redis_mock.setex.assert_not_called()
+    assert debouncer._append_message_script.await_args.kwargs["args"][9] == 1
+
+
+async def test_photo_only_buffer_rejects_message_without_photo():
+    """Сообщение без фото не попадает в PHOTO_ONLY буфер"""
+    redis_mock = _redis_mock(append_result=APPEND_REJECTED)
+
+    debouncer = MessageDebouncer(redis=redis_mock, config=MessageDebouncerConfig())
+    process_callback = AsyncMock()
+
+    accepted = await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=MessageData(text="а где кешбек?", timestamp=1.0, message_id=1, has_photo=False),
+        process_callback=process_callback,
+    )
+
+    assert accepted is False
+    assert debouncer._active_timers == {}
+    process_callback.assert_not_called()
+
+
+async def test_redis_scheduler_mode_schedules_due_timer_instead_of_local_task():
+    """В режиме планировщика таймер ставится в Redis тем же скриптом, а не в asyncio-задачу"""
+    redis_mock = _redis_mock(append_result=1)
+
+    debouncer = MessageDebouncer(
+        redis=redis_mock, config=MessageDebouncerConfig(MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True)
+    )
+
+    process_callback = AsyncMock()
+    message_data = MessageData(text="привет", timestamp=1.0, message_id=1, has_photo=False)
+
+    await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=message_data,
+        process_callback=process_callback,
+        handler=DebounceHandler.PREDIALOG,
+        meta={"username": "user"},
+    )
+
+    assert debouncer._active_timers == {}
+    assert "burst_1" in debouncer._local_callbacks
+
+    call = debouncer._append_message_script.await_args.kwargs
+    assert call["keys"] == ["debouncer:buffer:biz_1:100", "debouncer:state:biz_1:100", "debouncer:due"]
+    assert call["args"][5] == DebounceHandler.PREDIALOG
+    assert json.loads(call["args"][6]) == {"username": "user"}
+    assert call["args"][8] == 1
+
+
+def _claim_redis_mock() -> tuple[MagicMock, MagicMock]:
+    redis_mock = _redis_mock()
+    pipe = MagicMock()
+    read_result = [
+        [_serialize_message(MessageData(text="привет", timestamp=1.0, message_id=1, has_photo=False)).encode()],
+        {
+            b"strategy": b"accumulate",
+            b"handler": b"dialog",
+            b"meta": b'{"username": "user"}',
+            b"burst": b"burst_1",
+        },
+    ]
+    # Чтение пачки, затем продления аренды и удаление
+    pipe.execute = AsyncMock(side_effect=itertools.chain([read_result], itertools.repeat([1, 1, 1])))
+    redis_mock.pipeline.return_value.__aenter__ = AsyncMock(return_value=pipe)
+    redis_mock.pipeline.return_value.__aexit__ = AsyncMock(return_value=False)
+    return redis_mock, pipe
+
+
+async def test_process_claim_uses_registered_handler_without_local_callback():
+    """Claim, принятый другой репликой, обрабатывается зарегистрированным обработчиком"""
+    redis_mock, pipe = _claim_redis_mock()
+
+    debouncer = MessageDebouncer(
+        redis=redis_mock, config=MessageDebouncerConfig(MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True)
+    )
+    handler = AsyncMock()
+    debouncer.register_handler(DebounceHandler.DIALOG, handler)
+
+    await debouncer._process_claim("biz_1:100#token")
+
+    handler.assert_awaited_once()
+    business_connection_id, chat_id, messages, meta = handler.await_args.args
+    assert (business_connection_id, chat_id) == ("biz_1", 100)
+    assert [m.text for m in messages] == ["привет"]
+    assert meta == {"username": "user"}
+    pipe.delete.assert_called_once_with(
+        "debouncer:processing_buffer:biz_1:100#token", "debouncer:processing_state:biz_1:100#token"
+    )
+    pipe.zrem.assert_called_once_with("debouncer:processing", "biz_1:100#token")
+
+
+async def test_cancelled_claim_keeps_messages_for_redelivery():
+    """Если обработку прервали, буфер и claim остаются в Redis и выдаются повторно после аренды"""
+    redis_mock, pipe = _claim_redis_mock()
+
+    debouncer = MessageDebouncer(
+        redis=redis_mock, config=MessageDebouncerConfig(MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True)
+    )
+    debouncer.register_handler(DebounceHandler.DIALOG, AsyncMock(side_effect=asyncio.CancelledError))
+
+    with pytest.raises(asyncio.CancelledError):
+        await debouncer._process_claim("biz_1:100#token")
+
+    pipe.lrange.assert_called_once_with("debouncer:processing_buffer:biz_1:100#token", 0, -1)
+    pipe.delete.assert_not_called()
+    pipe.zrem.assert_not_called()
+
+
+async def test_long_handler_renews_claim_lease():
+    """Пока обработка идёт дольше аренды, claim продлевается и не выдаётся повторно"""
+    redis_mock, pipe = _claim_redis_mock()
+
+    debouncer = MessageDebouncer(
+        redis=redis_mock,
+        config=MessageDebouncerConfig(MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True, MESSAGE_DEBOUNCER_CLAIM_TTL=1),
+    )
+
+    async def slow_handler(*_) -> None:
+        await asyncio.sleep(1.2)
+
+    debouncer.register_handler(DebounceHandler.DIALOG, slow_handler)
+
+    await debouncer._process_claim("biz_1:100#token")
+
+    renewals = [call for call in pipe.zadd.call_args_list if call.kwargs.get("xx")]
+    assert len(renewals) >= 3
+    assert all(call.args[0] == "debouncer:processing" for call in renewals)
+    assert list(renewals[-1].args[1]) == ["biz_1:100#token"]
+    pipe.expire.assert_any_call("debouncer:processing_buffer:biz_1:100#token", debouncer.ttl_seconds)
+    pipe.expire.assert_any_call("debouncer:processing_state:biz_1:100#token", debouncer.ttl_seconds)
+    # После обработки продления прекращаются
+    renewed = pipe.zadd.call_count
+    await asyncio.sleep(0.5)
+    assert pipe.zadd.call_count == renewed
+
+
+async def test_process_claim_uses_local_callback_of_same_burst():
+    """Локальный callback берётся по id пачки, а не по чату"""
+    redis_mock, _ = _claim_redis_mock()
+
+    debouncer = MessageDebouncer(
+        redis=redis_mock, config=MessageDebouncerConfig(MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True)
+    )
+    handler = AsyncMock()
+    debouncer.register_handler(DebounceHandler.DIALOG, handler)
+    stale_callback = AsyncMock()
+    local_callback = AsyncMock()
+    debouncer._remember_local_callback("burst_0", stale_callback)
+    debouncer._remember_local_callback("burst_1", local_callback)
+
+    await debouncer._process_claim("biz_1:100#token")
+
+    local_callback.assert_awaited_once()
+    stale_callback.assert_not_called()
+    handler.assert_not_called()
+    assert list(debouncer._local_callbacks) == ["burst_0"]
+
+
+async def test_expired_local_callbacks_are_forgotten(monkeypatch):
+    """Callback'и пачек, которые обработала другая реплика, не копятся в памяти"""
+    debouncer = MessageDebouncer(
+        redis=_redis_mock(),
+        config=MessageDebouncerConfig(
+            MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True, MESSAGE_ACCUMULATION_TTL=60, MESSAGE_DEBOUNCER_CLAIM_TTL=30
+        ),
+    )
+    monkeypatch.setattr("axiomai.infrastructure.message_debouncer.time.monotonic", lambda: 0)
+    debouncer._remember_local_callback("burst_0", AsyncMock())
+
+    monkeypatch.setattr("axiomai.infrastructure.message_debouncer.time.monotonic", lambda: 90)
+    debouncer._remember_local_callback("burst_1", AsyncMock())
+
+    assert list(debouncer._local_callbacks) == ["burst_1"]
+
+
+def _scheduled_callback(debouncer: MessageDebouncer):
+    """Callback, с которым add_message запустил последний asyncio-таймер"""
+    return debouncer._delayed_process.call_args.args[2]
+
+
+async def test_prefetched_context_is_passed_to_callback():
+    """Контекст, загруженный во время окна накопления, передаётся обработчику"""
+    debouncer = MessageDebouncer(redis=_redis_mock(), config=MessageDebouncerConfig())
+    debouncer._delayed_process = AsyncMock()
+    process_callback = AsyncMock()
+    prefetch = AsyncMock(return_value={"articles": [1, 2]})
+
+    await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=MessageData(text="привет", timestamp=1.0, message_id=1, has_photo=False),
+        process_callback=process_callback,
+        prefetch=prefetch,
+    )
+    await _scheduled_callback(debouncer)("biz_1", 100, [])
+
+    prefetch.assert_awaited_once()
+    process_callback.assert_awaited_once_with("biz_1", 100, [], {"articles": [1, 2]})
+    assert debouncer._prefetches == {}
+
+
+async def test_new_message_restarts_prefetch():
+    """Новое сообщение отменяет загрузку контекста по предыдущему и запускает новую"""
+    debouncer = MessageDebouncer(redis=_redis_mock(), config=MessageDebouncerConfig())
+    debouncer._delayed_process = AsyncMock()
+    process_callback = AsyncMock()
+    started = asyncio.Event()
+
+    async def slow_prefetch() -> str:
+        started.set()
+        await asyncio.sleep(60)
+        return "stale"
+
+    await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=MessageData(text="привет", timestamp=1.0, message_id=1, has_photo=False),
+        process_callback=process_callback,
+        prefetch=slow_prefetch,
+    )
+    await started.wait()
+    first_prefetch = debouncer._prefetches["biz_1:100"]
+
+    await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=MessageData(text="где кешбек?", timestamp=2.0, message_id=2, has_photo=False),
+        process_callback=process_callback,
+        prefetch=AsyncMock(return_value="fresh"),
+    )
+    await _scheduled_callback(debouncer)("biz_1", 100, [])
+
+    assert first_prefetch.cancelled()
+    process_callback.assert_awaited_once_with("biz_1", 100, [], "fresh")
+
+
+async def test_failed_prefetch_passes_none_to_callback():
+    """Если загрузить контекст не удалось, обработчик получает None и загружает его сам"""
+    debouncer = MessageDebouncer(redis=_redis_mock(), config=MessageDebouncerConfig())
+    debouncer._delayed_process = AsyncMock()
+    process_callback = AsyncMock()
+
+    await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=MessageData(text="привет", timestamp=1.0, message_id=1, has_photo=False),
+        process_callback=process_callback,
+        prefetch=AsyncMock(side_effect=ConnectionError),
+    )
+    await _scheduled_callback(debouncer)("biz_1", 100, [])
+
+    process_callback.assert_awaited_once_with("biz_1", 100, [], None)
+
+
+async def test_redis_scheduler_mode_skips_prefetch():
+    """Пачку может забрать другая реплика, поэтому в режиме планировщика контекст загружает обработчик"""
+    debouncer = MessageDebouncer(
+        redis=_redis_mock(), config=MessageDebouncerConfig(MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True)
+    )
+    process_callback = AsyncMock()
+    prefetch = AsyncMock()
+
+    await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=MessageData(text="привет", timestamp=1.0, message_id=1, has_photo=False),
+        process_callback=process_callback,
+        prefetch=prefetch,
+    )
+    local_callback, _ = debouncer._local_callbacks["burst_1"]
+    await local_callback("biz_1", 100, [])
+
+    prefetch.assert_not_called()
+    assert debouncer._prefetches == {}
+    process_callback.assert_awaited_once_with("biz_1", 100, [], None)
+
+
+class TestAdaptiveDebouncePolicy:
+    """Тесты подбора окна накопления"""
+
+    def _policy(self) -> AdaptiveDebouncePolicy:
+        return AdaptiveDebouncePolicy(base_delay=10, min_delay=3, terminal_delay=1.5)
+
+    def test_first_message_waits_base_delay(self):
+        """Пока темп чата неизвестен, окно равно базовой задержке"""
+        message = MessageData(text="Здравствуйте", timestamp=100.0, message_id=1, has_photo=False)
+
+        assert self._policy().delay_for("biz_1:100", message, TaskStrategy.ACCUMULATE) == 10
+
+    def test_window_follows_chat_cadence(self):
+        """Окно подстраивается под паузы между сообщениями клиента, но не меньше min_delay"""
+        policy = self._policy()
+        delays = [
+            policy.delay_for(
+                "biz_1:100",
+                MessageData(text=text, timestamp=timestamp, message_id=i, has_photo=False),
+                TaskStrategy.ACCUMULATE,
+            )
+            for i, (text, timestamp) in enumerate(
+                [("Я по поводу", 100.0), ("ролика", 102.0), ("можно", 103.0), ("инструкцию", 103.0)]
+            )
+        ]
+
+        assert delays[0] == 10
+        assert delays[1] == 5  # пауза 2с * CADENCE_DELAY_FACTOR
+        assert delays[2] == pytest.approx(4.25)  # средняя пауза 1.7с
+        assert delays[3] == 3
+
+    def test_long_pause_does_not_count_as_cadence(self):
+        """Пауза длиннее базовой задержки — новый запрос, а не темп набора"""
+        policy = self._policy()
+        policy.delay_for(
+            "biz_1:100", MessageData(text="а", timestamp=100.0, message_id=1, has_photo=False), TaskStrategy.ACCUMULATE
+        )
+
+        delay = policy.delay_for(
+            "biz_1:100", MessageData(text="б", timestamp=200.0, message_id=2, has_photo=False), TaskStrategy.ACCUMULATE
+        )
+
+        assert delay == 10
+
+    def test_terminal_signals_fire_early(self):
+        """Вопрос, "ок" и фото в PHOTO_ONLY обрабатываются через короткий terminal_delay"""
+        policy = self._policy()
+        question = MessageData(text="актуально? ", timestamp=1.0, message_id=1, has_photo=False)
+        ok_word = MessageData(text="ок", timestamp=1.0, message_id=2, has_photo=False)
+        photo = MessageData(text=None, timestamp=1.0, message_id=3, has_photo=True)
+
+        assert policy.delay_for("biz_1:1", question, TaskStrategy.ACCUMULATE) == 1.5
+        assert policy.delay_for("biz_1:2", ok_word, TaskStrategy.ACCUMULATE) == 1.5
+        assert policy.delay_for("biz_1:3", photo, TaskStrategy.PHOTO_ONLY) == 1.5
+        assert policy.delay_for("biz_1:4", photo, TaskStrategy.ACCUMULATE) == 10
+
+
+def test_wait_time_percentiles():
+    """p50/p95 считаются по последним наблюдениям"""
+    stats = WaitTimeStats()
+    for wait_time in range(1, 101):
+        stats.observe(wait_time)
+
+    assert stats.percentiles() == (pytest.approx(50.5), pytest.approx(95.05))
+
+
+async def test_question_is_scheduled_with_terminal_delay():
+    """Вопрос ставится в очередь с коротким окном вместо MESSAGE_DEBOUNCE_DELAY"""
+    debouncer = MessageDebouncer(
+        redis=_redis_mock(), config=MessageDebouncerConfig(MESSAGE_DEBOUNCER_REDIS_SCHEDULER=True)
+    )
+    now = datetime.now(timezone.utc).timestamp()
+
+    await debouncer.add_message(
+        business_connection_id="biz_1",
+        chat_id=100,
+        message_data=MessageData(text="актуально?", timestamp=now, message_id=1, has_photo=False),
+        process_callback=AsyncMock(),
+    )
+
+    scheduled_at = debouncer._append_message_script.await_args.kwargs["args"][3]
+    assert scheduled_at - now < 2
@@ -0,0 +1,108 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from axiomai.config import OpenAIConfig
+from axiomai.infrastructure.database.models.cashback_table import CashbackArticle
+from axiomai.infrastructure.openai import OpenAIGateway
+from axiomai.infrastructure.openai_limiter import OpenAILimiter
+from axiomai.infrastructure.screenshot_verdict_cache import ScreenshotVerdictCache
+
+
+def _response(text: str) -> SimpleNamespace:
+    return SimpleNamespace(output=[SimpleNamespace(content=[SimpleNamespace(text=text)])], usage=None)
+
+
+def _gateway(text: str) -> OpenAIGateway:
+    config = OpenAIConfig(OPENAI_TOKEN="token", PROXY="http://proxy")
+    gateway = OpenAIGateway(config, MagicMock(spec=ScreenshotVerdictCache), OpenAILimiter(config))
+    gateway._client = MagicMock()
+    gateway._client.responses.create = AsyncMock(return_value=_response(text))
+    return gateway
+
+
+def _article(article_id: int) -> MagicMock:
+    return MagicMock(id=article_id, nm_id=article_id * 10, title=f"Товар {article_id}", instruction_text="инструкция")
+
+
+async def test_chat_with_client_parses_article_ids() -> None:
+    gateway = _gateway("[ARTICLE:1,3]Отлично, заказывайте на сайте")
+
+    result = await gateway.chat_with_client("ролик", [_article(1), _article(2)])
+
+    # Несуществующий артикул 3 отброшен
+    assert result == {"response": "Отлично, заказывайте на сайте", "article_ids": [1]}
+
+
+async def test_chat_with_client_without_command_returns_no_articles() -> None:
+    gateway = _gateway("Напишите название товара")
+
+    result = await gateway.chat_with_client("актуально?", [_article(1)])
+
+    assert result == {"response": "Напишите название товара", "article_ids": []}
+
+
+async def test_answer_user_question_parses_switch_and_stop() -> None:
+    gateway = _gateway("[SWITCH:2] Давайте оформим")
+
+    result = await gateway.answer_user_question("хочу ещё губки", [_article(1), _article(2)], [])
+
+    assert result == {"response": "Давайте оформим", "wants_to_stop": False, "switch_to_article_id": 2}
+
+    gateway = _gateway("[STOP] Хорошо")
+    result = await gateway.answer_user_question("не хочу", [_article(1)], [])
+
+    assert result == {"response": "Хорошо", "wants_to_stop": True, "switch_to_article_id": None}
+
+
+def _catalogue(cabinet_id: int = 1) -> list[CashbackArticle]:
+    return [
+        CashbackArticle(
+            id=article_id,
+            cabinet_id=cabinet_id,
+            nm_id=article_id * 10,
+            title=f"Товар {article_id}",
+            image_url="",
+            brand_name="Бренд",
+            instruction_text="Закажите товар и пришлите скриншот",
+            in_stock=True,
+        )
+        for article_id in (1, 2, 3)
+    ]
+
+
+async def _chat_request(articles: list[CashbackArticle], user_message: str, chat_history: list[dict]) -> dict:
+    gateway = _gateway("Ответ")
+    await gateway.chat_with_client(user_message, articles, chat_history=chat_history)
+    return gateway._client.responses.create.await_args.kwargs
+
+
+async def test_chat_with_client_prompt_prefix_is_stable() -> None:
+    """Запрос следующего хода начинается побайтно так же, как предыдущий, без нового сообщения"""
+    first = await _chat_request(_catalogue(), "актуально?", [])
+    second = await _chat_request(
+        list(reversed(_catalogue())), "ролик", [{"user": "актуально?", "assistant": "Напишите название товара"}]
+    )
+
+    first_prefix = json.dumps(first["input"][:-1], ensure_ascii=False)
+    second_input = json.dumps(second["input"], ensure_ascii=False)
+    assert second_input.startswith(first_prefix.removesuffix("]"))
+    assert second["input"][-1]["content"][0]["text"] == 'Новое сообщение клиента: "ролик"'
+    assert first["prompt_cache_key"] == second["prompt_cache_key"]
+
+
+async def test_prompt_cache_key_is_scoped_by_cabinet_and_catalogue() -> None:
+    base = await _chat_request(_catalogue(cabinet_id=1), "привет", [])
+    other_cabinet = await _chat_request(_catalogue(cabinet_id=2), "привет", [])
+    other_catalogue = await _chat_request(_catalogue(cabinet_id=1)[:2], "привет", [])
+
+    assert base["prompt_cache_key"].startswith("axiomai:chat_with_client:1:")
+    assert len({base["prompt_cache_key"], other_cabinet["prompt_cache_key"], other_catalogue["prompt_cache_key"]}) == 3
+
+
+async def test_system_prompt_has_no_code_indentation() -> None:
+    request = await _chat_request(_catalogue(), "привет", [])
+
+    system_prompt = request["input"][0]["content"]
+    assert not system_prompt.startswith((" ", "\n"))
+    assert all(line == line.rstrip() for line in system_prompt.splitlines())
@@ -0,0 +1,90 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from axiomai.config import OpenAIConfig
+from axiomai.infrastructure.openai_limiter import OpenAILane, OpenAILimiter, OpenAIOverloadedError, estimate_tokens
+
+
+def _limiter(**config) -> OpenAILimiter:
+    return OpenAILimiter(OpenAIConfig(OPENAI_TOKEN="token", PROXY="http://proxy", **config))
+
+
+def _rate_limit_error(retry_after: str | None = None) -> RateLimitError:
+    headers = {"retry-after": retry_after} if retry_after else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.openai.com"))
+    return RateLimitError("rate limited", response=response, body=None)
+
+
+async def test_text_requests_are_served_before_photo_requests() -> None:
+    limiter = _limiter(OPENAI_MAX_CONCURRENCY=1)
+    release = asyncio.Event()
+    served: list[str] = []
+
+    async def request(name: str) -> None:
+        served.append(name)
+        await release.wait()
+
+    running = asyncio.create_task(limiter.call(OpenAILane.PHOTO, 1, lambda: request("running")))
+    await asyncio.sleep(0)
+    photo = asyncio.create_task(limiter.call(OpenAILane.PHOTO, 1, lambda: request("photo")))
+    text = asyncio.create_task(limiter.call(OpenAILane.TEXT, 1, lambda: request("text")))
+    await asyncio.sleep(0)
+
+    assert limiter.queue_depth(OpenAILane.PHOTO) == 1
+    assert limiter.queue_depth(OpenAILane.TEXT) == 1
+
+    release.set()
+    await asyncio.gather(running, photo, text)
+
+    assert served == ["running", "text", "photo"]
+
+
+async def test_requests_wait_for_requests_per_minute_budget() -> None:
+    limiter = _limiter(OPENAI_REQUESTS_PER_MINUTE=1)
+    await limiter.call(OpenAILane.TEXT, 1, AsyncMock())
+
+    with pytest.raises(TimeoutError):
+        async with asyncio.timeout(0.1):
+            await limiter.call(OpenAILane.TEXT, 1, AsyncMock())
+
+
+async def test_rate_limit_error_is_retried_after_retry_after(monkeypatch) -> None:
+    sleep = AsyncMock()
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    request = AsyncMock(side_effect=[_rate_limit_error("2"), "ok"])
+
+    result = await _limiter().call(OpenAILane.TEXT, 1, request)
+
+    assert result == "ok"
+    assert request.await_count == 2
+    sleep.assert_awaited_once_with(2.0)
+
+
+async def test_request_is_shed_when_queue_is_full(monkeypatch) -> None:
+    monkeypatch.setattr("axiomai.infrastructure.openai_limiter._QUEUE_LIMITS", {OpenAILane.PHOTO: 1})
+    limiter = _limiter(OPENAI_MAX_CONCURRENCY=1)
+    release = asyncio.Event()
+
+    running = asyncio.create_task(limiter.call(OpenAILane.PHOTO, 1, release.wait))
+    queued = asyncio.create_task(limiter.call(OpenAILane.PHOTO, 1, release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(OpenAIOverloadedError):
+        await limiter.call(OpenAILane.PHOTO, 1, MagicMock())
+
+    release.set()
+    await asyncio.gather(running, queued)
+
+
+def test_estimate_tokens_counts_data_url_as_one_image() -> None:
+    def request(image_url: str) -> dict:
+        content = [{"type": "input_text", "text": "Скриншот клиента:"}, {"type": "input_image", "image_url": image_url}]
+        return {"input": [{"role": "user", "content": content}], "max_output_tokens": 100}
+
+    data_url = "data:image/jpeg;base64," + "A" * 300_000
+
+    assert estimate_tokens(request(data_url)) == estimate_tokens(request(""))
@@ -0,0 +1,79 @@
+import asyncio
+import base64
+from io import BytesIO
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import Bot
+from aiogram.types import PhotoSize
+
+from axiomai.infrastructure.photo_fetcher import Photo, PhotoFetcher, select_photo_size
+
+
+def _photo_size(width: int, height: int) -> PhotoSize:
+    return PhotoSize(file_id=f"{width}x{height}", file_unique_id=f"unique_{width}x{height}", width=width, height=height)
+
+
+def _bot(download: AsyncMock | None = None) -> MagicMock:
+    async def write_content(file_id: str, destination: BytesIO) -> BytesIO:
+        destination.write(f"content of {file_id}".encode())
+        return destination
+
+    bot = MagicMock(spec=Bot)
+    bot.download = download or AsyncMock(side_effect=write_content)
+    return bot
+
+
+def test_select_photo_size_picks_smallest_size_enough_for_model() -> None:
+    sizes = [_photo_size(90, 40), _photo_size(320, 144), _photo_size(1280, 576), _photo_size(2560, 1152)]
+
+    assert select_photo_size(sizes).file_id == "2560x1152"
+    assert select_photo_size([_photo_size(320, 240), _photo_size(1280, 960), _photo_size(2560, 1920)]).width == 1280
+    # Если ни одно превью не дотягивает, берётся самое большое
+    assert select_photo_size([_photo_size(320, 144), _photo_size(800, 360)]).width == 800
+
+
+async def test_photo_is_downloaded_once_for_prefetch_and_fetch() -> None:
+    bot = _bot()
+    fetcher = PhotoFetcher(bot)
+
+    fetcher.prefetch("file", "unique")
+    photos = await asyncio.gather(fetcher.fetch("file", "unique"), fetcher.fetch("file", "unique"))
+
+    assert photos == [Photo(b"content of file"), Photo(b"content of file")]
+    bot.download.assert_awaited_once()
+
+
+async def test_failed_download_is_retried_on_next_fetch() -> None:
+    download = AsyncMock(side_effect=[ConnectionError("telegram is down"), None])
+    fetcher = PhotoFetcher(_bot(download))
+
+    with pytest.raises(ConnectionError):
+        await fetcher.fetch("file", "unique")
+
+    await fetcher.fetch("file", "unique")
+    assert download.await_count == 2
+
+
+async def test_least_recently_used_photo_is_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("axiomai.infrastructure.photo_fetcher.PHOTO_CACHE_SIZE", 2)
+    bot = _bot()
+    fetcher = PhotoFetcher(bot)
+
+    await fetcher.fetch("first", "first")
+    await fetcher.fetch("second", "second")
+    await fetcher.fetch("first", "first")
+    await fetcher.fetch("third", "third")
+
+    assert bot.download.await_count == 3
+    await fetcher.fetch("first", "first")
+    assert bot.download.await_count == 3
+    await fetcher.fetch("second", "second")
+    assert bot.download.await_count == 4
+
+
+def test_photo_bytes_are_reused_for_data_url_and_forwarding() -> None:
+    photo = Photo(b"\xff\xd8jpeg")
+
+    assert photo.data_url == f"data:image/jpeg;base64,{base64.b64encode(b'\xff\xd8jpeg').decode()}"
+    assert photo.as_input_file().data == b"\xff\xd8jpeg"
@@ -0,0 +1,56 @@
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.asyncio import Redis
+
+from axiomai.config import OpenAIConfig
+from axiomai.infrastructure.openai import OpenAIGateway
+from axiomai.infrastructure.openai_limiter import OpenAILimiter
+from axiomai.infrastructure.photo_fetcher import Photo
+from axiomai.infrastructure.screenshot_verdict_cache import ScreenshotVerdictCache
+
+
+def test_build_key_ignores_nm_ids_order() -> None:
+    key_1 = ScreenshotVerdictCache.build_key("classify_order_screenshot", b"photo", [1, 2, 3], "инструкция")
+    key_2 = ScreenshotVerdictCache.build_key("classify_order_screenshot", b"photo", [3, 2, 1], "инструкция")
+
+    assert key_1 == key_2
+
+
+def test_build_key_depends_on_image_articles_and_instruction() -> None:
+    base = ScreenshotVerdictCache.build_key("classify_order_screenshot", b"photo", [1], "инструкция")
+
+    assert base != ScreenshotVerdictCache.build_key("classify_order_screenshot", b"other photo", [1], "инструкция")
+    assert base != ScreenshotVerdictCache.build_key("classify_order_screenshot", b"photo", [2], "инструкция")
+    assert base != ScreenshotVerdictCache.build_key("classify_order_screenshot", b"photo", [1], "другая")
+    assert base != ScreenshotVerdictCache.build_key("classify_feedback_screenshot", b"photo", [1], "инструкция")
+
+
+async def test_get_returns_none_for_broken_entry() -> None:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.get = AsyncMock(return_value=b"not json")
+    redis_mock.delete = AsyncMock()
+
+    cache = ScreenshotVerdictCache(redis_mock)
+
+    assert await cache.get("screenshot_verdict:key") is None
+    redis_mock.delete.assert_awaited_once_with("screenshot_verdict:key")
+
+
+async def test_classify_order_screenshot_returns_cached_verdict_without_api_call() -> None:
+    verdict = {"is_order": True, "nm_id": 123, "price": 500, "cancel_reason": None}
+    verdict_cache = MagicMock(spec=ScreenshotVerdictCache)
+    verdict_cache.get = AsyncMock(return_value=verdict)
+
+    config = OpenAIConfig(OPENAI_TOKEN="token", PROXY="http://proxy")
+    gateway = OpenAIGateway(config, verdict_cache, OpenAILimiter(config))
+    gateway._client = MagicMock()
+    gateway._client.responses.create = AsyncMock()
+
+    article = MagicMock(nm_id=123, title="Ролик", brand_name="Бренд", instruction_text="инструкция", image_url=None)
+    result = await gateway.classify_order_screenshot(Photo(b"photo"), [article])
+
+    assert result == verdict
+    verdict_cache.get.assert_awaited_once_with(
+        ScreenshotVerdictCache.build_key("classify_order_screenshot", b"photo", [123], "инструкция")
+    )
+    gateway._client.responses.create.assert_not_awaited()
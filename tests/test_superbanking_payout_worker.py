@@ -0,0 +1,80 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+from axiomai.application.interactors.process_superbanking_payout import ProcessSuperbankingPayout, retry_delay
+from axiomai.constants import (
+    SUPERBANKING_PAYOUT_RETRY_BASE_DELAY,
+    SUPERBANKING_PAYOUT_RETRY_MAX_DELAY,
+    SUPERBANKING_PAYOUTS_CONCURRENCY,
+)
+from axiomai.infrastructure.database.gateways.superbanking_payout import SuperbankingPayoutGateway
+from axiomai.infrastructure.database.transaction_manager import TransactionManager
+from axiomai.observer.payout_worker import SuperbankingPayoutWorker
+
+
+def _container(claim_due_payouts: AsyncMock, process) -> MagicMock:
+    superbanking_payout_gateway = MagicMock()
+    superbanking_payout_gateway.claim_due_payouts = claim_due_payouts
+    process_superbanking_payout = MagicMock()
+    process_superbanking_payout.execute = process
+
+    @asynccontextmanager
+    async def request_scope():
+        r_container = MagicMock()
+        r_container.get = AsyncMock(
+            side_effect=lambda dependency: {
+                SuperbankingPayoutGateway: superbanking_payout_gateway,
+                TransactionManager: AsyncMock(),
+                ProcessSuperbankingPayout: process_superbanking_payout,
+            }[dependency]
+        )
+        yield r_container
+
+    return MagicMock(side_effect=request_scope)
+
+
+async def test_worker_claims_only_free_slots() -> None:
+    release = asyncio.Event()
+    processed = []
+
+    async def process(payout_id: int) -> None:
+        await release.wait()
+        processed.append(payout_id)
+
+    claim_due_payouts = AsyncMock(return_value=list(range(SUPERBANKING_PAYOUTS_CONCURRENCY)))
+    worker = SuperbankingPayoutWorker(_container(claim_due_payouts, process))
+
+    started = await worker.tick()
+    assert len(started) == SUPERBANKING_PAYOUTS_CONCURRENCY
+    assert claim_due_payouts.await_args.args[0] == SUPERBANKING_PAYOUTS_CONCURRENCY
+
+    # Пока пул занят, новые выплаты не берутся и их аренда не тратится впустую
+    assert await worker.tick() == []
+    assert claim_due_payouts.await_count == 1
+
+    release.set()
+    await asyncio.gather(*started)
+    assert sorted(processed) == list(range(SUPERBANKING_PAYOUTS_CONCURRENCY))
+
+
+async def test_failed_payout_is_isolated() -> None:
+    processed = []
+
+    async def process(payout_id: int) -> None:
+        if payout_id == 1:
+            raise RuntimeError("database is gone")
+        processed.append(payout_id)
+
+    worker = SuperbankingPayoutWorker(_container(AsyncMock(return_value=[1, 2]), process))
+
+    await asyncio.gather(*await worker.tick())
+
+    assert processed == [2]
+    assert worker._in_flight == {}
+
+
+def test_retry_delay_grows_exponentially_up_to_max() -> None:
+    assert retry_delay(1) == SUPERBANKING_PAYOUT_RETRY_BASE_DELAY
+    assert retry_delay(2) == SUPERBANKING_PAYOUT_RETRY_BASE_DELAY * 2
+    assert retry_delay(20) == SUPERBANKING_PAYOUT_RETRY_MAX_DELAY
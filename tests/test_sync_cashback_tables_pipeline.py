@@ -0,0 +1,105 @@
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+from axiomai.application.interactors.sync_cashback_tables import SyncCashbackTables
+from axiomai.infrastructure.database.gateways.cashback_table_gateway import CashbackTableGateway
+from axiomai.observer.sync_pipeline import SyncCashbackTablesPipeline
+
+
+def _container(table_ids: list[int], sync_table) -> MagicMock:
+    cashback_table_gateway = MagicMock()
+    cashback_table_gateway.get_active_cashback_table_ids = AsyncMock(return_value=table_ids)
+    cashback_table_gateway.get_active_cashback_table_ids_by_cabinet_ids = AsyncMock(return_value=table_ids)
+    sync_cashback_tables = MagicMock()
+    sync_cashback_tables.execute_for_table = sync_table
+
+    @asynccontextmanager
+    async def request_scope():
+        r_container = MagicMock()
+        r_container.get = AsyncMock(
+            side_effect=lambda dependency: {
+                CashbackTableGateway: cashback_table_gateway,
+                SyncCashbackTables: sync_cashback_tables,
+            }[dependency]
+        )
+        yield r_container
+
+    return MagicMock(side_effect=request_scope)
+
+
+async def test_slow_table_does_not_block_others() -> None:
+    slow_table_release = asyncio.Event()
+    synced = []
+
+    async def sync_table(cashback_table_id: int) -> None:
+        if cashback_table_id == 1:
+            await slow_table_release.wait()
+        synced.append(cashback_table_id)
+
+    pipeline = SyncCashbackTablesPipeline(_container([1, 2, 3], sync_table))
+
+    await pipeline.tick()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert sorted(synced) == [2, 3]
+
+    # Следующий тик не запускает таблицу, которая ещё синхронизируется
+    started = await pipeline.tick()
+    await asyncio.gather(*started)
+    assert sorted(synced) == [2, 2, 3, 3]
+
+    slow_table_release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert synced.count(1) == 1
+
+
+async def test_failed_table_is_isolated() -> None:
+    synced = []
+
+    async def sync_table(cashback_table_id: int) -> None:
+        if cashback_table_id == 1:
+            raise RuntimeError("sheets api error")
+        synced.append(cashback_table_id)
+
+    pipeline = SyncCashbackTablesPipeline(_container([1, 2], sync_table))
+
+    await asyncio.gather(*await pipeline.tick())
+
+    assert synced == [2]
+    assert pipeline._in_flight == {}
+
+
+async def test_dirty_table_in_flight_is_synced_again() -> None:
+    release = asyncio.Event()
+    synced = []
+
+    async def sync_table(cashback_table_id: int) -> None:
+        await release.wait()
+        synced.append(cashback_table_id)
+
+    pipeline = SyncCashbackTablesPipeline(_container([1], sync_table))
+
+    started = await pipeline.sync_cabinets([10])
+    # Событие пришло, пока таблица синхронизируется: его результат — повторная синхронизация
+    resynced = await pipeline.sync_cabinets([10])
+    assert resynced[0] not in started
+
+    release.set()
+    assert await asyncio.gather(*started) == [True]
+    assert await asyncio.gather(*resynced) == [True]
+
+    assert synced == [1, 1]
+    assert pipeline._in_flight == {}
+
+
+async def test_sync_cabinets_reports_failed_table() -> None:
+    async def sync_table(cashback_table_id: int) -> None:
+        if cashback_table_id == 1:
+            raise RuntimeError("sheets api error")
+
+    pipeline = SyncCashbackTablesPipeline(_container([1, 2], sync_table))
+
+    assert await asyncio.gather(*await pipeline.sync_cabinets([10])) == [False, True]
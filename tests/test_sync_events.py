@@ -0,0 +1,112 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from axiomai.infrastructure.sync_events import SyncEvents, SyncEventsBatch, SyncEventType
+from axiomai.observer.sync_events_consumer import SyncEventsConsumer
+
+
+async def test_publish_does_not_raise_on_redis_error() -> None:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.xadd = AsyncMock(side_effect=RedisConnectionError("redis is down"))
+
+    await SyncEvents(redis_mock).publish(SyncEventType.DIRTY_TABLE, 1)
+
+    redis_mock.xadd.assert_awaited_once()
+
+
+def _redis_mock(xreadgroup: list, xautoclaim: list | None = None) -> MagicMock:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.xautoclaim = AsyncMock(return_value=[b"0-0", xautoclaim or [], []])
+    redis_mock.xreadgroup = AsyncMock(return_value=xreadgroup)
+    redis_mock.xack = AsyncMock()
+    return redis_mock
+
+
+async def test_read_groups_cabinets_by_event_type_without_ack() -> None:
+    redis_mock = _redis_mock(
+        [
+            [
+                b"sync_events",
+                [
+                    (b"1-0", {b"type": b"dirty_table", b"cabinet_id": b"1"}),
+                    (b"2-0", {b"type": b"dirty_table", b"cabinet_id": b"1"}),
+                    (b"3-0", {b"type": b"dirty_cabinet", b"cabinet_id": b"2"}),
+                    (b"4-0", {b"type": b"unknown", b"cabinet_id": b"3"}),
+                ],
+            ]
+        ]
+    )
+    sync_events = SyncEvents(redis_mock)
+
+    batch = await sync_events.read()
+
+    assert batch.dirty == {SyncEventType.DIRTY_TABLE: {1}, SyncEventType.DIRTY_CABINET: {2}}
+    # Подтверждаются только после обработки
+    redis_mock.xack.assert_not_awaited()
+
+    await sync_events.ack(batch)
+    redis_mock.xack.assert_awaited_once_with("sync_events", "observer", b"1-0", b"2-0", b"3-0", b"4-0")
+
+
+async def test_read_reclaims_unacknowledged_events_first() -> None:
+    redis_mock = _redis_mock([], xautoclaim=[(b"1-0", {b"type": b"dirty_table", b"cabinet_id": b"5"})])
+
+    batch = await SyncEvents(redis_mock).read()
+
+    assert batch.dirty == {SyncEventType.DIRTY_TABLE: {5}}
+    assert batch.event_ids == [b"1-0"]
+    redis_mock.xreadgroup.assert_not_awaited()
+
+
+async def test_read_returns_empty_on_timeout() -> None:
+    redis_mock = _redis_mock([])
+    sync_events = SyncEvents(redis_mock)
+
+    batch = await sync_events.read()
+    await sync_events.ack(batch)
+
+    assert batch.dirty == {}
+    redis_mock.xack.assert_not_awaited()
+
+
+
+async def _run_consumer_once(synced: list[bool]) -> MagicMock:
+    batch = SyncEventsBatch(dirty={SyncEventType.DIRTY_TABLE: {1}}, event_ids=[b"1-0"])
+    sync_events = MagicMock(spec=SyncEvents)
+    sync_events.ensure_group = AsyncMock()
+    sync_events.read = AsyncMock(side_effect=[batch, asyncio.CancelledError])
+    sync_events.ack = AsyncMock()
+
+    async def sync_cabinets(_: list[int]) -> list[asyncio.Future[bool]]:
+        futures = []
+        for result in synced:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(result)
+            futures.append(future)
+        return futures
+
+    sync_pipeline = MagicMock()
+    sync_pipeline.sync_cabinets = sync_cabinets
+    consumer = SyncEventsConsumer(MagicMock(), sync_events, sync_pipeline)
+
+    with patch("axiomai.observer.sync_events_consumer._RETRY_DELAY", 0), pytest.raises(asyncio.CancelledError):
+        await consumer.run()
+    return sync_events
+
+
+async def test_consumer_acks_events_after_tables_are_synced() -> None:
+    sync_events = await _run_consumer_once([True, True])
+
+    sync_events.ack.assert_awaited_once()
+
+
+async def test_consumer_leaves_events_unacked_when_table_sync_fails() -> None:
+    sync_events = await _run_consumer_once([True, False])
+
+    # Событие будет прочитано повторно через XAUTOCLAIM
+    sync_events.ack.assert_not_awaited()
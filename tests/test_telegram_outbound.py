@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import Bot
+from aiogram.enums import ChatAction
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendChatAction, SendMessage
+
+from axiomai.infrastructure.telegram import outbound as outbound_module
+from axiomai.infrastructure.telegram.outbound import TelegramOutbound, broadcast
+
+
+def _message(chat_id: int, text: str = "text") -> SendMessage:
+    return SendMessage(chat_id=chat_id, text=text, business_connection_id="bc")
+
+
+def _typing(chat_id: int) -> SendChatAction:
+    return SendChatAction(chat_id=chat_id, action=ChatAction.TYPING, business_connection_id="bc")
+
+
+async def test_repeated_typing_is_sent_once_until_message() -> None:
+    outbound = TelegramOutbound()
+    make_request = AsyncMock(return_value=True)
+    bot = MagicMock()
+
+    await outbound(make_request, bot, _typing(1))
+    await outbound(make_request, bot, _typing(1))
+    await outbound(make_request, bot, _typing(2))
+    assert make_request.await_count == 2
+
+    await outbound(make_request, bot, _message(1))
+    await outbound(make_request, bot, _typing(1))
+    assert make_request.await_count == 4
+
+
+async def test_interactive_messages_are_sent_before_broadcast(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(outbound_module, "TELEGRAM_GLOBAL_RATE", 20)
+    outbound = TelegramOutbound()
+    sent: list[str] = []
+
+    async def make_request(_: Bot, method: SendMessage) -> bool:
+        sent.append(method.text)
+        return True
+
+    bot = MagicMock()
+    # Исчерпываем общий бюджет, дальше отправки ждут в очереди
+    await asyncio.gather(*(outbound(make_request, bot, _message(chat_id)) for chat_id in range(20)))
+
+    async def send_broadcast() -> None:
+        with broadcast():
+            await outbound(make_request, bot, _message(100, "reminder"))
+
+    reminder = asyncio.create_task(send_broadcast())
+    await asyncio.sleep(0)
+    reply = asyncio.create_task(outbound(make_request, bot, _message(101, "reply")))
+    await asyncio.sleep(0)
+    assert outbound.queue_depth() == 2
+
+    await asyncio.gather(reminder, reply)
+
+    assert sent[-2:] == ["reply", "reminder"]
+
+
+async def test_flood_control_is_retried_after_pause() -> None:
+    outbound = TelegramOutbound()
+    method = _message(1)
+    make_request = AsyncMock(side_effect=[TelegramRetryAfter(method, "flood", retry_after=0), "sent"])
+
+    assert await outbound(make_request, MagicMock(), method) == "sent"
+    assert make_request.await_count == 2
+
+
+async def test_flood_control_gives_up_after_max_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(outbound_module, "TELEGRAM_CHAT_BURST", 10)
+    outbound = TelegramOutbound()
+    method = _message(1)
+    make_request = AsyncMock(side_effect=TelegramRetryAfter(method, "flood", retry_after=0))
+
+    with pytest.raises(TelegramRetryAfter):
+        await outbound(make_request, MagicMock(), method)
+
+    assert make_request.await_count == outbound_module.TELEGRAM_SEND_MAX_RETRIES + 1
+
+
+async def test_chat_messages_keep_order_when_chat_budget_is_exhausted(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(outbound_module, "TELEGRAM_CHAT_RATE", 50)
+    monkeypatch.setattr(outbound_module, "TELEGRAM_CHAT_BURST", 1)
+    outbound = TelegramOutbound()
+    sent: list[str] = []
+
+    async def make_request(_: Bot, method: SendMessage) -> bool:
+        sent.append(method.text)
+        return True
+
+    bot = MagicMock()
+    await asyncio.gather(*(outbound(make_request, bot, _message(1, str(i))) for i in range(4)))
+
+    assert sent == ["0", "1", "2", "3"]
+
+
+async def test_post_logs_failed_send(caplog: pytest.LogCaptureFixture) -> None:
+    outbound = TelegramOutbound()
+
+    async def failing_send() -> None:
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    with caplog.at_level(logging.ERROR):
+        task = outbound.post(failing_send())
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert "failed to send telegram message" in caplog.text
+
+
+async def test_post_at_sends_without_blocking_caller() -> None:
+    outbound = TelegramOutbound()
+    sent: list[str] = []
+
+    async def send(text: str) -> None:
+        sent.append(text)
+
+    outbound.post_at(time.monotonic() + 0.05, send("reply"))
+    outbound.post_at(time.monotonic() - 1, send("late"))
+
+    assert sent == ["late"]
+    assert outbound.scheduled_count() == 1
+
+    await asyncio.sleep(0.1)
+
+    assert sent == ["late", "reply"]
+    assert outbound.scheduled_count() == 0
+
+
+async def test_post_at_keeps_broadcast_priority() -> None:
+    outbound = TelegramOutbound()
+    make_request = AsyncMock(return_value=True)
+    priorities: list[outbound_module.OutboundPriority] = []
+
+    async def send() -> None:
+        priorities.append(outbound_module._priority.get())
+        await outbound(make_request, MagicMock(), _message(1))
+
+    with broadcast():
+        outbound.post_at(time.monotonic() + 0.01, send())
+    await asyncio.sleep(0.05)
+
+    assert priorities == [outbound_module.OutboundPriority.BROADCAST]
+    make_request.assert_awaited_once()
+
+
+async def test_flush_sends_scheduled_messages_immediately() -> None:
+    outbound = TelegramOutbound()
+    sent: list[str] = []
+
+    async def send(text: str) -> None:
+        await asyncio.sleep(0)
+        sent.append(text)
+
+    outbound.post_at(time.monotonic() + 60, send("reply"))
+
+    await outbound.flush()
+
+    assert sent == ["reply"]
+    assert outbound.scheduled_count() == 0
@@ -0,0 +1,99 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.asyncio import Redis
+
+from axiomai.infrastructure.telegram_updates import TelegramUpdateQueue, partition_for
+from axiomai.tgbot.update_worker import UpdateWorker
+
+PARTITIONS = 64
+
+
+def _business_message(update_id: int, chat_id: int, business_connection_id: str = "biz") -> dict:
+    return {
+        "update_id": update_id,
+        "business_message": {
+            "message_id": update_id,
+            "date": 1,
+            "chat": {"id": chat_id, "type": "private"},
+            "business_connection_id": business_connection_id,
+            "text": "привет",
+        },
+    }
+
+
+def _queue(redis_mock: MagicMock, partitions: int = PARTITIONS) -> TelegramUpdateQueue:
+    redis_mock.register_script = MagicMock(return_value=AsyncMock(return_value=1))
+    return TelegramUpdateQueue(redis_mock, partitions)
+
+
+def test_updates_of_one_chat_share_partition() -> None:
+    callback_query = {
+        "update_id": 3,
+        "callback_query": {
+            "id": "1",
+            "from": {"id": 100, "is_bot": False, "first_name": "Покупатель"},
+            "chat_instance": "1",
+            "message": {"message_id": 1, "date": 1, "chat": {"id": 100}, "business_connection_id": "biz"},
+        },
+    }
+
+    partition = partition_for(_business_message(1, 100), PARTITIONS)
+
+    assert partition_for(_business_message(2, 100), PARTITIONS) == partition
+    assert partition_for(callback_query, PARTITIONS) == partition
+    # Чаты разных бизнес-подключений распределяются по партициям независимо
+    assert len({partition_for(_business_message(1, chat_id), PARTITIONS) for chat_id in range(1000)}) == PARTITIONS
+
+
+async def test_publish_appends_update_to_chat_partition() -> None:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.xadd = AsyncMock()
+    update = _business_message(1, 100)
+
+    await _queue(redis_mock).publish(update)
+
+    stream_key, fields = redis_mock.xadd.await_args.args
+    assert stream_key == f"telegram_updates:{partition_for(update, PARTITIONS)}"
+    assert json.loads(fields["update"]) == update
+
+
+async def test_read_acks_broken_updates() -> None:
+    redis_mock = MagicMock(spec=Redis)
+    redis_mock.xreadgroup = AsyncMock(
+        return_value=[
+            [
+                b"telegram_updates:5",
+                [(b"1-0", {b"update": json.dumps(_business_message(1, 100)).encode()}), (b"2-0", None)],
+            ]
+        ]
+    )
+    redis_mock.xack = AsyncMock()
+
+    updates = await _queue(redis_mock).read(5, pending=True)
+
+    assert updates == [("1-0", _business_message(1, 100))]
+    redis_mock.xack.assert_awaited_once_with("telegram_updates:5", "tgbot", "2-0")
+    assert redis_mock.xreadgroup.await_args.args[1] == "partition-5"
+
+
+async def test_worker_takes_its_share_of_partitions_and_releases_extra() -> None:
+    queue = MagicMock(spec=TelegramUpdateQueue)
+    queue.partitions = 4
+    queue.heartbeat = AsyncMock(return_value=1)
+    queue.acquire = AsyncMock(return_value=True)
+    queue.renew = AsyncMock(return_value=True)
+    queue.release = AsyncMock()
+    queue.read = AsyncMock(return_value=[])
+    worker = UpdateWorker(queue, MagicMock(), MagicMock())
+
+    await worker.rebalance()
+    assert sorted(worker._consumers) == [0, 1, 2, 3]
+
+    # Появился второй воркер — половина партиций отпускается
+    queue.heartbeat = AsyncMock(return_value=2)
+    await worker.rebalance()
+    assert sorted(worker._consumers) == [0, 1]
+
+    await worker._stop_consumers()
+    assert {call.args[0] for call in queue.release.await_args_list} == {0, 1, 2, 3}